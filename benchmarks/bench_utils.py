@@ -0,0 +1,268 @@
+"""
+Benchmark de las funciones de análisis de utils sobre los nombres reales de data/Clean_Data.
+
+Para cada función mide:
+- rendimiento: nombres por segundo (mejor de varias pasadas sobre todo el corpus)
+- latencia por llamada: percentiles p50, p95 y p99 en microsegundos
+- memoria: pico de memoria reservada durante una pasada (tracemalloc)
+
+Además compara las salidas con un archivo de referencia (golden) para detectar
+cambios de resultado, y los tiempos con una línea base guardada para marcar
+regresiones. Solo cuentan como regresión las métricas estables (rendimiento del
+mejor pase y latencia mediana) cuando empeoran más que la tolerancia relativa y,
+además, más que un umbral absoluto de ruido por llamada; p95 y p99 se muestran
+pero no se comparan, porque en llamadas de pocos microsegundos varían de una
+ejecución a otra. Sale con código 1 si hay diferencias con el golden o regresiones.
+
+Las funciones de nombre reciben la columna nombre y las de formato la columna
+formato de los tres CSV (mercadona, consum, carrefour, en ese orden).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_utils                      # medir y comparar
+    python -m benchmarks.bench_utils --guardar-baseline   # fijar la línea base con esta máquina
+    python -m benchmarks.bench_utils --actualizar-golden  # aceptar las salidas actuales como correctas
+    python -m benchmarks.bench_utils --funciones get_unit_type categorize_format
+"""
+
+import argparse
+import gzip
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import utils
+
+
+CARPETA = Path(__file__).resolve().parent
+RUTA_CLEAN = CARPETA.parent / 'data' / 'Clean_Data'
+SUPERMERCADOS = ['mercadona', 'consum', 'carrefour']
+
+RUTA_GOLDEN = CARPETA / 'golden_utils.json.gz'
+RUTA_BASELINE = CARPETA / 'baseline_utils.json'
+
+# Función -> (llamada, columna del corpus que recibe)
+FUNCIONES = {
+    'extraer_marca_con_diccionario': (
+        lambda nombre: utils.extraer_marca_con_diccionario(nombre, utils.indice_marcas_conocidas), 'nombre'),
+    'extract_product_format': (utils.extract_product_format, 'nombre'),
+    'extract_all_formats': (utils.extract_all_formats, 'nombre'),
+    'categorize_format': (utils.categorize_format, 'formato'),
+    'calculate_total_quantity': (utils.calculate_total_quantity, 'formato'),
+    'get_unit_type': (utils.get_unit_type, 'formato'),
+}
+
+PERCENTILES = [50, 95, 99]
+
+# Margen por defecto antes de considerar un empeoramiento como regresión
+TOLERANCIA = 0.20
+
+# Diferencias por llamada por debajo de este valor se consideran ruido (µs)
+RUIDO_US = 1.0
+
+
+def cargar_corpus(ruta=RUTA_CLEAN):
+    """Columnas nombre y formato de los tres datasets limpios, como listas"""
+    df = pd.concat([pd.read_csv(Path(ruta) / f"{supermercado}.csv", usecols=['nombre', 'formato'])
+                    for supermercado in SUPERMERCADOS], ignore_index=True)
+    return {columna: df[columna].astype(object).where(df[columna].notna(), None).tolist()
+            for columna in df.columns}
+
+
+def medir_rendimiento(funcion, valores, repeticiones):
+    """Mejor tiempo de varias pasadas completas, en valores por segundo"""
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for valor in valores:
+            funcion(valor)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return len(valores) / mejor
+
+
+def medir_latencias(funcion, valores):
+    """Percentiles de la duración de cada llamada, en microsegundos"""
+    reloj = time.perf_counter_ns
+    duraciones = np.empty(len(valores), dtype=np.int64)
+    for i, valor in enumerate(valores):
+        inicio = reloj()
+        funcion(valor)
+        duraciones[i] = reloj() - inicio
+    return {f'p{p}_us': float(np.percentile(duraciones, p)) / 1000 for p in PERCENTILES}
+
+
+def medir_memoria(funcion, valores):
+    """Pico de memoria (KB) de una pasada guardando los resultados"""
+    tracemalloc.start()
+    try:
+        resultados = [funcion(valor) for valor in valores]
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del resultados
+    return pico / 1024
+
+
+def serializar(resultado):
+    """Representación estable de una salida para compararla con el golden"""
+    return json.dumps(resultado, ensure_ascii=False, sort_keys=True)
+
+
+def comparar_golden(nombre, salidas, golden, valores, max_ejemplos=5):
+    """Devuelve (número de diferencias, ejemplos) frente a las salidas de referencia"""
+    esperadas = golden.get(nombre)
+    if esperadas is None:
+        return None, []
+    if len(esperadas) != len(salidas):
+        return abs(len(esperadas) - len(salidas)), [f"tamaño del corpus: {len(esperadas)} -> {len(salidas)}"]
+
+    diferencias = [i for i, (esperada, salida) in enumerate(zip(esperadas, salidas)) if esperada != salida]
+    ejemplos = [f"{valores[i]!r}: {esperadas[i]} -> {salidas[i]}" for i in diferencias[:max_ejemplos]]
+    return len(diferencias), ejemplos
+
+
+def empeora(antes_us, despues_us, tolerancia, ruido_us=RUIDO_US):
+    """True si un tiempo por llamada empeora más que la tolerancia relativa y que el ruido absoluto"""
+    return despues_us > antes_us * (1 + tolerancia) and despues_us - antes_us > ruido_us
+
+
+def regresiones(nombre, medidas, baseline, tolerancia, ruido_us=RUIDO_US):
+    """
+    Lista de métricas que empeoran respecto a la línea base
+
+    Se comparan el tiempo por llamada del mejor pase (a partir de nombres/s), la
+    latencia mediana y el pico de memoria
+    """
+    base = baseline.get('funciones', {}).get(nombre)
+    if base is None:
+        return []
+
+    avisos = []
+    if empeora(1e6 / base['nombres_s'], 1e6 / medidas['nombres_s'], tolerancia, ruido_us):
+        avisos.append(f"rendimiento {base['nombres_s']:,.0f} -> {medidas['nombres_s']:,.0f} nombres/s")
+    if empeora(base['p50_us'], medidas['p50_us'], tolerancia, ruido_us):
+        avisos.append(f"p50_us {base['p50_us']:.1f} -> {medidas['p50_us']:.1f}")
+    if medidas['memoria_kb'] > base['memoria_kb'] * (1 + tolerancia):
+        avisos.append(f"memoria {base['memoria_kb']:,.0f} -> {medidas['memoria_kb']:,.0f} KB")
+    return avisos
+
+
+def nombre_procesador():
+    """Modelo de CPU (platform.processor() suele venir vacío en Linux)"""
+    try:
+        with open('/proc/cpuinfo', encoding='utf-8') as f:
+            for linea in f:
+                if linea.startswith('model name'):
+                    return linea.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def info_maquina():
+    """Lo que afecta a los tiempos: CPU y versiones de Python y pandas (no el kernel ni el sistema)"""
+    return {'procesador': nombre_procesador(), 'python': platform.python_version(), 'pandas': pd.__version__}
+
+
+def ejecutar(funciones=None, repeticiones=5, tolerancia=TOLERANCIA, guardar_baseline=False, actualizar_golden=False,
+             ruido_us=RUIDO_US):
+    """
+    Ejecuta el benchmark y muestra un resumen por función.
+
+    Retorna:
+    --------
+    int : 0 si todo es correcto, 1 si hay diferencias con el golden o regresiones
+    """
+    corpus = cargar_corpus()
+    funciones = funciones or list(FUNCIONES)
+
+    golden = {}
+    if RUTA_GOLDEN.exists():
+        with gzip.open(RUTA_GOLDEN, 'rt', encoding='utf-8') as f:
+            golden = json.load(f)
+    baseline = json.loads(RUTA_BASELINE.read_text(encoding='utf-8')) if RUTA_BASELINE.exists() else {}
+    if baseline and baseline.get('maquina') != info_maquina():
+        print("⚠ La línea base se guardó en otra máquina: las regresiones de tiempo son orientativas")
+
+    print(f"Corpus: {len(corpus['nombre'])} productos de {', '.join(SUPERMERCADOS)}\n")
+    print(f"{'función':<32}{'nombres/s':>12}{'p50 µs':>9}{'p95 µs':>9}{'p99 µs':>9}{'pico KB':>10}  golden")
+
+    resultados = {}
+    fallos = 0
+    for nombre in funciones:
+        funcion, columna = FUNCIONES[nombre]
+        valores = corpus[columna]
+
+        # Calentamiento: índices de marcas, cachés de expresiones regulares, ...
+        salidas = [serializar(funcion(valor)) for valor in valores]
+
+        medidas = {'nombres_s': medir_rendimiento(funcion, valores, repeticiones)}
+        medidas.update(medir_latencias(funcion, valores))
+        medidas['memoria_kb'] = medir_memoria(funcion, valores)
+        resultados[nombre] = medidas
+
+        if actualizar_golden:
+            golden[nombre] = salidas
+            estado_golden = 'actualizado'
+        else:
+            diferencias, ejemplos = comparar_golden(nombre, salidas, golden, valores)
+            if diferencias is None:
+                estado_golden = 'sin golden'
+            elif diferencias == 0:
+                estado_golden = 'ok'
+            else:
+                estado_golden = f'{diferencias} distintas'
+                fallos += 1
+
+        print(f"{nombre:<32}{medidas['nombres_s']:>12,.0f}{medidas['p50_us']:>9.1f}{medidas['p95_us']:>9.1f}"
+              f"{medidas['p99_us']:>9.1f}{medidas['memoria_kb']:>10,.0f}  {estado_golden}")
+        if not actualizar_golden and diferencias:
+            for ejemplo in ejemplos:
+                print(f"    {ejemplo}")
+
+        if not guardar_baseline:
+            avisos = regresiones(nombre, medidas, baseline, tolerancia, ruido_us)
+            for aviso in avisos:
+                print(f"    ✗ regresión: {aviso}")
+            fallos += bool(avisos)
+
+    if actualizar_golden:
+        with gzip.open(RUTA_GOLDEN, 'wt', encoding='utf-8') as f:
+            json.dump(golden, f, ensure_ascii=False)
+        print(f"\n✓ Golden actualizado: {RUTA_GOLDEN}")
+
+    if guardar_baseline:
+        funciones_base = baseline.get('funciones', {}) if baseline.get('maquina') == info_maquina() else {}
+        funciones_base.update(resultados)
+        RUTA_BASELINE.write_text(json.dumps({'maquina': info_maquina(), 'corpus': len(corpus['nombre']),
+                                             'funciones': funciones_base}, indent=2) + '\n', encoding='utf-8')
+        print(f"\n✓ Línea base guardada: {RUTA_BASELINE}")
+
+    if fallos:
+        print(f"\n✗ {fallos} funciones con diferencias o regresiones")
+    return 1 if fallos else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de las funciones de análisis de utils")
+    parser.add_argument('--funciones', nargs='+', choices=list(FUNCIONES), help="funciones a medir (por defecto todas)")
+    parser.add_argument('--repeticiones', type=int, default=5, help="pasadas para medir el rendimiento")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA,
+                        help="empeoramiento relativo admitido frente a la línea base (0.2 = 20%%)")
+    parser.add_argument('--ruido-us', type=float, default=RUIDO_US,
+                        help="diferencia por llamada (µs) por debajo de la cual no se marca regresión")
+    parser.add_argument('--guardar-baseline', action='store_true', help="guarda las medidas como nueva línea base")
+    parser.add_argument('--actualizar-golden', action='store_true', help="guarda las salidas actuales como referencia")
+    args = parser.parse_args(argv)
+
+    return ejecutar(args.funciones, args.repeticiones, args.tolerancia, args.guardar_baseline, args.actualizar_golden,
+                    args.ruido_us)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
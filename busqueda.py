@@ -0,0 +1,264 @@
+"""
+Búsqueda de productos por nombre en los tres supermercados con un índice invertido.
+
+Las funciones busqueda_articulo_* del notebook recorren todos los nombres con
+apply en cada consulta. Aquí cada nombre se divide una sola vez en tokens (en
+minúsculas y sin tildes) y se guarda, para cada token, la lista de filas que lo
+contienen. Una consulta solo toca las listas de sus términos: cada término se
+busca como prefijo de un token en el vocabulario ordenado ('choco' encuentra
+'chocolate' y 'chocolatina') y se intersecan las filas de todos los términos.
+
+Se pueden añadir productos en cualquier momento sin reconstruir lo ya indexado.
+Las filas se identifican por supermercado: al añadir una nueva extracción de un
+supermercado se sustituyen las filas que ya tenía, y quitar() las elimina.
+
+Uso:
+    from busqueda import IndiceBusqueda
+
+    indice = IndiceBusqueda()
+    indice.agregar(df_Mercadona, 'Mercadona').agregar(df_Consum, 'Consum')
+    indice.buscar('leche entera', formato='1 l')
+    indice.agregar(df_Consum_nuevo, 'Consum')   # sustituye las filas de Consum
+"""
+
+import re
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+from utils import plegar_acentos
+
+
+REGEX_TOKEN = re.compile(r'\w+')
+
+# Carácter mayor que cualquier otro de un token, para acotar el rango de un prefijo
+FIN_PREFIJO = '\U0010ffff'
+
+
+def normalizar_texto(texto):
+    """Texto en minúsculas y sin tildes ('Café Soluble' -> 'cafe soluble')"""
+    return plegar_acentos(str(texto).lower())
+
+
+def tokenizar(texto):
+    """
+    Divide un texto normalizado en tokens alfanuméricos.
+
+    Ejemplo:
+    --------
+    >>> tokenizar('Leche Entera 1,5 L')
+    ['leche', 'entera', '1', '5', 'l']
+    """
+    return REGEX_TOKEN.findall(normalizar_texto(texto))
+
+
+class IndiceBusqueda:
+    """
+    Índice invertido de nombres de producto con búsqueda por prefijos.
+
+    Cada fila añadida recibe un identificador consecutivo; para cada token se guarda
+    la lista (ordenada) de identificadores de las filas que lo contienen. El
+    vocabulario ordenado permite resolver un prefijo como un rango contiguo de tokens.
+    Las filas quitadas no se renumeran, así que los identificadores ya devueltos
+    siguen correspondiendo a las mismas filas.
+
+    Parámetros:
+    -----------
+    columna : str
+        Columna con el texto a indexar
+    columna_formato : str
+        Columna sobre la que se aplica el filtro de formato de buscar()
+    """
+
+    def __init__(self, columna='nombre', columna_formato='formato'):
+        self.columna = columna
+        self.columna_formato = columna_formato
+
+        self._postings = {}
+        self._vocabulario = []
+        self._vocabulario_al_dia = True
+
+        # Datos por fila, indexados por identificador
+        self._formatos = []
+        self._supermercados = []
+        self._activas = []
+
+        # Partes añadidas: (primer identificador, DataFrame)
+        self._partes = []
+        self._total = 0
+
+    def __len__(self):
+        return sum(self._activas)
+
+    def agregar(self, df, supermercado=None):
+        """
+        Añade productos al índice, sustituyendo los que ya tenía de sus supermercados.
+
+        Parámetros:
+        -----------
+        df : pd.DataFrame
+            Productos con la columna de texto (y opcionalmente la de formato)
+        supermercado : str
+            Supermercado de todas las filas; si es None se usa la columna
+            'supermercado' del DataFrame cuando existe. Las filas que el índice
+            ya tenía de esos supermercados se quitan antes de añadir las nuevas
+
+        Retorna:
+        --------
+        IndiceBusqueda : el propio índice, para poder encadenar llamadas
+        """
+        if supermercado is not None:
+            self.quitar(supermercado)
+        elif 'supermercado' in df.columns:
+            for tienda in df['supermercado'].dropna().unique():
+                self.quitar(tienda)
+
+        inicio = self._total
+
+        for desplazamiento, nombre in enumerate(df[self.columna].tolist()):
+            if not isinstance(nombre, str):
+                continue
+            id_fila = inicio + desplazamiento
+            for token in set(tokenizar(nombre)):
+                postings = self._postings.get(token)
+                if postings is None:
+                    self._postings[token] = [id_fila]
+                    self._vocabulario_al_dia = False
+                else:
+                    postings.append(id_fila)
+
+        if self.columna_formato in df.columns:
+            self._formatos.extend(normalizar_texto(f) if isinstance(f, str) else ''
+                                  for f in df[self.columna_formato].tolist())
+        else:
+            self._formatos.extend([''] * len(df))
+
+        if supermercado is not None:
+            self._supermercados.extend([supermercado] * len(df))
+        elif 'supermercado' in df.columns:
+            self._supermercados.extend(df['supermercado'].astype(object).tolist())
+        else:
+            self._supermercados.extend([None] * len(df))
+        self._activas.extend([True] * len(df))
+
+        self._partes.append((inicio, df))
+        self._total += len(df)
+        return self
+
+    def quitar(self, supermercado):
+        """
+        Quita del índice las filas de un supermercado.
+
+        Parámetros:
+        -----------
+        supermercado : str
+            Supermercado cuyas filas se quitan
+
+        Retorna:
+        --------
+        IndiceBusqueda : el propio índice, para poder encadenar llamadas
+        """
+        quitados = {i for i, tienda in enumerate(self._supermercados) if tienda == supermercado and self._activas[i]}
+        if not quitados:
+            return self
+
+        for i in quitados:
+            self._activas[i] = False
+        for token in list(self._postings):
+            postings = [i for i in self._postings[token] if i not in quitados]
+            if postings:
+                self._postings[token] = postings
+            else:
+                del self._postings[token]
+                self._vocabulario_al_dia = False
+
+        self._partes = [(inicio, df) for inicio, df in self._partes
+                        if any(self._activas[inicio:inicio + len(df)])]
+        return self
+
+    def _filas_prefijo(self, prefijo):
+        """Identificadores de las filas con algún token que empieza por prefijo"""
+        if not self._vocabulario_al_dia:
+            self._vocabulario = sorted(self._postings)
+            self._vocabulario_al_dia = True
+
+        desde = bisect_left(self._vocabulario, prefijo)
+        hasta = bisect_left(self._vocabulario, prefijo + FIN_PREFIJO, desde)
+        if hasta - desde == 1:
+            return np.array(self._postings[self._vocabulario[desde]], dtype=np.int64)
+
+        listas = [self._postings[token] for token in self._vocabulario[desde:hasta]]
+        if not listas:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate([np.array(lista, dtype=np.int64) for lista in listas]))
+
+    def buscar_ids(self, consulta, formato=None, supermercados=None):
+        """
+        Identificadores (en orden de inserción) de las filas que cumplen la consulta.
+
+        Ver buscar() para el significado de los parámetros.
+        """
+        terminos = tokenizar(consulta)
+        if not terminos:
+            ids = np.flatnonzero(self._activas).astype(np.int64)
+        else:
+            # Se empieza por los términos más largos, que suelen dar menos filas
+            ids = None
+            for termino in sorted(set(terminos), key=len, reverse=True):
+                filas = self._filas_prefijo(termino)
+                ids = filas if ids is None else np.intersect1d(ids, filas, assume_unique=True)
+                if len(ids) == 0:
+                    break
+
+        if formato is not None and formato.strip():
+            formato = normalizar_texto(formato)
+            ids = np.array([i for i in ids if formato in self._formatos[i]], dtype=np.int64)
+
+        if supermercados is not None:
+            supermercados = set(supermercados)
+            ids = np.array([i for i in ids if self._supermercados[i] in supermercados], dtype=np.int64)
+
+        return ids
+
+    def buscar(self, consulta, formato=None, supermercados=None):
+        """
+        Busca productos cuyo nombre contiene todos los términos de la consulta.
+
+        Cada término se compara sin tildes ni mayúsculas con el principio de las
+        palabras del nombre, así que 'cafe mol' encuentra 'Café molido natural'.
+
+        Parámetros:
+        -----------
+        consulta : str
+            Uno o varios términos
+        formato : str
+            Texto que debe aparecer en el formato del producto ('1 l', '500 g', ...)
+        supermercados : list
+            Limita el resultado a estos supermercados
+
+        Retorna:
+        --------
+        pd.DataFrame : Filas encontradas con sus columnas originales (y 'supermercado'
+        si se indicó al añadirlas), en el orden en que se añadieron
+
+        Ejemplo:
+        --------
+        >>> indice.buscar('leche entera', formato='1 l', supermercados=['Consum'])
+        """
+        ids = self.buscar_ids(consulta, formato, supermercados)
+
+        trozos = []
+        for inicio, df in self._partes:
+            seleccion = ids[(ids >= inicio) & (ids < inicio + len(df))] - inicio
+            if len(seleccion):
+                trozo = df.iloc[seleccion]
+                if 'supermercado' not in df.columns and self._supermercados[inicio] is not None:
+                    trozo = trozo.assign(supermercado=self._supermercados[inicio])
+                trozos.append(trozo)
+
+        if not trozos:
+            return self._partes[0][1].iloc[:0] if self._partes else pd.DataFrame()
+        if len(trozos) == 1:
+            return trozos[0]
+        return pd.concat(trozos)
@@ -0,0 +1,239 @@
+"""
+Caché persistente de formatos ya analizados (nombre -> FormatoProducto).
+
+Los mismos nombres de producto se repiten en cada extracción diaria y entre
+supermercados, así que guardamos el resultado de utils.parse_product_format en
+una base de datos SQLite con una caché LRU en memoria delante. La caché se vacía
+sola cuando cambian los patrones o las funciones de análisis de utils.py.
+
+Uso:
+    from cache_formatos import CacheFormatos
+
+    with CacheFormatos() as cache:
+        formatos = parse_product_formats(df['nombre'], default_format='1 paquete', cache=cache)
+"""
+
+import hashlib
+import inspect
+import re
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+
+import utils
+from utils import FormatoProducto
+
+
+# Funciones cuyo código determina el resultado guardado en la caché
+FUNCIONES_PARSER = [
+    utils.extract_product_format,
+    utils._categorizar_formato,
+    utils._cantidad_total,
+    utils._tipo_unidad,
+    utils.convert_to_standard_unit,
+    utils.parse_format,
+    utils.parse_product_format,
+]
+
+RUTA_CACHE = Path('data/cache/formatos.sqlite')
+
+# SQLite limita el número de parámetros por consulta
+TAM_CONSULTA = 900
+
+
+def version_parser():
+    """
+    Calcula un hash de los patrones y funciones de análisis de utils.py.
+    
+    Cualquier cambio en una expresión regular compilada del módulo o en el código
+    de FUNCIONES_PARSER produce una versión distinta e invalida la caché.
+    """
+    h = hashlib.sha256()
+    for nombre in sorted(vars(utils)):
+        valor = getattr(utils, nombre)
+        if isinstance(valor, re.Pattern):
+            h.update(f'{nombre}={valor.pattern}/{valor.flags}\n'.encode('utf-8'))
+    h.update(repr(utils.PATRONES_FORMATO).encode('utf-8'))
+    h.update(repr(utils.ENVASES_CATEGORIA).encode('utf-8'))
+    for funcion in FUNCIONES_PARSER:
+        h.update(inspect.getsource(funcion).encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+class CacheFormatos:
+    """
+    Caché de dos niveles para el análisis de formatos: LRU en memoria + SQLite en disco.
+    
+    Parámetros:
+    -----------
+    ruta : str o Path
+        Archivo SQLite donde se guarda la caché
+    max_entradas : int
+        Número máximo de entradas en disco; al superarlo se eliminan las usadas hace más tiempo
+    max_memoria : int
+        Número máximo de entradas en la LRU en memoria
+    """
+    
+    def __init__(self, ruta=RUTA_CACHE, max_entradas=500_000, max_memoria=50_000):
+        self.ruta = Path(ruta)
+        self.max_entradas = max_entradas
+        self.max_memoria = max_memoria
+        self.version = version_parser()
+        self._memoria = OrderedDict()
+        self._reloj = 0
+        
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        self._conexion = sqlite3.connect(str(self.ruta))
+        self._conexion.execute('PRAGMA synchronous = OFF')
+        self._conexion.execute('PRAGMA journal_mode = WAL')
+        self._preparar_tablas()
+    
+    def _preparar_tablas(self):
+        with self._conexion:
+            self._conexion.execute('CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT)')
+            self._conexion.execute(
+                'CREATE TABLE IF NOT EXISTS formatos ('
+                'clave TEXT PRIMARY KEY, formato TEXT, categoria TEXT, cantidad REAL, '
+                'unidad TEXT, ultimo_uso INTEGER)'
+            )
+            self._conexion.execute('CREATE INDEX IF NOT EXISTS formatos_uso ON formatos (ultimo_uso)')
+            
+            fila = self._conexion.execute("SELECT valor FROM meta WHERE clave = 'version'").fetchone()
+            if fila is None or fila[0] != self.version:
+                # Los patrones han cambiado: lo guardado ya no es válido
+                self._conexion.execute('DELETE FROM formatos')
+                self._conexion.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (self.version,))
+            
+            fila = self._conexion.execute('SELECT MAX(ultimo_uso) FROM formatos').fetchone()
+            self._reloj = fila[0] or 0
+    
+    @staticmethod
+    def _clave(valor, from_format):
+        # El análisis de un nombre solo depende de su versión en minúsculas; el de un
+        # formato devuelve el texto original, así que se guarda tal cual
+        if from_format:
+            return 'f:' + str(valor)
+        return 'n:' + str(valor).lower()
+    
+    def _guardar_en_memoria(self, clave, registro):
+        self._memoria[clave] = registro
+        self._memoria.move_to_end(clave)
+        if len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+    
+    def analizar_lote(self, valores, default_format=None, from_format=False):
+        """
+        Analiza una lista de nombres (o formatos) usando la caché.
+        
+        Parámetros:
+        -----------
+        valores : list
+            Nombres de producto, o formatos si from_format=True
+        default_format : str
+            Formato a usar cuando no se encuentra ninguno en el nombre
+        from_format : bool
+            Si es True los valores ya son formatos
+            
+        Retorna:
+        --------
+        list : Un FormatoProducto por valor, en el mismo orden
+        """
+        registros = [None] * len(valores)
+        pendientes = {}
+        
+        # 1. Caché en memoria
+        for posicion, valor in enumerate(valores):
+            if pd.isna(valor):
+                continue
+            clave = self._clave(valor, from_format)
+            registro = self._memoria.get(clave)
+            if registro is not None:
+                self._memoria.move_to_end(clave)
+                registros[posicion] = registro
+            else:
+                pendientes.setdefault(clave, []).append(posicion)
+        
+        # 2. Caché en disco
+        self._reloj += 1
+        claves = list(pendientes)
+        encontradas = []
+        for inicio in range(0, len(claves), TAM_CONSULTA):
+            bloque = claves[inicio:inicio + TAM_CONSULTA]
+            marcadores = ','.join('?' * len(bloque))
+            filas = self._conexion.execute(
+                f'SELECT clave, formato, categoria, cantidad, unidad FROM formatos WHERE clave IN ({marcadores})',
+                bloque,
+            ).fetchall()
+            for clave, *campos in filas:
+                registro = FormatoProducto(*campos)
+                self._guardar_en_memoria(clave, registro)
+                for posicion in pendientes.pop(clave):
+                    registros[posicion] = registro
+                encontradas.append(clave)
+        
+        # 3. Análisis de los que faltan
+        nuevas = []
+        for clave, posiciones in pendientes.items():
+            valor = valores[posiciones[0]]
+            registro = utils.parse_format(valor) if from_format else utils.parse_product_format(valor)
+            self._guardar_en_memoria(clave, registro)
+            for posicion in posiciones:
+                registros[posicion] = registro
+            nuevas.append((clave, *registro, self._reloj))
+        
+        with self._conexion:
+            self._conexion.executemany(
+                'UPDATE formatos SET ultimo_uso = ? WHERE clave = ?',
+                [(self._reloj, clave) for clave in encontradas],
+            )
+            self._conexion.executemany('INSERT OR REPLACE INTO formatos VALUES (?, ?, ?, ?, ?, ?)', nuevas)
+        if nuevas:
+            self._expulsar()
+        
+        # Valores nulos y nombres sin formato reconocible
+        por_defecto = utils.parse_format(default_format)
+        nulo = utils.parse_format(None) if from_format else por_defecto
+        for posicion, registro in enumerate(registros):
+            if registro is None:
+                registros[posicion] = nulo
+            elif not from_format and registro.formato is None:
+                registros[posicion] = por_defecto
+        
+        return registros
+    
+    def _expulsar(self):
+        """Elimina las entradas usadas hace más tiempo si se supera max_entradas"""
+        total = self._conexion.execute('SELECT COUNT(*) FROM formatos').fetchone()[0]
+        sobrantes = total - self.max_entradas
+        if sobrantes > 0:
+            with self._conexion:
+                self._conexion.execute(
+                    'DELETE FROM formatos WHERE clave IN '
+                    '(SELECT clave FROM formatos ORDER BY ultimo_uso LIMIT ?)',
+                    (sobrantes,),
+                )
+    
+    def parse_product_format(self, product_name, default_format=None):
+        """Versión con caché de utils.parse_product_format"""
+        return self.analizar_lote([product_name], default_format)[0]
+    
+    def parse_format(self, format_str):
+        """Versión con caché de utils.parse_format"""
+        return self.analizar_lote([format_str], from_format=True)[0]
+    
+    def vaciar(self):
+        """Elimina todas las entradas de la caché"""
+        self._memoria.clear()
+        with self._conexion:
+            self._conexion.execute('DELETE FROM formatos')
+    
+    def cerrar(self):
+        self._conexion.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.cerrar()
@@ -0,0 +1,432 @@
+"""
+Cesta de la compra más barata por supermercado sobre los catálogos limpios.
+
+Una lista de la compra es una lista de líneas (término, cantidad, unidad), por
+ejemplo ('leche entera', 1, 'l') o ('cafe', 500, 'g'). Cada línea se resuelve con
+el índice de busqueda.py a los productos candidatos de cada tienda con la misma
+unidad, y para cada candidato se calcula cuántos envases hacen falta para llegar
+a la cantidad pedida y lo que cuestan.
+
+Como el índice encuentra el término en cualquier parte del nombre, cada candidato
+recibe una relevancia y en cada tienda se elige el más barato de los más
+relevantes. Puntúan que el nombre empiece por el término ('huevos grandes l' para
+'huevos'), algo menos que lo tenga como nombre principal con un complemento
+('huevos de codorniz'), y que la categoría empiece por él ('aceite, especias y
+salsas'). Si el nombre no empieza por el término, el producto solo es candidato
+cuando el término está en su categoría ('refresco cola' para 'cola'); así 'flan
+de cafe' no lo es para 'cafe'.
+
+La cantidad de cada envase se lee del formato con utils.cantidad_envase, que cuenta
+los packs completos ('4 ud. x 125 g' son 500 g, 'Caja 10 sobres (20 g)' son 20 g; en
+las líneas por unidades, 4 piezas), y se contrasta con
+el precio por unidad de la tienda: si precio / precio_ud/Kg/L indica otra
+cantidad, el producto no entra como candidato.
+
+Precios, cantidades, unidades y tiendas se guardan en arrays de numpy al crear
+el catálogo, así que resolver una línea son unas pocas operaciones vectorizadas,
+y cada línea distinta se resuelve una sola vez aunque aparezca en miles de cestas.
+
+Uso:
+    from cesta import CatalogoCesta
+
+    catalogo = CatalogoCesta(df_completo)
+    resultado = catalogo.comparar_cesta([('leche entera', 1, 'l'), ('azucar', 1, 'kg'), ('huevos', 24, 'ud')])
+    resultado.totales       # coste de la cesta en cada supermercado
+    resultado.optimo        # cada línea en la tienda donde sale más barata
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from busqueda import IndiceBusqueda, tokenizar
+from utils import cantidades_envase, parse_product_formats
+
+
+# Unidad de la lista de la compra -> (unidad estándar de utils, factor de conversión)
+UNIDADES_LISTA = {
+    'l': ('L', 1), 'cl': ('L', 0.01), 'ml': ('L', 0.001),
+    'kg': ('Kg', 1), 'g': ('Kg', 0.001), 'gr': ('Kg', 0.001),
+    'ud': ('ud', 1), 'uds': ('ud', 1), 'u': ('ud', 1), 'unidades': ('ud', 1),
+}
+
+# Margen para que 3 x 0.333 L cuente como 1 L
+TOLERANCIA_CANTIDAD = 1e-6
+
+# Diferencia relativa admitida entre la cantidad del formato y la que indica el precio
+# por unidad de la tienda (que viene redondeado a céntimos)
+TOLERANCIA_PRECIO_UNIDAD = 0.1
+
+# Cantidades de referencia del precio por unidad: por Kg/L o, en productos pequeños,
+# por 100 g/ml (precio_ud 10 veces menor)
+REFERENCIAS_PRECIO_UNIDAD = (1, 0.1)
+
+# Puntos de relevancia de un candidato para el término de una línea
+RELEVANCIA_NOMBRE = 2           # el nombre empieza por el término ('huevos grandes l')
+RELEVANCIA_COMPLEMENTO = 1      # el término es el nombre principal con un complemento ('huevos de codorniz')
+RELEVANCIA_CATEGORIA = 1        # se suma si la categoría empieza por el término ('huevos, leche y mantequilla')
+SIN_RELEVANCIA = 0              # el término no está al principio del nombre pero sí en la (sub)categoría
+
+# Palabras que, justo después del término, indican que el producto es una variante
+CONECTORES_COMPLEMENTO = {'de', 'del', 'al', 'a', 'con', 'para', 'sin', 'en', 'sabor'}
+
+# Columnas con la clasificación del producto, si el catálogo las tiene; la primera
+# es la categoría que puntúa
+COLUMNAS_CATEGORIA = ['categoria', 'subcategoria']
+
+ResultadoCesta = namedtuple('ResultadoCesta', ['detalle', 'totales', 'optimo'])
+
+
+def misma_palabra(token, termino):
+    """True si el token es el término o su plural/singular ('mejillones' y 'mejillon')"""
+    return token == termino or token in (termino + 's', termino + 'es') or termino in (token + 's', token + 'es')
+
+
+def _empieza_por(tokens, terminos):
+    """True si los primeros tokens son los términos (admitiendo singular/plural)"""
+    return len(tokens) >= len(terminos) and all(map(misma_palabra, tokens, terminos))
+
+
+def relevancia(tokens_nombre, tokens_categoria, tokens_clasificacion, terminos):
+    """
+    Relevancia de un producto para los términos de una línea.
+
+    El nombre aporta RELEVANCIA_NOMBRE si empieza por los términos y
+    RELEVANCIA_COMPLEMENTO si les sigue un complemento o solo coincide la primera
+    palabra; la categoría suma RELEVANCIA_CATEGORIA si empieza por los términos.
+    Un producto cuyo nombre no empieza así solo es candidato si los términos están
+    en su categoría o subcategoría ('refresco cola' en 'refresco de cola').
+
+    Parámetros:
+    -----------
+    tokens_nombre, tokens_categoria : list
+        Tokens del nombre y de la categoría
+    tokens_clasificacion : list
+        Tokens de la categoría y la subcategoría
+    terminos : list
+        Tokens del término de la línea
+
+    Retorna:
+    --------
+    int o None
+        Puntos de relevancia, o None si el producto no es candidato
+
+    Ejemplo:
+    --------
+    >>> relevancia(['huevos', 'de', 'codorniz'], ['huevos', 'leche', 'y', 'mantequilla'], [], ['huevos'])
+    2
+    >>> relevancia(['flan', 'de', 'cafe', 'hacendado'], ['postres', 'y', 'yogures'], [], ['cafe']) is None
+    True
+    """
+    n = len(terminos)
+    if _empieza_por(tokens_nombre, terminos):
+        sigue_complemento = len(tokens_nombre) > n and tokens_nombre[n] in CONECTORES_COMPLEMENTO
+        puntos = RELEVANCIA_COMPLEMENTO if sigue_complemento else RELEVANCIA_NOMBRE
+    elif tokens_nombre and misma_palabra(tokens_nombre[0], terminos[0]):
+        puntos = RELEVANCIA_COMPLEMENTO
+    elif all(any(misma_palabra(token, termino) for token in tokens_clasificacion) for termino in terminos):
+        puntos = SIN_RELEVANCIA
+    else:
+        return None
+    if _empieza_por(tokens_categoria, terminos):
+        puntos += RELEVANCIA_CATEGORIA
+    return puntos
+
+
+def _tokens_columna(valores):
+    """tokenizar de cada valor, analizando cada texto distinto una sola vez"""
+    codigos, valores_unicos = pd.factorize(valores)
+    tokens = [tokenizar(valor) for valor in valores_unicos] + [[]]
+    return [tokens[codigo] for codigo in codigos]
+
+
+def normalizar_linea(linea):
+    """
+    Convierte una línea de la lista en (termino, cantidad, unidad) con unidades estándar.
+
+    Acepta un texto ('leche'), una tupla (termino, cantidad, unidad) o un diccionario
+    con las claves termino/producto, cantidad y unidad.
+
+    Ejemplo:
+    --------
+    >>> normalizar_linea(('cafe', 500, 'g'))
+    ('cafe', 0.5, 'Kg')
+    """
+    if isinstance(linea, str):
+        return linea, None, None
+    if isinstance(linea, dict):
+        termino = linea.get('termino', linea.get('producto'))
+        cantidad, unidad = linea.get('cantidad'), linea.get('unidad')
+    else:
+        termino, cantidad, unidad = (tuple(linea) + (None, None))[:3]
+
+    if cantidad is None or unidad is None:
+        return termino, None, None
+    if unidad in ('L', 'Kg', 'ud'):
+        return termino, float(cantidad), unidad
+    if unidad.lower() not in UNIDADES_LISTA:
+        raise ValueError(f"Unidad no reconocida: {unidad} (usa {', '.join(UNIDADES_LISTA)})")
+    estandar, factor = UNIDADES_LISTA[unidad.lower()]
+    return termino, round(float(cantidad) * factor, 6), estandar
+
+
+class CatalogoCesta:
+    """
+    Catálogo de productos preparado para calcular cestas de la compra.
+
+    Parámetros:
+    -----------
+    df : pd.DataFrame
+        Productos de todas las tiendas (como df_completo), con nombre, formato,
+        precio, precio_ud/Kg/L y supermercado
+    indice : IndiceBusqueda
+        Índice ya construido sobre las mismas filas y en el mismo orden (por
+        ejemplo, para compartirlo con otras búsquedas); si es None se crea uno
+    columna_supermercado : str
+        Columna que identifica la tienda
+    """
+
+    def __init__(self, df, indice=None, columna_supermercado='supermercado'):
+        self.productos = df.reset_index(drop=True)
+
+        codigos, tiendas = pd.factorize(self.productos[columna_supermercado])
+        self.tiendas = list(tiendas)
+        self._tienda = codigos
+
+        # Los precios se redondean a céntimos para que las sumas no arrastren el error de float32
+        self._precio = np.round(self.productos['precio'].to_numpy(dtype=np.float64), 2)
+        self._cantidad, self._unidad, self._piezas = self._cantidades_envase()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._precio_unidad = self._precio / self._cantidad
+
+        self.indice = indice if indice is not None else IndiceBusqueda().agregar(self.productos)
+        self._tokens = _tokens_columna(self.productos['nombre'].astype(object))
+        columnas_categoria = [c for c in COLUMNAS_CATEGORIA if c in self.productos.columns]
+        clasificacion = self.productos[columnas_categoria].astype(object).fillna('')
+        self._tokens_categoria = _tokens_columna(clasificacion[COLUMNAS_CATEGORIA[0]]) \
+            if COLUMNAS_CATEGORIA[0] in clasificacion else [[]] * len(self.productos)
+        self._tokens_clasificacion = _tokens_columna(clasificacion.agg(' '.join, axis=1)) \
+            if columnas_categoria else [[]] * len(self.productos)
+        self._lineas = {}
+
+    def _cantidades_envase(self):
+        """
+        Cantidad, unidad y piezas de cada envase; la cantidad, contrastada con el precio
+        por unidad de la tienda.
+
+        La cantidad sale del formato (o del nombre, si el formato no la indica) con
+        utils.cantidades_envase. Después se compara con la que resulta
+        de precio / precio_ud/Kg/L:
+        - si coinciden (con el precio por Kg/L o por 100 g/ml), se acepta
+        - si el precio por unidad coincide con la cantidad de utils.parse_product_formats,
+          es que la limpieza lo calculó con ella (sin contar los packs) y no aporta nada
+        - en otro caso no se sabe cuánto trae el envase y la cantidad queda en NaN
+        """
+        formatos = self.productos['formato'].astype(object)
+        envases = cantidades_envase(formatos, self.productos['nombre'])
+        cantidad = envases['cantidad'].to_numpy(dtype=np.float64, copy=True)
+        unidad = envases['unidad'].to_numpy(dtype=object)
+        piezas = envases['piezas'].to_numpy(dtype=np.float64)
+
+        precio_unidad = self.productos['precio_ud/Kg/L'].to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cantidad_tienda = self._precio / precio_unidad
+            coincide = np.zeros(len(cantidad), dtype=bool)
+            for referencia in REFERENCIAS_PRECIO_UNIDAD:
+                coincide |= np.abs(cantidad_tienda * referencia / cantidad - 1) <= TOLERANCIA_PRECIO_UNIDAD
+
+            cantidad_utils = parse_product_formats(formatos, from_format=True)['cantidad'].to_numpy(dtype=np.float64)
+            calculado = np.abs(cantidad_tienda / cantidad_utils - 1) <= TOLERANCIA_PRECIO_UNIDAD
+
+        sin_precio_unidad = ~(precio_unidad > 0)
+        cantidad[~(coincide | calculado | sin_precio_unidad)] = np.nan
+        return cantidad, unidad, piezas
+
+    def _cantidades_linea(self, unidad):
+        """Cantidad de cada envase en la unidad de una línea: en 'ud', sus piezas"""
+        return self._piezas if unidad == 'ud' else self._cantidad
+
+    def _relevancias(self, ids, terminos):
+        """relevancia de cada producto de ids; NaN si no es candidato para los términos"""
+        relevancias = (relevancia(self._tokens[i], self._tokens_categoria[i], self._tokens_clasificacion[i], terminos)
+                       for i in ids)
+        return np.array([np.nan if r is None else r for r in relevancias], dtype=np.float64)
+
+    def resolver_linea(self, termino, cantidad=None, unidad=None):
+        """
+        Producto más barato de cada tienda para una línea ya normalizada.
+
+        Sin cantidad se compra un envase del producto más barato; con cantidad, los
+        envases necesarios (redondeando hacia arriba) del producto que cubre la
+        cantidad con menor coste. En cada tienda solo compiten los candidatos con la
+        mayor relevancia para el término (ver relevancia).
+
+        Retorna:
+        --------
+        tuple : (costes, filas, envases), arrays con una posición por tienda; las
+        tiendas sin candidatos tienen coste inf y fila -1
+        """
+        clave = (termino, cantidad, unidad)
+        if clave in self._lineas:
+            return self._lineas[clave]
+
+        ids = self.indice.buscar_ids(termino)
+        terminos = tokenizar(termino)
+        if terminos:
+            relevancias = self._relevancias(ids, terminos)
+            candidato = ~np.isnan(relevancias)
+            ids, relevancias = ids[candidato], relevancias[candidato]
+        else:
+            relevancias = np.zeros(len(ids))
+        if cantidad is None:
+            envases = np.ones(len(ids))
+        else:
+            # En las líneas por unidades cuentan las piezas del envase, sea cual sea su unidad
+            cantidades = self._cantidades_linea(unidad)
+            valido = cantidades[ids] > 0
+            if unidad != 'ud':
+                valido &= self._unidad[ids] == unidad
+            ids, relevancias = ids[valido], relevancias[valido]
+            envases = np.ceil(cantidad / cantidades[ids] - TOLERANCIA_CANTIDAD)
+        costes_ids = envases * self._precio[ids]
+
+        valido = ~np.isnan(costes_ids)
+        ids, relevancias, envases, costes_ids = ids[valido], relevancias[valido], envases[valido], costes_ids[valido]
+
+        # Orden por tienda, relevancia y coste: el primero de cada tienda es el más barato de los más relevantes
+        orden = np.lexsort((costes_ids, -relevancias, self._tienda[ids]))
+        tiendas_ordenadas = self._tienda[ids][orden]
+        tiendas_con_producto, primeros = np.unique(tiendas_ordenadas, return_index=True)
+
+        costes = np.full(len(self.tiendas), np.inf)
+        filas = np.full(len(self.tiendas), -1, dtype=np.int64)
+        unidades_compradas = np.zeros(len(self.tiendas))
+        costes[tiendas_con_producto] = costes_ids[orden][primeros]
+        filas[tiendas_con_producto] = ids[orden][primeros]
+        unidades_compradas[tiendas_con_producto] = envases[orden][primeros]
+
+        resultado = (costes, filas, unidades_compradas)
+        self._lineas[clave] = resultado
+        return resultado
+
+    def comparar_cesta(self, lista):
+        """
+        Coste de una lista de la compra en cada supermercado y combinando tiendas.
+
+        Parámetros:
+        -----------
+        lista : list
+            Líneas (termino, cantidad, unidad); ver normalizar_linea
+
+        Retorna:
+        --------
+        ResultadoCesta :
+            detalle: una fila por línea y tienda con el producto elegido, envases y coste
+            totales: coste de la cesta completa por tienda (NaN si falta alguna línea)
+            optimo: cada línea en la tienda donde es más barata, con el coste total en .attrs['total']
+        """
+        lineas = [normalizar_linea(linea) for linea in lista]
+        resueltas = [self.resolver_linea(*linea) for linea in lineas]
+        costes = np.array([r[0] for r in resueltas]).reshape(len(lineas), len(self.tiendas))
+
+        filas_detalle = []
+        for (termino, cantidad, unidad), (costes_linea, filas, envases) in zip(lineas, resueltas):
+            for t, tienda in enumerate(self.tiendas):
+                fila = filas[t]
+                producto = self.productos.iloc[fila] if fila >= 0 else None
+                filas_detalle.append({
+                    'termino': termino,
+                    'cantidad': cantidad,
+                    'unidad': unidad,
+                    'supermercado': tienda,
+                    'nombre': producto['nombre'] if producto is not None else None,
+                    'formato': producto['formato'] if producto is not None else None,
+                    'cantidad_envase': self._cantidades_linea(unidad)[fila] if fila >= 0 else np.nan,
+                    'precio': self._precio[fila] if fila >= 0 else np.nan,
+                    'precio_ud/Kg/L': self._precio_unidad[fila] if fila >= 0 else np.nan,
+                    'envases': envases[t] if fila >= 0 else np.nan,
+                    'coste': costes_linea[t] if fila >= 0 else np.nan,
+                })
+        detalle = pd.DataFrame(filas_detalle)
+
+        totales = pd.Series(costes.sum(axis=0), index=self.tiendas, name='total')
+        totales[np.isinf(totales)] = np.nan
+
+        mejor = costes.argmin(axis=1)
+        optimo = detalle.iloc[np.arange(len(lineas)) * len(self.tiendas) + mejor].reset_index(drop=True)
+        optimo.attrs['total'] = float(optimo['coste'].sum(min_count=len(lineas)))
+
+        return ResultadoCesta(detalle, totales, optimo)
+
+    def evaluar_cestas(self, cestas):
+        """
+        Evalúa muchas cestas a la vez devolviendo solo los totales.
+
+        Cada línea distinta se resuelve una vez y el coste de todas las cestas se
+        obtiene sumando por tramos la matriz de costes línea x tienda.
+
+        Parámetros:
+        -----------
+        cestas : list
+            Lista de listas de la compra
+
+        Retorna:
+        --------
+        pd.DataFrame : Una fila por cesta con el total en cada tienda (NaN si no la
+        puede completar), el total combinando tiendas y la tienda más barata
+        """
+        posiciones = {}
+        lineas = []
+        indices = []
+        for lista in cestas:
+            for linea in lista:
+                linea = normalizar_linea(linea)
+                if linea not in posiciones:
+                    posiciones[linea] = len(lineas)
+                    lineas.append(linea)
+                indices.append(posiciones[linea])
+
+        costes_lineas = np.array([self.resolver_linea(*linea)[0] for linea in lineas]).reshape(-1, len(self.tiendas))
+        tamanos = np.array([len(lista) for lista in cestas])
+        inicios = np.concatenate(([0], np.cumsum(tamanos)[:-1]))
+
+        costes = costes_lineas[np.array(indices, dtype=np.int64)]
+        no_vacias = tamanos > 0
+        totales = np.zeros((len(cestas), len(self.tiendas)))
+        optimo = np.zeros(len(cestas))
+        if len(costes):
+            totales[no_vacias] = np.add.reduceat(costes, inicios[no_vacias], axis=0)
+            optimo[no_vacias] = np.add.reduceat(costes.min(axis=1), inicios[no_vacias])
+
+        resultado = pd.DataFrame(np.where(np.isinf(totales), np.nan, totales), columns=self.tiendas)
+        resultado['optimo'] = np.where(np.isinf(optimo), np.nan, optimo)
+        completas = no_vacias & ~np.isinf(totales).all(axis=1)
+        resultado['mas_barato'] = np.where(completas, np.array(self.tiendas, dtype=object)[totales.argmin(axis=1)], None)
+        return resultado
+
+
+def generar_cestas(lineas, num_cestas, tam_min=5, tam_max=15, semilla=None):
+    """
+    Genera cestas aleatorias a partir de un repertorio de líneas.
+
+    Parámetros:
+    -----------
+    lineas : list
+        Líneas posibles (termino, cantidad, unidad)
+    num_cestas : int
+        Número de cestas
+    tam_min, tam_max : int
+        Número de líneas de cada cesta (sin repetir líneas dentro de una cesta)
+    semilla : int
+        Semilla para obtener siempre las mismas cestas
+
+    Retorna:
+    --------
+    list : Lista de cestas
+    """
+    rng = np.random.default_rng(semilla)
+    tam_max = min(tam_max, len(lineas))
+    tam_min = min(tam_min, tam_max)
+    return [[lineas[i] for i in rng.choice(len(lineas), size=rng.integers(tam_min, tam_max + 1), replace=False)]
+            for _ in range(num_cestas)]
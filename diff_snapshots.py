@@ -0,0 +1,210 @@
+"""
+Diferencias entre dos extracciones consecutivas de un scraper.
+
+Compara dos CSV (por ejemplo dos save_to_csv de ConsumScraperOptimizado) y
+genera el conjunto de cambios: productos nuevos, desaparecidos y con otro precio
+o promoción. Ninguno de los dos archivos se carga completo en un DataFrame:
+
+1. Se leen en streaming y cada fila (solo la clave y los campos a comparar) se
+   reparte en una partición según el hash de su clave.
+2. Para cada partición se carga en un diccionario la parte de la extracción
+   anterior y se recorre la de la nueva buscando cada clave (hash join).
+
+Las dos extracciones de la misma partición tienen las mismas claves, así que la
+memoria necesaria es la de una partición. Si los archivos son pequeños se usa
+una sola partición y no se escribe nada en disco.
+
+Uso:
+    from diff_snapshots import diff_extracciones
+
+    cambios = diff_extracciones('consum_ayer.csv', 'consum_hoy.csv', supermercado='consum')
+    diff_extracciones('consum_ayer.csv', 'consum_hoy.csv', supermercado='consum', salida='cambios.csv')
+
+    python diff_snapshots.py consum consum_ayer.csv consum_hoy.csv cambios.csv
+"""
+
+import csv
+import os
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+
+from historico_precios import ALTA, BAJA, CAMBIO, CLAVES_VACIAS, CONFIG_SUPERMERCADOS, comprobar_columnas
+
+
+# Tamaño aproximado de cada partición; por debajo no se particiona
+BYTES_PARTICION = 64 * 1024 * 1024
+
+
+def _columnas(cabecera, clave, comparar, ruta):
+    """Posiciones de la clave y de los campos a comparar en la cabecera de un CSV"""
+    comprobar_columnas(cabecera, [clave] + comparar, ruta)
+    return cabecera.index(clave), [cabecera.index(c) for c in comparar]
+
+
+def _leer_filas(ruta, clave, comparar, respaldo=None):
+    """
+    Recorre un CSV devolviendo (clave, (campos a comparar)) sin cargarlo entero
+
+    respaldo: (columnas, función) que da la clave de las filas en las que falta
+    (ver historico_precios.CONFIG_SUPERMERCADOS)
+    """
+    with open(ruta, newline='', encoding='utf-8-sig') as f:
+        lector = csv.reader(f)
+        cabecera = next(lector, [])
+        i_clave, i_campos = _columnas(cabecera, clave, comparar, ruta)
+        if respaldo:
+            columnas, funcion = respaldo
+            i_respaldo = [cabecera.index(c) if c in cabecera else None for c in columnas]
+        for fila in lector:
+            if len(fila) < len(cabecera):
+                fila += [''] * (len(cabecera) - len(fila))
+            valor = fila[i_clave]
+            if valor in CLAVES_VACIAS and respaldo:
+                valor = funcion(*('' if i is None else fila[i] for i in i_respaldo))
+            if valor not in CLAVES_VACIAS:
+                yield valor, tuple(fila[i] for i in i_campos)
+
+
+def _particionar(filas, carpeta, prefijo, num_particiones):
+    """Escribe cada fila en el archivo de su partición y devuelve las rutas"""
+    rutas = [os.path.join(carpeta, f'{prefijo}_{p}.csv') for p in range(num_particiones)]
+    archivos = [open(ruta, 'w', newline='', encoding='utf-8') for ruta in rutas]
+    try:
+        escritores = [csv.writer(archivo) for archivo in archivos]
+        for clave, campos in filas:
+            escritores[hash(clave) % num_particiones].writerow((clave,) + campos)
+    finally:
+        for archivo in archivos:
+            archivo.close()
+    return rutas
+
+
+def _leer_particion(ruta):
+    with open(ruta, newline='', encoding='utf-8') as f:
+        for fila in csv.reader(f):
+            yield fila[0], tuple(fila[1:])
+
+
+def _comparar(filas_anterior, filas_nueva, comparar):
+    """
+    Hash join de una partición: genera un diccionario por cada cambio
+
+    Si una clave aparece varias veces en la misma extracción (un producto en varias
+    categorías) cuenta solo su primera aparición.
+    """
+    anterior = {}
+    for clave, campos in filas_anterior:
+        anterior.setdefault(clave, campos)
+
+    vistas = set()
+    for clave, campos in filas_nueva:
+        if clave in vistas:
+            continue
+        vistas.add(clave)
+
+        previos = anterior.pop(clave, None)
+        if previos is None:
+            yield {'tipo': ALTA, 'clave': clave, **dict(zip(comparar, campos))}
+        elif previos != campos:
+            cambio = {'tipo': CAMBIO, 'clave': clave}
+            for campo, antes, despues in zip(comparar, previos, campos):
+                if antes != despues:
+                    cambio[campo] = despues
+                    cambio[f'{campo}_anterior'] = antes
+            yield cambio
+
+    for clave, campos in anterior.items():
+        yield {'tipo': BAJA, 'clave': clave, **{f'{c}_anterior': v for c, v in zip(comparar, campos)}}
+
+
+def iterar_cambios(anterior, nueva, supermercado=None, clave=None, comparar=None, num_particiones=None):
+    """
+    Genera los cambios entre dos extracciones, partición a partición.
+
+    Parámetros:
+    -----------
+    anterior, nueva : str o Path
+        CSV de la extracción anterior y de la nueva
+    supermercado : str
+        Toma clave (con su respaldo) y campos a comparar de historico_precios.CONFIG_SUPERMERCADOS
+    clave : str
+        Columna que identifica el producto (si no se indica supermercado)
+    comparar : list
+        Columnas cuyos cambios se detectan (si no se indica supermercado)
+    num_particiones : int
+        Particiones del hash join; por defecto según el tamaño de los archivos
+
+    Retorna:
+    --------
+    generator : Diccionarios con tipo ('alta', 'cambio', 'baja'), clave y los campos
+    nuevos y/o anteriores (en los cambios, solo los campos que cambian)
+    """
+    respaldo = None
+    if supermercado is not None:
+        if clave is None:
+            clave = CONFIG_SUPERMERCADOS[supermercado]['clave']
+            respaldo = CONFIG_SUPERMERCADOS[supermercado].get('respaldo')
+        comparar = comparar or CONFIG_SUPERMERCADOS[supermercado]['comparar']
+    if clave is None or not comparar:
+        raise ValueError("Indica el supermercado o la clave y los campos a comparar")
+    comparar = list(comparar)
+
+    if num_particiones is None:
+        tamano = max(os.path.getsize(anterior), os.path.getsize(nueva))
+        num_particiones = max(1, -(-tamano // BYTES_PARTICION))
+
+    if num_particiones == 1:
+        yield from _comparar(_leer_filas(anterior, clave, comparar, respaldo),
+                             _leer_filas(nueva, clave, comparar, respaldo), comparar)
+        return
+
+    carpeta = tempfile.mkdtemp(prefix='diff_')
+    try:
+        rutas_anterior = _particionar(_leer_filas(anterior, clave, comparar, respaldo), carpeta, 'anterior',
+                                      num_particiones)
+        rutas_nueva = _particionar(_leer_filas(nueva, clave, comparar, respaldo), carpeta, 'nueva', num_particiones)
+        for ruta_anterior, ruta_nueva in zip(rutas_anterior, rutas_nueva):
+            yield from _comparar(_leer_particion(ruta_anterior), _leer_particion(ruta_nueva), comparar)
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+
+def diff_extracciones(anterior, nueva, supermercado=None, clave=None, comparar=None, salida=None,
+                      num_particiones=None):
+    """
+    Conjunto de cambios entre dos extracciones.
+
+    Con salida=None devuelve los cambios en un DataFrame; con una ruta los escribe
+    en ese CSV a medida que se generan y devuelve el número de cambios de cada tipo.
+    El resto de parámetros son los de iterar_cambios.
+
+    Ejemplo:
+    --------
+    >>> cambios = diff_extracciones('consum_ayer.csv', 'consum_hoy.csv', supermercado='consum')
+    >>> cambios['tipo'].value_counts()
+    """
+    if supermercado is not None:
+        comparar = comparar or CONFIG_SUPERMERCADOS[supermercado]['comparar']
+    cambios = iterar_cambios(anterior, nueva, supermercado, clave, comparar, num_particiones)
+    columnas = ['tipo', 'clave'] + [f'{c}{sufijo}' for c in (comparar or []) for sufijo in ('', '_anterior')]
+
+    if salida is None:
+        return pd.DataFrame(list(cambios), columns=columnas)
+
+    resumen = {ALTA: 0, CAMBIO: 0, BAJA: 0}
+    with open(salida, 'w', newline='', encoding='utf-8-sig') as f:
+        escritor = csv.DictWriter(f, fieldnames=columnas)
+        escritor.writeheader()
+        for cambio in cambios:
+            escritor.writerow(cambio)
+            resumen[cambio['tipo']] += 1
+    return resumen
+
+
+if __name__ == "__main__":
+    supermercado, anterior, nueva, salida = sys.argv[1:5]
+    resumen = diff_extracciones(anterior, nueva, supermercado=supermercado, salida=salida)
+    print(f"✓ {resumen[ALTA]} altas, {resumen[CAMBIO]} cambios, {resumen[BAJA]} bajas -> {salida}")
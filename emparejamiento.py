@@ -0,0 +1,223 @@
+"""
+Emparejamiento de productos equivalentes entre supermercados.
+
+Comparar cada producto con todos los de las otras tiendas crece con el producto
+de los tamaños de los catálogos. Para evitarlo, los productos se agrupan primero
+en bloques por tipo de unidad y cantidad total del envase (utils.cantidad_envase,
+que cuenta los packs completos): un 'leche entera 1 l' solo puede emparejarse con
+otros productos de 1 L y un '6 x 1 L' con los de 6 L. Dentro de cada bloque, un índice invertido de rasgos (palabras o trigramas
+de caracteres) genera como candidatos solo los pares que comparten algún rasgo,
+y únicamente esos pares se puntúan con la similitud de Jaccard.
+
+Funciona con cualquier número de supermercados: se emparejan todas las parejas
+de tiendas presentes en cada bloque.
+
+Uso:
+    from emparejamiento import emparejar_productos
+
+    parejas = emparejar_productos(df_completo, umbral=0.5)
+"""
+
+from collections import defaultdict
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from busqueda import tokenizar
+from utils import cantidades_envase, parse_product_formats
+
+
+# Palabras que aparecen en casi todos los nombres y no ayudan a distinguir productos
+PALABRAS_VACIAS = {'de', 'del', 'la', 'el', 'los', 'las', 'con', 'sin', 'y', 'en', 'para', 'al', 'a'}
+
+# Unidades y multiplicadores: la cantidad ya está en la clave del bloque
+PALABRAS_FORMATO = {'l', 'ml', 'cl', 'g', 'gr', 'grs', 'kg', 'ud', 'uds', 'u', 'x', 'unidades', 'unidad', 'pack'}
+
+METODOS = ('tokens', 'trigramas')
+
+
+def rasgos_tokens(nombre):
+    """Palabras significativas del nombre (sin tildes, números, unidades ni palabras vacías)"""
+    return frozenset(token for token in tokenizar(nombre)
+                     if not token.isdigit() and token not in PALABRAS_VACIAS and token not in PALABRAS_FORMATO)
+
+
+def rasgos_trigramas(nombre):
+    """
+    Trigramas de caracteres de cada palabra significativa, con espacios en los extremos
+    ('leche' -> ' le', 'lec', 'ech', 'che', 'he ')
+    """
+    trigramas = set()
+    for token in rasgos_tokens(nombre):
+        palabra = f' {token} '
+        trigramas.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return frozenset(trigramas)
+
+
+def clave_cantidad(cantidad):
+    """Cantidad redondeada a 3 cifras significativas (0.3333 -> '0.333'); None si no hay cantidad"""
+    if cantidad is None or np.isnan(cantidad) or cantidad <= 0:
+        return None
+    return f'{cantidad:.3g}'
+
+
+def bloques_por_formato(df, columna_formato='formato'):
+    """
+    Agrupa las filas en bloques por (unidad, cantidad total del envase).
+
+    La cantidad sale del formato o, si no indica unidad ('6 x 100'), del nombre. Los
+    formatos que solo cuentan piezas ('80 lavados', '1 paquete') van a bloques con
+    unidad '-' según su número, y las filas sin cantidad reconocible no entran en
+    ningún bloque.
+
+    Parámetros:
+    -----------
+    df : pd.DataFrame
+        Productos con la columna de formato (o de nombre, si no hay formato)
+    columna_formato : str
+        Columna de la que se extraen cantidad y unidad (si no existe, se usa el nombre)
+
+    Retorna:
+    --------
+    dict : {(unidad, cantidad): array de posiciones de fila}
+    """
+    nombres = df['nombre'].reset_index(drop=True)
+    if columna_formato in df.columns:
+        formatos = df[columna_formato].reset_index(drop=True)
+        envases = cantidades_envase(formatos, nombres)
+    else:
+        formatos = nombres
+        envases = cantidades_envase(nombres)
+    cantidades = envases['cantidad'].to_numpy(dtype=np.float64, copy=True)
+    unidades = envases['unidad'].astype(object).fillna('-').to_numpy()
+
+    # Sin medida ni unidades: número de piezas del formato, en bloques sin unidad
+    sin_cantidad = np.isnan(cantidades)
+    if sin_cantidad.any():
+        piezas = parse_product_formats(formatos[sin_cantidad], from_format=columna_formato in df.columns)
+        cantidades[sin_cantidad] = np.where(piezas['unidad'].isna(), piezas['cantidad'], np.nan)
+
+    # Cada cantidad distinta se redondea una sola vez
+    codigos, valores = pd.factorize(cantidades)
+    claves = np.array([clave_cantidad(c) for c in valores] + [None], dtype=object)[codigos]
+
+    bloques = defaultdict(list)
+    for posicion, (unidad, cantidad) in enumerate(zip(unidades, claves)):
+        if cantidad is not None:
+            bloques[(unidad, cantidad)].append(posicion)
+    return {clave: np.array(posiciones) for clave, posiciones in bloques.items()}
+
+
+def _puntuar_bloque(posiciones, tiendas, rasgos, umbral, mutuo):
+    """
+    Empareja las filas de un bloque entre cada pareja de supermercados.
+
+    Retorna una lista de (posicion_a, posicion_b, similitud).
+    """
+    por_tienda = defaultdict(list)
+    for posicion in posiciones:
+        por_tienda[tiendas[posicion]].append(posicion)
+
+    parejas = []
+    for tienda_a, tienda_b in combinations(por_tienda, 2):
+        # Índice invertido de los rasgos de la tienda b dentro del bloque
+        indice = defaultdict(list)
+        for posicion in por_tienda[tienda_b]:
+            for rasgo in rasgos[posicion]:
+                indice[rasgo].append(posicion)
+
+        mejor_a, mejor_b = {}, {}
+        for a in por_tienda[tienda_a]:
+            rasgos_a = rasgos[a]
+            if not rasgos_a:
+                continue
+            comunes = defaultdict(int)
+            for rasgo in rasgos_a:
+                for b in indice.get(rasgo, ()):
+                    comunes[b] += 1
+            for b, interseccion in comunes.items():
+                similitud = interseccion / (len(rasgos_a) + len(rasgos[b]) - interseccion)
+                if similitud < umbral:
+                    continue
+                if similitud > mejor_a.get(a, (None, -1))[1]:
+                    mejor_a[a] = (b, similitud)
+                if similitud > mejor_b.get(b, (None, -1))[1]:
+                    mejor_b[b] = (a, similitud)
+
+        for a, (b, similitud) in mejor_a.items():
+            # Con mutuo=True solo se queda la pareja si cada uno es el mejor candidato del otro
+            if not mutuo or mejor_b[b][0] == a:
+                parejas.append((a, b, similitud))
+    return parejas
+
+
+def emparejar_productos(df, umbral=0.5, metodo='tokens', mutuo=True, columna_supermercado='supermercado'):
+    """
+    Enlaza productos equivalentes de distintos supermercados.
+
+    Parámetros:
+    -----------
+    df : pd.DataFrame
+        Productos de todas las tiendas (como df_completo), con nombre, formato y supermercado
+    umbral : float
+        Similitud de Jaccard mínima (0-1) para aceptar una pareja
+    metodo : str
+        'tokens' (palabras del nombre) o 'trigramas' (trigramas de caracteres, más
+        tolerante con plurales y erratas)
+    mutuo : bool
+        Si es True, solo se devuelven parejas en las que cada producto es el mejor
+        candidato del otro (un producto tiene como mucho una pareja por tienda)
+    columna_supermercado : str
+        Columna que identifica la tienda
+
+    Retorna:
+    --------
+    pd.DataFrame : Una fila por pareja con el índice, supermercado y nombre de cada
+    producto, la unidad y cantidad del bloque y la similitud, ordenadas por similitud
+
+    Ejemplo:
+    --------
+    >>> parejas = emparejar_productos(df_completo, umbral=0.6)
+    >>> parejas[(parejas.supermercado_a == 'Mercadona') & (parejas.supermercado_b == 'Consum')]
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método no soportado: {metodo} (usa {', '.join(METODOS)})")
+    extraer_rasgos = rasgos_tokens if metodo == 'tokens' else rasgos_trigramas
+
+    nombres = df['nombre'].tolist()
+    tiendas = df[columna_supermercado].astype(object).tolist()
+
+    # Los rasgos de cada nombre distinto se calculan una sola vez
+    rasgos_por_nombre = {}
+    rasgos = []
+    for nombre in nombres:
+        if nombre not in rasgos_por_nombre:
+            rasgos_por_nombre[nombre] = extraer_rasgos(nombre) if isinstance(nombre, str) else frozenset()
+        rasgos.append(rasgos_por_nombre[nombre])
+
+    filas = []
+    for (unidad, cantidad), posiciones in bloques_por_formato(df).items():
+        if len({tiendas[p] for p in posiciones}) < 2:
+            continue
+        for a, b, similitud in _puntuar_bloque(posiciones, tiendas, rasgos, umbral, mutuo):
+            filas.append((a, b, unidad, float(cantidad), similitud))
+
+    columnas = ['indice_a', 'supermercado_a', 'nombre_a', 'indice_b', 'supermercado_b', 'nombre_b',
+                'unidad', 'cantidad', 'similitud']
+    if not filas:
+        return pd.DataFrame(columns=columnas)
+
+    a, b, unidades, cantidades, similitudes = map(list, zip(*filas))
+    parejas = pd.DataFrame({
+        'indice_a': df.index[a],
+        'supermercado_a': [tiendas[p] for p in a],
+        'nombre_a': [nombres[p] for p in a],
+        'indice_b': df.index[b],
+        'supermercado_b': [tiendas[p] for p in b],
+        'nombre_b': [nombres[p] for p in b],
+        'unidad': unidades,
+        'cantidad': cantidades,
+        'similitud': similitudes,
+    })
+    return parejas.sort_values('similitud', ascending=False, kind='stable', ignore_index=True)
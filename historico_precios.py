@@ -0,0 +1,292 @@
+"""
+Histórico de precios a partir de las extracciones de los scrapers.
+
+Cada extracción completa de un supermercado se compara con el estado anterior y
+solo se guardan las filas que cambian: productos nuevos, productos con otro
+precio o promoción y productos que desaparecen. Así el histórico diario crece con
+el número de cambios y no con una copia del catálogo por día.
+
+Estructura en disco (ruta por defecto data/Historico):
+
+    <supermercado>/<fecha>.parquet    cambios de esa fecha (una partición por día)
+    <supermercado>/indice.csv         clave de producto -> fechas en las que cambió
+    <supermercado>/estado.parquet     hash de los campos vigentes de cada producto
+
+Las particiones y el índice solo se amplían; el estado se reescribe en cada
+extracción (tiene una fila por producto activo). Como una fecha registrada no se
+puede sustituir, antes de escribir nada se rechazan las extracciones sin la clave
+o algún campo a comparar, las vacías y las que darían de baja una parte
+inverosímil del catálogo (una extracción cortada).
+
+Uso:
+    from historico_precios import HistoricoPrecios
+
+    historico = HistoricoPrecios()
+    historico.registrar('consum', 'productos_consum_20251018.csv')
+    historico.a_fecha('consum', '2025-10-18')        # catálogo vigente ese día
+    historico.historial('consum', '7092138')         # cambios de un producto
+
+    python historico_precios.py consum productos_consum_20251018.csv [2025-10-18]
+"""
+
+import csv
+import sys
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+
+RUTA_HISTORICO = Path('data/Historico')
+
+# Valores de la clave que no identifican a ningún producto
+CLAVES_VACIAS = {'', 'N/A'}
+
+# Proporción de productos del estado anterior que una extracción puede dar de baja
+MAX_PROPORCION_BAJAS = 0.5
+
+
+def comprobar_columnas(cabecera, requeridas, origen):
+    """Lanza ValueError si a la cabecera de una extracción le falta alguna columna requerida"""
+    faltan = [c for c in requeridas if c not in cabecera]
+    if faltan:
+        raise ValueError(f"{origen}: faltan las columnas {', '.join(faltan)}")
+
+
+def clave_nombre_formato(nombre, texto_completo):
+    """
+    Clave de un producto de Mercadona sin imagen: su nombre y su formato (la segunda
+    línea de la tarjeta, 'Garrafa 5 L'), que no cambian con el precio
+    """
+    lineas = texto_completo.split('\n')
+    formato = lineas[1].strip() if len(lineas) > 1 else ''
+    return f"{nombre.strip()} | {formato}"
+
+
+# Por supermercado: clave del producto, campos cuyo cambio se registra, campos
+# descriptivos que se guardan con cada cambio y columna con la fecha de extracción.
+# 'respaldo' (opcional) son las columnas y la función que dan la clave de las filas
+# en las que falta la principal
+CONFIG_SUPERMERCADOS = {
+    'consum': {
+        'clave': 'codigo_producto',
+        'comparar': ['precio_actual', 'precio_anterior', 'precio_por_unidad', 'promocion'],
+        'descriptivos': ['nombre', 'marca', 'categoria'],
+        'fecha': 'fecha_extraccion',
+    },
+    'carrefour': {
+        'clave': 'item_id',
+        'comparar': ['price', 'discount', 'coupon'],
+        'descriptivos': ['item_name', 'item_brand', 'item_category'],
+        'fecha': None,
+    },
+    'mercadona': {
+        # La imagen identifica al producto: es la única URL propia de cada uno en el scraper;
+        # si falta, se usan el nombre y el formato
+        'clave': 'imagen_url',
+        'respaldo': (['nombre', 'texto_completo'], clave_nombre_formato),
+        'comparar': ['precio', 'precio_unidad'],
+        'descriptivos': ['nombre', 'texto_completo', 'categoria_url'],
+        'fecha': None,
+    },
+}
+
+# Tipo de cada fila guardada
+ALTA, CAMBIO, BAJA = 'alta', 'cambio', 'baja'
+
+
+def claves_producto(df, config):
+    """
+    Clave de cada fila de una extracción: la columna clave o, si está vacía o es 'N/A'
+    y el supermercado tiene respaldo, la que da su función de respaldo
+    """
+    claves = df[config['clave']] if config['clave'] in df.columns else pd.Series('', index=df.index)
+    if 'respaldo' not in config:
+        return claves
+
+    columnas, funcion = config['respaldo']
+    vacias = claves.isin(CLAVES_VACIAS)
+    if not vacias.any():
+        return claves
+    valores = df.loc[vacias].reindex(columns=columnas, fill_value='')
+    respaldo = [funcion(*fila) for fila in zip(*(valores[columna] for columna in columnas))]
+    return claves.mask(vacias, pd.Series(respaldo, index=valores.index, dtype=object))
+
+
+def leer_extraccion(origen):
+    """
+    Lee una extracción como texto, sin convertir tipos (los códigos con ceros a la
+    izquierda y los precios con coma se comparan tal cual)
+    """
+    if isinstance(origen, pd.DataFrame):
+        return origen.astype(str).where(origen.notna(), '')
+    return pd.read_csv(origen, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+
+
+class HistoricoPrecios:
+    """
+    Almacén de precios que solo añade las filas que cambian entre extracciones.
+
+    Parámetros:
+    -----------
+    ruta : str o Path
+        Carpeta raíz del histórico
+    config : dict
+        Configuración por supermercado (ver CONFIG_SUPERMERCADOS)
+    """
+
+    def __init__(self, ruta=RUTA_HISTORICO, config=CONFIG_SUPERMERCADOS):
+        self.ruta = Path(ruta)
+        self.config = config
+        self._indices = {}
+
+    def _carpeta(self, supermercado):
+        if supermercado not in self.config:
+            raise ValueError(f"Supermercado sin configuración: {supermercado} (usa {', '.join(self.config)})")
+        return self.ruta / supermercado
+
+    def fechas(self, supermercado):
+        """Fechas registradas de un supermercado, en orden"""
+        carpeta = self._carpeta(supermercado)
+        if not carpeta.exists():
+            return []
+        return sorted(archivo.stem for archivo in carpeta.glob('*.parquet') if archivo.stem != 'estado')
+
+    def _indice(self, supermercado):
+        """Índice clave -> lista de fechas con cambios, leído una vez y ampliado en memoria"""
+        if supermercado not in self._indices:
+            indice = defaultdict(list)
+            archivo = self._carpeta(supermercado) / 'indice.csv'
+            if archivo.exists():
+                with open(archivo, newline='', encoding='utf-8') as f:
+                    for clave, fecha in csv.reader(f):
+                        indice[clave].append(fecha)
+            self._indices[supermercado] = indice
+        return self._indices[supermercado]
+
+    def _leer_estado(self, carpeta):
+        archivo = carpeta / 'estado.parquet'
+        if not archivo.exists():
+            return pd.Series(dtype='uint64', name='hash')
+        return pd.read_parquet(archivo)['hash']
+
+    def registrar(self, supermercado, extraccion, fecha=None, max_bajas=MAX_PROPORCION_BAJAS):
+        """
+        Añade una extracción completa al histórico guardando solo los cambios.
+
+        Parámetros:
+        -----------
+        supermercado : str
+            'consum', 'carrefour' o 'mercadona'
+        extraccion : str, Path o pd.DataFrame
+            CSV generado por el scraper (o el DataFrame ya cargado)
+        fecha : str
+            Fecha de la extracción (YYYY-MM-DD); por defecto la de la columna de
+            fecha del scraper o, si no tiene, la de hoy
+        max_bajas : float
+            Proporción máxima del catálogo anterior que puede desaparecer; por
+            encima se lanza ValueError (1 para aceptar cualquier número de bajas)
+
+        Retorna:
+        --------
+        dict : Número de altas, cambios y bajas guardados
+        """
+        config = self.config[supermercado]
+        carpeta = self._carpeta(supermercado)
+        df = leer_extraccion(extraccion)
+        origen = extraccion if isinstance(extraccion, (str, Path)) else supermercado
+        comprobar_columnas(df.columns, [config['clave']] + config['comparar'], origen)
+
+        if fecha is None:
+            if config['fecha'] and config['fecha'] in df.columns and len(df):
+                fecha = str(df[config['fecha']].max())[:10]
+            else:
+                fecha = date.today().isoformat()
+        fecha = pd.Timestamp(fecha).date().isoformat()
+
+        # El histórico solo se amplía hacia delante
+        fechas = self.fechas(supermercado)
+        if fechas and fecha <= fechas[-1]:
+            raise ValueError(f"{supermercado}: ya hay datos del {fechas[-1]}, no se puede registrar el {fecha}")
+
+        # Un producto que aparece en varias categorías se guarda una sola vez
+        claves = claves_producto(df, config)
+        columnas = [config['clave']] + config['comparar'] + [c for c in config['descriptivos'] if c in df.columns]
+        df = df.reindex(columns=columnas, fill_value='')
+        df[config['clave']] = claves
+        df = df[~claves.isin(CLAVES_VACIAS)].drop_duplicates(config['clave']).set_index(config['clave'])
+        df.index.name = 'clave'
+        if df.empty:
+            raise ValueError(f"{origen}: la extracción no tiene ningún producto")
+
+        hashes = pd.util.hash_pandas_object(df[config['comparar']], index=False)
+        estado = self._leer_estado(carpeta)
+
+        anterior = hashes.index.isin(estado.index)
+        altas = df[~anterior]
+        comunes = hashes[anterior]
+        cambios = df.loc[comunes.index[comunes.to_numpy() != estado.loc[comunes.index].to_numpy()]]
+        bajas = pd.DataFrame(index=estado.index[~estado.index.isin(hashes.index)], columns=df.columns).fillna('')
+        if len(estado) and len(bajas) > max_bajas * len(estado):
+            raise ValueError(f"{origen}: desaparecerían {len(bajas)} de {len(estado)} productos "
+                             f"(máximo {max_bajas:.0%}); si es correcto, usa un max_bajas mayor")
+
+        filas = pd.concat([altas.assign(tipo=ALTA), cambios.assign(tipo=CAMBIO), bajas.assign(tipo=BAJA)])
+        filas.index.name = 'clave'
+        filas.insert(0, 'fecha', fecha)
+
+        carpeta.mkdir(parents=True, exist_ok=True)
+        filas.reset_index().to_parquet(carpeta / f"{fecha}.parquet", index=False)
+
+        # El índice se carga antes de ampliar el archivo para no contar dos veces estas filas
+        indice = self._indice(supermercado)
+        with open(carpeta / 'indice.csv', 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows((clave, fecha) for clave in filas.index)
+        for clave in filas.index:
+            indice[clave].append(fecha)
+
+        hashes.rename('hash').to_frame().to_parquet(carpeta / 'estado.parquet')
+
+        return {ALTA: len(altas), CAMBIO: len(cambios), BAJA: len(bajas)}
+
+    def _leer_particiones(self, supermercado, fechas, claves=None):
+        carpeta = self._carpeta(supermercado)
+        filtros = [('clave', 'in', list(claves))] if claves is not None else None
+        partes = [pd.read_parquet(carpeta / f"{fecha}.parquet", filters=filtros) for fecha in fechas]
+        if not partes:
+            return pd.DataFrame(columns=['fecha', 'clave', 'tipo'])
+        return pd.concat(partes, ignore_index=True)
+
+    def a_fecha(self, supermercado, fecha):
+        """
+        Catálogo vigente en una fecha: la última versión de cada producto registrada
+        hasta ese día, sin los que ya habían desaparecido
+
+        Retorna:
+        --------
+        pd.DataFrame : Una fila por producto, con la fecha de su último cambio
+        """
+        fecha = pd.Timestamp(fecha).date().isoformat()
+        filas = self._leer_particiones(supermercado, [f for f in self.fechas(supermercado) if f <= fecha])
+        vigentes = filas.drop_duplicates('clave', keep='last')
+        return vigentes[vigentes['tipo'] != BAJA].reset_index(drop=True)
+
+    def historial(self, supermercado, clave):
+        """
+        Todas las versiones de un producto en orden de fecha
+
+        Solo se leen las particiones en las que el índice dice que el producto cambió.
+        Los productos guardados con la clave de respaldo se piden con ella (en
+        Mercadona, 'Nombre | Formato').
+        """
+        clave = str(clave)
+        fechas = self._indice(supermercado).get(clave, [])
+        return self._leer_particiones(supermercado, fechas, claves=[clave])
+
+
+if __name__ == "__main__":
+    supermercado, archivo = sys.argv[1], sys.argv[2]
+    fecha = sys.argv[3] if len(sys.argv) > 3 else None
+    resumen = HistoricoPrecios().registrar(supermercado, archivo, fecha)
+    print(f"✓ {supermercado}: {resumen[ALTA]} altas, {resumen[CAMBIO]} cambios, {resumen[BAJA]} bajas")
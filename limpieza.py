@@ -0,0 +1,241 @@
+"""
+Limpieza de los datasets de Mercadona, Consum y Carrefour en paralelo.
+
+Reproduce los pasos de la Fase 1 de EDA_supermercados.ipynb y genera los mismos
+archivos de data/Clean_Data. Los tres supermercados se limpian a la vez y los
+pasos con expresiones regulares de utils (marca, formato y cantidad) se reparten
+en trozos entre un pool de procesos; los trozos se vuelven a unir en su orden
+original, por lo que el resultado no depende del número de procesos.
+
+Uso:
+    python limpieza.py            # todos los núcleos disponibles
+    python limpieza.py 1          # en serie, sin procesos auxiliares
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils import (extraer_formatos_serie, extraer_marcas_serie, guardar_parquet_clean, marcas_conocidas,
+                   parse_product_formats)
+
+
+RUTA_RAW = Path('data/Raw_Data')
+RUTA_CLEAN = Path('data/Clean_Data')
+
+# Por debajo de este número de filas no compensa enviar trozos a otros procesos
+MIN_FILAS_TROZO = 2000
+
+
+def mapear_serie(funcion, serie):
+    """Aplica una función por lotes de utils a una Serie completa en el proceso actual"""
+    return funcion(serie)
+
+
+class MapeadorParalelo:
+    """
+    Aplica funciones por lotes de utils repartiendo la Serie en trozos entre procesos.
+    
+    Parámetros:
+    -----------
+    executor : ProcessPoolExecutor
+        Pool de procesos compartido por todos los supermercados
+    num_trozos : int
+        Número de trozos en los que se divide cada Serie
+    """
+    
+    def __init__(self, executor, num_trozos):
+        self.executor = executor
+        self.num_trozos = num_trozos
+    
+    def __call__(self, funcion, serie):
+        num_trozos = min(self.num_trozos, max(1, len(serie) // MIN_FILAS_TROZO))
+        if num_trozos <= 1:
+            return funcion(serie)
+        
+        limites = np.array_split(np.arange(len(serie)), num_trozos)
+        futuros = [self.executor.submit(funcion, serie.iloc[posiciones]) for posiciones in limites]
+        # Se concatena en el orden de los trozos, no en el de finalización
+        return pd.concat([futuro.result() for futuro in futuros])
+
+
+def normalizar_nombre(nombres):
+    """Pasa el nombre a minúsculas y elimina las tildes de las vocales"""
+    return (nombres.str.lower().str.replace("á", "a").str.replace("é", "e").str.replace("í", "i")
+            .str.replace("ó", "o").str.replace("ú", "u"))
+
+
+def limpiar_mercadona(ruta_raw=RUTA_RAW, mapear=mapear_serie):
+    """
+    Depuración y limpieza del dataset de Mercadona.
+    
+    Retorna:
+    --------
+    pd.DataFrame : Dataset limpio (nombre, formato, precio, precio_ud/Kg/L, marca, categoria, subcategoria)
+    """
+    ruta_raw = Path(ruta_raw)
+    df = pd.read_csv(ruta_raw / "Mercadona/mercadona_raw.csv")
+    df_categorias = pd.read_csv(ruta_raw / "Mercadona/mercadona_categorias_grupos.csv")
+    
+    # Merge del dataset y las categorias
+    df = df.merge(df_categorias, left_on="categoria_url", right_on="URL", how="left")
+    
+    # Se genera una nueva columna con el formato y se eliminan las columnas sin información útil
+    df.insert(3, "formato", df["texto_completo"].str.split("\n").str[1])
+    df.drop(columns=["elemento_id", "texto_completo", "imagen_url", "categoria_url", "categoria_nombre", "URL"], inplace=True)
+    df.rename(columns={"precio_unidad": "precio_ud/Kg/L", "GrupoPrincipal": "categoria",
+                       "NombreCategoria": "subcategoria"}, inplace=True)
+    
+    # Precio a float y precio por ud/Kg/L
+    df["precio"] = df["precio"].str.extract(r"(\d+,\d{2})")[0].str.replace(',', '.').astype(float)
+    formatos = mapear(partial(parse_product_formats, from_format=True), df["formato"])
+    df["precio_ud/Kg/L"] = df["precio"] / formatos["cantidad"]
+    
+    # Marca a partir del nombre
+    df["marca"] = mapear(partial(extraer_marcas_serie, marcas_conocidas=marcas_conocidas), df["nombre"])
+    
+    # Estandarización de categorías y nombre
+    df["categoria"] = df["categoria"].str.lower()
+    df["subcategoria"] = df["subcategoria"].str.lower()
+    df["nombre"] = normalizar_nombre(df["nombre"])
+    return df
+
+
+def limpiar_consum(ruta_raw=RUTA_RAW, mapear=mapear_serie):
+    """
+    Depuración y limpieza del dataset de Consum.
+    
+    Retorna:
+    --------
+    pd.DataFrame : Dataset limpio (nombre, formato, precio, precio_ud/Kg/L, marca, categoria)
+    """
+    df = pd.read_csv(Path(ruta_raw) / "Consum/consum_raw.csv")
+    
+    df.drop(columns=["codigo_producto", "precio_anterior", "promocion", "patrocinado", "imagen_url", "fecha_extraccion"], inplace=True)
+    df.rename(columns={"precio_actual": "precio", "precio_por_unidad": "precio_ud/Kg/L"}, inplace=True)
+    
+    # Columnas de precio a float
+    df["precio"] = df["precio"].str.replace(",", ".").str.replace("€", "").astype(float)
+    df["precio_ud/Kg/L"] = df["precio_ud/Kg/L"].str.extract(r'([\d,]+)\s*€')[0].str.replace(',', '.').astype(float)
+    
+    # Nombres vacíos a partir de la url y marca desconocida
+    df['nombre'] = df['nombre'].fillna(df['producto_url'].str.split('/').str[-2].str.replace('-', ' ').str.title())
+    df.drop(columns=["producto_url"], inplace=True)
+    df["marca"] = df["marca"].fillna("Desconocida")
+    
+    # Formato a partir del nombre
+    df.insert(2, "formato", mapear(extraer_formatos_serie, df['nombre']))
+    df["formato"] = df["formato"].fillna("1 paquete")
+    
+    # Estandarización de categoría y nombre
+    df["categoria"] = df["categoria"].str.lower()
+    df["nombre"] = normalizar_nombre(df["nombre"])
+    return df[["nombre", "formato", "precio", "precio_ud/Kg/L", "marca", "categoria"]]
+
+
+def limpiar_carrefour(ruta_raw=RUTA_RAW, mapear=mapear_serie):
+    """
+    Depuración y limpieza del dataset de Carrefour.
+    
+    Retorna:
+    --------
+    pd.DataFrame : Dataset limpio (nombre, formato, precio, precio_ud/Kg/L, marca, categoria)
+    """
+    df = pd.read_csv(Path(ruta_raw) / "Carrefour/carrefour_raw.csv")
+    
+    df.drop(columns=["item_id", "item_ean", "currency", "quantity", "discount", "archivo_origen", "carpeta_origen", "coupon",
+                     "index", "item_internal_id", "item_list_name", "item_provider", "item_provider_type", "item_shipping",
+                     "item_sms", "item_variant"], inplace=True)
+    df.rename(columns={"item_name": "nombre", "price": "precio", "item_brand": "marca",
+                       "item_category": "categoria"}, inplace=True)
+    df.drop(df[df["nombre"].isna()].index, inplace=True)
+    
+    # Formato de las columnas
+    df["categoria"] = df["categoria"].str.extract(r'(cat\d+)([\w-]+)')[1].str.replace("-", "")
+    df["marca"] = df["marca"].str.replace("-", " ")
+    df["nombre"] = df["nombre"].str.replace("-", " ")
+    
+    # Marcas vacías a partir del nombre
+    mask = df["marca"].isna()
+    df.loc[mask, "marca"] = mapear(partial(extraer_marcas_serie, marcas_conocidas=marcas_conocidas), df.loc[mask, "nombre"])
+    
+    # Formato y precio por ud/Kg/L en la misma pasada
+    formatos = mapear(partial(parse_product_formats, default_format="1 paquete"), df['nombre'])
+    df.insert(1, "formato", formatos["formato"])
+    df.insert(3, "precio_ud/Kg/L", df["precio"] / formatos["cantidad"])
+    
+    # Estandarización de categoría y nombre
+    df["categoria"] = df["categoria"].str.lower()
+    df["nombre"] = normalizar_nombre(df["nombre"])
+    return df
+
+
+LIMPIADORES = {
+    'mercadona': limpiar_mercadona,
+    'consum': limpiar_consum,
+    'carrefour': limpiar_carrefour,
+}
+
+
+def limpiar_supermercados(procesos=None, ruta_raw=RUTA_RAW, ruta_clean=RUTA_CLEAN, guardar=True, parquet=True):
+    """
+    Limpia los tres supermercados a la vez y guarda los CSV en ruta_clean.
+    
+    Junto a cada CSV se guarda una copia en Parquet con tipos explícitos (categóricas
+    para el texto repetido y float64 para los precios), que es la que lee
+    utils.cargar_dataset_limpio.
+    
+    Parámetros:
+    -----------
+    procesos : int
+        Número de procesos para los pasos con expresiones regulares (None = todos los núcleos,
+        1 = todo en el proceso actual)
+    ruta_raw : str o Path
+        Carpeta con los datos originales
+    ruta_clean : str o Path
+        Carpeta donde se guardan los datasets limpios
+    guardar : bool
+        Si es False solo se devuelven los DataFrames
+    parquet : bool
+        Si es False solo se guardan los CSV (también se omite si pyarrow no está instalado)
+        
+    Retorna:
+    --------
+    dict : {'mercadona': df, 'consum': df, 'carrefour': df}
+    """
+    procesos = procesos or os.cpu_count() or 1
+    
+    if procesos == 1:
+        resultados = {nombre: limpiar(ruta_raw) for nombre, limpiar in LIMPIADORES.items()}
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as executor:
+            mapear = MapeadorParalelo(executor, num_trozos=procesos)
+            # El código pandas de cada supermercado corre en su propio hilo y el trabajo
+            # pesado de los tres se reparte en el mismo pool de procesos
+            with ThreadPoolExecutor(max_workers=len(LIMPIADORES)) as hilos:
+                futuros = {nombre: hilos.submit(limpiar, ruta_raw, mapear) for nombre, limpiar in LIMPIADORES.items()}
+                resultados = {nombre: futuro.result() for nombre, futuro in futuros.items()}
+    
+    if guardar:
+        ruta_clean = Path(ruta_clean)
+        ruta_clean.mkdir(parents=True, exist_ok=True)
+        for nombre, df in resultados.items():
+            df.to_csv(ruta_clean / f"{nombre}.csv", index=False)
+        if parquet:
+            try:
+                for nombre, df in resultados.items():
+                    guardar_parquet_clean(df, ruta_clean / f"{nombre}.parquet")
+            except ImportError:
+                print("⚠ pyarrow no está instalado: solo se guardan los CSV")
+    
+    return resultados
+
+
+if __name__ == "__main__":
+    procesos = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    limpiar_supermercados(procesos)
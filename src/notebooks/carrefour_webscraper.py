@@ -0,0 +1,383 @@
+"""
+Extracción de productos de Carrefour a partir de las páginas HTML guardadas
+
+Cada página del supermercado incluye el array window["impressions"] con los
+productos listados; este script lo extrae de todos los archivos de una carpeta
+(una subcarpeta por categoría) y genera un único CSV.
+"""
+
+import os
+import json
+import csv
+import mmap
+import codecs
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Marcador del array de productos dentro de la página
+MARCADOR_IMPRESSIONS = b'window["impressions"]'
+
+# Tamaño del primer bloque leído al decodificar el JSON (se duplica si no basta)
+TAM_BLOQUE_JSON = 64 * 1024
+
+EXTENSIONES_HTML = ('.html', '.htm')
+
+# Versión del formato del manifiesto (si cambia, se reprocesa todo)
+VERSION_MANIFIESTO = 2
+
+# Campos importantes primero en el CSV
+CAMPOS_PRIORITARIOS = ['item_name', 'item_id', 'item_ean', 'price', 'currency',
+                       'item_brand', 'item_category', 'quantity', 'discount']
+
+# Columnas conocidas del array impressions (el resto, alfabéticamente)
+CAMPOS_CARREFOUR = CAMPOS_PRIORITARIOS + [
+    'archivo_origen', 'carpeta_origen', 'coupon', 'index', 'item_internal_id', 'item_list_name',
+    'item_provider', 'item_provider_type', 'item_shipping', 'item_sms', 'item_variant',
+]
+
+def decodificar_array_json(contenido, inicio):
+    """
+    Decodifica el array JSON que empieza en la posición inicio de un buffer de bytes
+    
+    Lee bloques cada vez mayores y se detiene en el corchete de cierre del array,
+    sin convertir a texto el resto de la página
+    """
+    decodificador = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    texto = ''
+    posicion = inicio
+    tam_bloque = TAM_BLOQUE_JSON
+    
+    while True:
+        bloque = contenido[posicion:posicion + tam_bloque]
+        posicion += len(bloque)
+        fin_archivo = posicion >= len(contenido)
+        texto += utf8.decode(bloque, final=fin_archivo)
+        
+        try:
+            productos, _ = decodificador.raw_decode(texto)
+            return productos
+        except json.JSONDecodeError:
+            if fin_archivo:
+                raise
+            tam_bloque *= 2
+
+def extraer_productos_de_html(ruta_archivo, lanzar_errores=False):
+    """
+    Extrae los productos del array 'impressions' dentro del archivo HTML
+    
+    El archivo se proyecta en memoria (mmap) y el marcador se busca como bytes, así
+    que nunca se carga la página completa en un str ni se recorre con expresiones regulares
+    
+    Si el archivo no se puede leer o el JSON está roto devuelve una lista vacía,
+    salvo con lanzar_errores=True, que deja pasar la excepción
+    """
+    try:
+        with open(ruta_archivo, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as contenido:
+            # Buscar el patrón window["impressions"]=[...]
+            inicio = contenido.find(MARCADOR_IMPRESSIONS)
+            while inicio != -1:
+                posicion = inicio + len(MARCADOR_IMPRESSIONS)
+                
+                # Saltar espacios, el '=' y más espacios hasta el '['
+                while contenido[posicion:posicion + 1].isspace():
+                    posicion += 1
+                if contenido[posicion:posicion + 1] == b'=':
+                    posicion += 1
+                    while contenido[posicion:posicion + 1].isspace():
+                        posicion += 1
+                    if contenido[posicion:posicion + 1] == b'[':
+                        return decodificar_array_json(contenido, posicion)
+                
+                inicio = contenido.find(MARCADOR_IMPRESSIONS, posicion)
+        
+        print(f"No se encontraron productos en: {ruta_archivo}")
+        return []
+    
+    except Exception as e:
+        if lanzar_errores:
+            raise
+        print(f"Error al procesar {ruta_archivo}: {str(e)}")
+        return []
+
+def procesar_archivo(archivo, carpeta_madre, lanzar_errores=False):
+    """
+    Extrae los productos de un archivo y les añade el archivo y la carpeta (categoría) de origen
+    """
+    archivo = Path(archivo)
+    productos = extraer_productos_de_html(archivo, lanzar_errores)
+    
+    for producto in productos:
+        producto['archivo_origen'] = str(archivo.relative_to(carpeta_madre))
+        producto['carpeta_origen'] = str(archivo.parent.relative_to(carpeta_madre))
+    
+    return productos
+
+def procesar_archivo_con_error(archivo, carpeta_madre):
+    """
+    Como procesar_archivo, pero devuelve (productos, error) en lugar de ocultar los fallos
+    
+    error es None si la extracción fue bien (aunque no haya productos) o el texto de la excepción
+    """
+    try:
+        return procesar_archivo(archivo, carpeta_madre, lanzar_errores=True), None
+    except Exception as e:
+        return [], f"{type(e).__name__}: {e}"
+
+def recorrer_html(carpeta):
+    """
+    Recorre la carpeta y sus subcarpetas devolviendo los archivos HTML según se encuentran
+    
+    Las entradas de cada carpeta se visitan ordenadas por nombre para que el orden
+    sea el mismo en cualquier sistema operativo
+    """
+    with os.scandir(carpeta) as entradas:
+        entradas = sorted(entradas, key=lambda entrada: entrada.name)
+    
+    for entrada in entradas:
+        if entrada.is_dir():
+            yield from recorrer_html(entrada.path)
+        elif entrada.name.lower().endswith(EXTENSIONES_HTML):
+            yield Path(entrada.path)
+
+def procesar_carpetas(carpeta_madre, archivo_salida):
+    """
+    Procesa todos los archivos HTML en la carpeta madre y sus subcarpetas
+    """
+    todos_productos = []
+    campos_unicos = set()
+    
+    # Recorrer todos los archivos HTML
+    carpeta_path = Path(carpeta_madre)
+    archivos_html = list(carpeta_path.rglob('*.html')) + list(carpeta_path.rglob('*.htm'))
+    
+    print(f"Encontrados {len(archivos_html)} archivos HTML")
+    
+    for idx, archivo in enumerate(archivos_html, 1):
+        print(f"Procesando ({idx}/{len(archivos_html)}): {archivo}")
+        productos = procesar_archivo(archivo, carpeta_madre)
+        
+        # Recopilar todos los campos únicos
+        for producto in productos:
+            campos_unicos.update(producto.keys())
+        
+        todos_productos.extend(productos)
+    
+    print(f"\nTotal de productos extraídos: {len(todos_productos)}")
+    
+    # Ordenar campos para el CSV (campos importantes primero)
+    campos_ordenados = []
+    for campo in CAMPOS_PRIORITARIOS:
+        if campo in campos_unicos:
+            campos_ordenados.append(campo)
+            campos_unicos.remove(campo)
+    
+    # Añadir el resto de campos alfabéticamente
+    campos_ordenados.extend(sorted(campos_unicos))
+    
+    # Escribir CSV
+    with open(archivo_salida, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=campos_ordenados, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(todos_productos)
+    
+    print(f"\nArchivo CSV generado: {archivo_salida}")
+    print(f"Campos incluidos: {len(campos_ordenados)}")
+    print(f"Productos guardados: {len(todos_productos)}")
+
+def procesar_carpetas_paralelo(carpeta_madre, archivo_salida, procesos=None, campos=CAMPOS_CARREFOUR):
+    """
+    Versión en paralelo de procesar_carpetas
+    
+    Los archivos se envían a un pool de procesos según se van encontrando y los
+    productos se escriben en el CSV en cuanto llegan, siempre en el orden del
+    recorrido de carpetas. Como el CSV se escribe sobre la marcha, las columnas se
+    fijan de antemano (campos); los campos nuevos que no estén en la lista se avisan
+    y se descartan
+    """
+    procesos = procesos or os.cpu_count() or 1
+    # Archivos en vuelo como máximo: mantiene la memoria acotada aunque el disco vaya por delante
+    max_pendientes = procesos * 4
+    
+    total_archivos = 0
+    total_productos = 0
+    campos_descartados = set()
+    
+    def escribir(productos):
+        for producto in productos:
+            nuevos = producto.keys() - set(campos) - campos_descartados
+            if nuevos:
+                print(f"  [ATENCIÓN] Campos no incluidos en el CSV: {sorted(nuevos)}")
+                campos_descartados.update(nuevos)
+        writer.writerows(productos)
+        return len(productos)
+    
+    with open(archivo_salida, 'w', newline='', encoding='utf-8-sig') as f, \
+            ProcessPoolExecutor(max_workers=procesos) as executor:
+        writer = csv.DictWriter(f, fieldnames=campos, extrasaction='ignore')
+        writer.writeheader()
+        
+        pendientes = deque()
+        for archivo in recorrer_html(carpeta_madre):
+            pendientes.append((archivo, executor.submit(procesar_archivo, archivo, carpeta_madre)))
+            total_archivos += 1
+            
+            # Se escribe siempre el más antiguo para conservar el orden
+            while len(pendientes) >= max_pendientes:
+                archivo_listo, futuro = pendientes.popleft()
+                total_productos += escribir(futuro.result())
+                print(f"Procesado: {archivo_listo}")
+        
+        while pendientes:
+            archivo_listo, futuro = pendientes.popleft()
+            total_productos += escribir(futuro.result())
+            print(f"Procesado: {archivo_listo}")
+    
+    print(f"\nArchivo CSV generado: {archivo_salida}")
+    print(f"Archivos procesados: {total_archivos}")
+    print(f"Productos guardados: {total_productos}")
+
+def hash_archivo(ruta, tam_bloque=1024 * 1024):
+    """
+    Calcula el sha256 del contenido de un archivo leyéndolo por bloques
+    """
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(tam_bloque), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+def cargar_manifiesto(ruta_manifiesto):
+    """
+    Lee el manifiesto de una ejecución anterior (vacío si no existe o es de otra versión)
+    """
+    try:
+        with open(ruta_manifiesto, encoding='utf-8') as f:
+            manifiesto = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    
+    if manifiesto.get('version') != VERSION_MANIFIESTO:
+        return {}
+    return manifiesto['archivos']
+
+def guardar_manifiesto(ruta_manifiesto, archivos):
+    """
+    Escribe el manifiesto en un archivo temporal y lo renombra, para no dejarlo a medias
+    """
+    temporal = Path(f"{ruta_manifiesto}.tmp")
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump({'version': VERSION_MANIFIESTO, 'archivos': archivos}, f, ensure_ascii=False)
+    os.replace(temporal, ruta_manifiesto)
+
+def procesar_carpetas_incremental(carpeta_madre, archivo_salida, archivo_manifiesto=None,
+                                  procesos=None, campos=CAMPOS_CARREFOUR):
+    """
+    Regenera el CSV reprocesando solo los archivos HTML nuevos o modificados
+    
+    El manifiesto guarda, para cada archivo, su tamaño, fecha de modificación,
+    sha256 y los productos que se extrajeron de él. En cada ejecución:
+    - si el tamaño y la fecha coinciden, se reutilizan sus productos sin leerlo
+    - si no coinciden pero el hash es el mismo (archivo copiado o tocado), también
+    - si el hash cambia o el archivo es nuevo, se vuelve a extraer
+    - si la extracción falló en la ejecución anterior, se vuelve a intentar
+    Los fallos se guardan con su mensaje en 'error' y sin productos, de modo que
+    no se dan por buenos. Los archivos que ya no existen desaparecen del CSV. El CSV se reescribe
+    entero en el orden del recorrido de carpetas, igual que procesar_carpetas_paralelo
+    
+    Parámetros:
+    archivo_manifiesto: por defecto, junto al CSV con extensión .manifiesto.json
+    procesos: procesos para extraer los archivos modificados (None = todos los núcleos)
+    """
+    if archivo_manifiesto is None:
+        archivo_manifiesto = Path(archivo_salida).with_suffix('.manifiesto.json')
+    
+    anterior = cargar_manifiesto(archivo_manifiesto)
+    actual = {}
+    pendientes = []
+    
+    for archivo in recorrer_html(carpeta_madre):
+        clave = archivo.relative_to(carpeta_madre).as_posix()
+        estado = archivo.stat()
+        entrada = anterior.get(clave)
+        if entrada and entrada.get('error'):
+            entrada = None
+        
+        if entrada and entrada['tamano'] == estado.st_size and entrada['mtime_ns'] == estado.st_mtime_ns:
+            actual[clave] = entrada
+            continue
+        
+        sha = hash_archivo(archivo)
+        if entrada and entrada['sha256'] == sha:
+            actual[clave] = dict(entrada, tamano=estado.st_size, mtime_ns=estado.st_mtime_ns)
+            continue
+        
+        actual[clave] = {'tamano': estado.st_size, 'mtime_ns': estado.st_mtime_ns, 'sha256': sha, 'productos': None}
+        pendientes.append((clave, archivo))
+    
+    eliminados = anterior.keys() - actual.keys()
+    print(f"Archivos: {len(actual)} | sin cambios: {len(actual) - len(pendientes)} | "
+          f"a procesar: {len(pendientes)} | eliminados: {len(eliminados)}")
+    
+    # Extraer solo los archivos nuevos, modificados o que fallaron la última vez
+    if len(pendientes) > 1 and procesos != 1:
+        executor = ProcessPoolExecutor(max_workers=procesos)
+        resultados = executor.map(procesar_archivo_con_error, [archivo for _, archivo in pendientes],
+                                  [carpeta_madre] * len(pendientes))
+    else:
+        executor = None
+        resultados = (procesar_archivo_con_error(archivo, carpeta_madre) for _, archivo in pendientes)
+    
+    errores = 0
+    try:
+        for (clave, archivo), (productos, error) in zip(pendientes, resultados):
+            actual[clave]['productos'] = productos
+            if error:
+                actual[clave]['error'] = error
+                errores += 1
+                print(f"Error al procesar {archivo}: {error} (se reintentará en la próxima ejecución)")
+            else:
+                print(f"Procesado: {archivo}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    # Reescribir el CSV completo con las filas guardadas y las nuevas
+    total_productos = 0
+    campos_descartados = set()
+    with open(archivo_salida, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=campos, extrasaction='ignore')
+        writer.writeheader()
+        for entrada in actual.values():
+            for producto in entrada['productos']:
+                nuevos = producto.keys() - set(campos) - campos_descartados
+                if nuevos:
+                    print(f"  [ATENCIÓN] Campos no incluidos en el CSV: {sorted(nuevos)}")
+                    campos_descartados.update(nuevos)
+            writer.writerows(entrada['productos'])
+            total_productos += len(entrada['productos'])
+    
+    guardar_manifiesto(archivo_manifiesto, actual)
+    
+    print(f"\nArchivo CSV generado: {archivo_salida}")
+    print(f"Manifiesto actualizado: {archivo_manifiesto}")
+    print(f"Productos guardados: {total_productos}")
+    if errores:
+        print(f"Archivos con errores (sin productos en el CSV): {errores}")
+
+if __name__ == "__main__":
+    # Configuración
+    CARPETA_MADRE = "Archivos_html"
+    ARCHIVO_SALIDA = "carrefour_raw.csv"
+    PROCESOS = None  # None = todos los núcleos disponibles
+    
+    # Verificar que existe la carpeta
+    if not os.path.exists(CARPETA_MADRE):
+        print(f"ERROR: La carpeta '{CARPETA_MADRE}' no existe")
+        print(f"Ruta buscada: {os.path.abspath(CARPETA_MADRE)}")
+    else:
+        print(f"Procesando carpeta: {os.path.abspath(CARPETA_MADRE)}\n")
+        procesar_carpetas_incremental(CARPETA_MADRE, ARCHIVO_SALIDA, procesos=PROCESOS)
+        print("\n¡Proceso completado!")
@@ -0,0 +1,113 @@
+"""
+Checkpoints en disco para poder reanudar los scrapers largos
+
+Cada (categoría, página) terminada se añade como una línea JSON con sus
+productos al archivo de checkpoint, y se fuerza a disco antes de seguir. Si el
+proceso se cae, al volver a lanzarlo con el mismo archivo se recuperan esos
+productos y solo se descarga lo que faltaba. Para empezar de cero basta con
+borrar el archivo
+
+En memoria solo se guarda qué páginas están completadas y en qué posición del
+archivo empieza cada una; los productos se vuelven a leer del archivo página a
+página cuando se piden, así que la memoria no crece con el tamaño del catálogo
+"""
+
+import json
+import os
+import threading
+
+class Checkpoint:
+    """
+    Registro de páginas completadas (JSON Lines, solo se añaden líneas)
+
+    Tipos de línea:
+    {"categoria": ..., "pagina": n, "productos": [...]}  página terminada
+    {"categoria": ..., "total_paginas": n}                páginas que tiene la categoría
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        # (categoría, página) -> posición en bytes de su línea en el archivo
+        self.paginas = {}
+        self.totales = {}
+        self._lock = threading.Lock()
+        self._cargar()
+        self._archivo = open(self.ruta, 'ab')
+
+    def _cargar(self):
+        if not os.path.exists(self.ruta):
+            return
+
+        valido = 0
+        with open(self.ruta, 'rb') as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except json.JSONDecodeError:
+                    # Última línea a medio escribir (el proceso se cortó mientras guardaba)
+                    break
+                if 'total_paginas' in registro:
+                    self.totales[registro['categoria']] = registro['total_paginas']
+                else:
+                    self.paginas[(registro['categoria'], registro['pagina'])] = valido
+                valido += len(linea)
+
+        # Se descarta la línea incompleta para que la siguiente se escriba limpia
+        if valido < os.path.getsize(self.ruta):
+            with open(self.ruta, 'r+b') as f:
+                f.truncate(valido)
+
+        print(f"✓ Checkpoint {self.ruta}: {len(self.paginas)} páginas ya completadas")
+
+    def _escribir(self, registro):
+        """Añade una línea al archivo y devuelve la posición en la que empieza"""
+        linea = (json.dumps(registro, ensure_ascii=False) + '\n').encode('utf-8')
+        with self._lock:
+            posicion = self._archivo.tell()
+            self._archivo.write(linea)
+            self._archivo.flush()
+            os.fsync(self._archivo.fileno())
+        return posicion
+
+    def completado(self, categoria, pagina=1):
+        return (categoria, pagina) in self.paginas
+
+    def productos(self, categoria, pagina=1):
+        """Productos guardados de una página completada (se leen del archivo)"""
+        with open(self.ruta, 'rb') as f:
+            f.seek(self.paginas[(categoria, pagina)])
+            return json.loads(f.readline())['productos']
+
+    def iterar_productos(self, categoria=None):
+        """
+        Recorre las páginas completadas (de una categoría o de todas) en el orden en
+        que se guardaron, devolviendo (categoría, página, productos) de una en una
+        """
+        with open(self.ruta, 'rb') as f:
+            for (cat, pagina), posicion in sorted(self.paginas.items(), key=lambda item: item[1]):
+                if categoria is None or cat == categoria:
+                    f.seek(posicion)
+                    yield cat, pagina, json.loads(f.readline())['productos']
+
+    def guardar(self, categoria, pagina, productos):
+        """Marca la página como completada y guarda sus productos en el archivo"""
+        self.paginas[(categoria, pagina)] = self._escribir({'categoria': categoria, 'pagina': pagina,
+                                                            'productos': productos})
+
+    def total_paginas(self, categoria):
+        """Número de páginas de la categoría si ya se conoce, o None"""
+        return self.totales.get(categoria)
+
+    def guardar_total_paginas(self, categoria, total):
+        if self.totales.get(categoria) != total:
+            self._escribir({'categoria': categoria, 'total_paginas': total})
+            self.totales[categoria] = total
+
+    def cerrar(self):
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
@@ -1,7 +1,7 @@
 """
 Web Scraper Optimizado para Tienda Consum
 Extrae productos del HTML renderizado y navega por categorías
-Requiere: pip install selenium beautifulsoup4 pandas webdriver-manager
+Requiere: pip install selenium beautifulsoup4 pandas webdriver-manager (recomendado: lxml)
 """
 
 import time
@@ -14,9 +14,15 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 import pandas as pd
 import logging
+import threading
+from collections import deque
+
+from pool_selenium import procesar_en_pool
+from checkpoint import Checkpoint
+from escritor_streaming import EscritorProductos
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,13 +31,148 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# lxml construye el árbol en C y se consulta con XPath compiladas; si no está instalado
+# se usa BeautifulSoup con html.parser limitado a los productos y el paginador
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:
+    lxml_html = None
+
+SOLO_PRODUCTOS_Y_PAGINADOR = SoupStrainer(['cmp-widget-product', 'cmp-tol-dropdown-paginator'])
+
+REGEX_CODIGO_PRODUCTO = re.compile('Código producto')
+REGEX_NUMERO_CODIGO = re.compile(r':\s*(\d+)')
+REGEX_PARAMETRO_PAGINA = re.compile(r'page=\d+')
+
+# Número de productos de la pestaña actual, o -1 si la página nueva aún no ha terminado de cargar
+# (window.__cargando lo marca la página anterior al navegar y desaparece con el documento nuevo)
+SCRIPT_PRODUCTOS_CARGADOS = """
+if (window.__cargando || document.readyState !== 'complete') return -1;
+return document.querySelectorAll('cmp-widget-product').length;
+"""
+
+
+def _con_clase(etiqueta, clase):
+    """Expresión XPath equivalente a find(etiqueta, class_=clase) de BeautifulSoup"""
+    return f".//{etiqueta}[contains(concat(' ', normalize-space(@class), ' '), ' {clase} ')]"
+
+
+if lxml_html is not None:
+    XPATH_WIDGETS = etree.XPath('//cmp-widget-product')
+    XPATH_SPANS_PAGINADOR = etree.XPath('(//cmp-tol-dropdown-paginator)[1]//span')
+    XPATH_WIDGET = {
+        'nombre_componente': etree.XPath('.//lib-product-info-name'),
+        'marca': etree.XPath(_con_clase('p', 'u-size--20')),
+        'nombre': etree.XPath(_con_clase('h1', 'u-title-3')),
+        'codigo': etree.XPath(".//span[not(*) and contains(., 'Código producto')]"),
+        'precio_componente': etree.XPath('.//lib-product-info-price'),
+        'precio_oferta': etree.XPath(_con_clase('span', 'product-info-price__offer')),
+        'precio': etree.XPath(_con_clase('span', 'product-info-price__price')),
+        'imagen': etree.XPath(_con_clase('img', 'image-component__image')),
+        'enlace': etree.XPath(_con_clase('a', 'u-no-link')),
+        'promocion_componente': etree.XPath('.//lib-product-info-promotions'),
+        'promocion': etree.XPath(_con_clase('span', 'product-info-promotions__column--title')),
+        'precio_unidad': etree.XPath(_con_clase('p', 'product-info-name--price')),
+        'patrocinado': etree.XPath(_con_clase('div', 'widget-product__sponsored--label')),
+    }
+
+
+def _texto_lxml(elemento):
+    """Equivalente a get_text(strip=True) de BeautifulSoup"""
+    return ''.join(trozo.strip() for trozo in elemento.itertext())
+
+
+def _primero(elemento, consulta):
+    """Primer resultado de una XPath de XPATH_WIDGET dentro de elemento, o None"""
+    if elemento is None:
+        return None
+    resultado = XPATH_WIDGET[consulta](elemento)
+    return resultado[0] if resultado else None
+
+
+def _leer_widget_lxml(widget):
+    """Campos en bruto de un widget de producto (árbol de lxml)"""
+    name_component = _primero(widget, 'nombre_componente')
+    price_component = _primero(widget, 'precio_componente')
+    promo_component = _primero(widget, 'promocion_componente')
+    
+    campos = {'id': widget.get('id', '')}
+    for campo, elemento in (('marca', _primero(name_component, 'marca')),
+                            ('nombre', _primero(name_component, 'nombre')),
+                            ('precio_anterior', _primero(price_component, 'precio_oferta')),
+                            ('precio_actual', _primero(price_component, 'precio')),
+                            ('promocion', _primero(promo_component, 'promocion')),
+                            ('precio_unidad', _primero(name_component, 'precio_unidad'))):
+        campos[campo] = _texto_lxml(elemento) if elemento is not None else ""
+    
+    codigo_elem = _primero(name_component, 'codigo')
+    parent = codigo_elem.getparent() if codigo_elem is not None else None
+    campos['codigo_texto'] = _texto_lxml(parent) if parent is not None else ""
+    
+    img_elem = _primero(widget, 'imagen')
+    campos['imagen_url'] = img_elem.get('src', '') if img_elem is not None else ""
+    link_elem = _primero(widget, 'enlace')
+    campos['href'] = link_elem.get('href', '') if link_elem is not None else ""
+    campos['patrocinado'] = _primero(widget, 'patrocinado') is not None
+    return campos
+
+
+def _leer_widget_bs4(widget):
+    """Campos en bruto de un widget de producto (árbol de BeautifulSoup)"""
+    def texto(elemento):
+        return elemento.get_text(strip=True) if elemento else ""
+    
+    # Buscar nombre y marca dentro de lib-product-info-name
+    name_component = widget.find('lib-product-info-name')
+    price_component = widget.find('lib-product-info-price')
+    promo_component = widget.find('lib-product-info-promotions')
+    
+    codigo_elem = name_component.find('span', string=REGEX_CODIGO_PRODUCTO) if name_component else None
+    img_elem = widget.find('img', class_='image-component__image')
+    link_elem = widget.find('a', class_='u-no-link')
+    
+    return {
+        'id': widget.get('id', ''),
+        'marca': texto(name_component.find('p', class_='u-size--20')) if name_component else "",
+        'nombre': texto(name_component.find('h1', class_='u-title-3')) if name_component else "",
+        'codigo_texto': texto(codigo_elem.parent) if codigo_elem else "",
+        'precio_anterior': texto(price_component.find('span', class_='product-info-price__offer')) if price_component else "",
+        'precio_actual': texto(price_component.find('span', class_='product-info-price__price')) if price_component else "",
+        'imagen_url': img_elem.get('src', '') if img_elem else "",
+        'href': link_elem.get('href', '') if link_elem else "",
+        'promocion': texto(promo_component.find('span', class_='product-info-promotions__column--title')) if promo_component else "",
+        'precio_unidad': texto(name_component.find('p', class_='product-info-name--price')) if name_component else "",
+        'patrocinado': bool(widget.find('div', class_='widget-product__sponsored--label')),
+    }
+
+class _EscritorCompartido:
+    """Escritor de los workers de scrape_all_paralelo: pasa cada página a escribir, de una en una"""
+    
+    def __init__(self, escribir):
+        self._escribir = escribir
+        self._lock = threading.Lock()
+    
+    def escribir(self, productos):
+        with self._lock:
+            self._escribir(productos)
+
 class ConsumScraperOptimizado:
-    def __init__(self, headless=True):
-        """Inicializa el scraper"""
+    def __init__(self, headless=True, checkpoint=None, escritor=None):
+        """
+        Inicializa el scraper
+        
+        checkpoint: archivo donde se guarda cada página terminada; si ya existe, scrape_all
+        reanuda desde él saltando las páginas completadas
+        escritor: EscritorProductos al que se pasan los productos de cada página según
+        terminan, en lugar de acumularlos en self.products
+        """
         self.base_url = "https://tienda.consum.es/es"
         self.products = []
+        self.total_products = 0
         self.driver = None
         self.headless = headless
+        self.checkpoint = Checkpoint(checkpoint) if checkpoint else None
+        self.escritor = escritor
         
         # Categorías principales de Consum
         self.categorias = [
@@ -84,114 +225,82 @@ class ConsumScraperOptimizado:
             logger.warning(f"Timeout esperando productos: {e}")
             return False
     
-    def extract_products_from_page(self, category_name):
-        """Extrae productos de la página actual"""
+    def add_products(self, productos):
+        """Añade productos al resultado: al escritor si lo hay o, si no, a self.products"""
+        if self.escritor:
+            self.escritor.escribir(productos)
+        else:
+            self.products.extend(productos)
+        self.total_products += len(productos)
+    
+    def parse_page(self):
+        """
+        Parsea la página actual una sola vez; el resultado se pasa a
+        extract_products_from_page y get_total_pages
+        """
+        if lxml_html is not None:
+            return lxml_html.fromstring(self.driver.page_source)
+        return BeautifulSoup(self.driver.page_source, 'html.parser', parse_only=SOLO_PRODUCTOS_Y_PAGINADOR)
+    
+    def extract_products_from_page(self, category_name, soup=None, destino=None):
+        """
+        Extrae productos de la página actual (o de su árbol ya parseado)
+        
+        Los productos se añaden a destino (por defecto self.products)
+        """
+        destino = self.products if destino is None else destino
         try:
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+            if soup is None:
+                soup = self.parse_page()
             
             # Buscar widgets de productos
-            product_widgets = soup.find_all('cmp-widget-product')
+            if lxml_html is not None:
+                product_widgets = XPATH_WIDGETS(soup)
+                leer_widget = _leer_widget_lxml
+            else:
+                product_widgets = soup.find_all('cmp-widget-product')
+                leer_widget = _leer_widget_bs4
             
             if not product_widgets:
                 logger.warning(f"No se encontraron productos en {category_name}")
                 return 0
             
             productos_extraidos = 0
+            fecha_extraccion = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
             for widget in product_widgets:
                 try:
+                    campos = leer_widget(widget)
+                    
                     # Extraer ID del producto
-                    product_id = widget.get('id', '').replace('grid-widget-', '')
+                    product_id = campos['id'].replace('grid-widget-', '')
                     
-                    # Buscar nombre y marca dentro de lib-product-info-name
-                    name_component = widget.find('lib-product-info-name')
-                    marca = ""
-                    nombre = ""
+                    # Código del producto
                     codigo = ""
-                    
-                    if name_component:
-                        # Marca (p con class u-size--20)
-                        marca_elem = name_component.find('p', class_='u-size--20')
-                        if marca_elem:
-                            marca = marca_elem.get_text(strip=True)
-                        
-                        # Nombre (h1 con class u-title-3)
-                        nombre_elem = name_component.find('h1', class_='u-title-3')
-                        if nombre_elem:
-                            nombre = nombre_elem.get_text(strip=True)
-                        
-                        # Código del producto
-                        codigo_elem = name_component.find('span', string=re.compile('Código producto'))
-                        if codigo_elem and codigo_elem.parent:
-                            codigo_text = codigo_elem.parent.get_text(strip=True)
-                            codigo_match = re.search(r':\s*(\d+)', codigo_text)
-                            if codigo_match:
-                                codigo = codigo_match.group(1)
-                    
-                    # Precio dentro de lib-product-info-price
-                    precio_actual = ""
-                    precio_anterior = ""
-                    price_component = widget.find('lib-product-info-price')
-                    
-                    if price_component:
-                        # Precio con oferta (tachado)
-                        precio_oferta = price_component.find('span', class_='product-info-price__offer')
-                        if precio_oferta:
-                            precio_anterior = precio_oferta.get_text(strip=True)
-                        
-                        # Precio actual
-                        precio_elem = price_component.find('span', class_='product-info-price__price')
-                        if precio_elem:
-                            precio_actual = precio_elem.get_text(strip=True)
-                    
-                    # URL de la imagen
-                    imagen_url = ""
-                    img_elem = widget.find('img', class_='image-component__image')
-                    if img_elem:
-                        imagen_url = img_elem.get('src', '')
+                    codigo_match = REGEX_NUMERO_CODIGO.search(campos['codigo_texto'])
+                    if codigo_match:
+                        codigo = codigo_match.group(1)
                     
                     # URL del producto
-                    producto_url = ""
-                    link_elem = widget.find('a', class_='u-no-link')
-                    if link_elem:
-                        href = link_elem.get('href', '')
-                        if href:
-                            producto_url = f"https://tienda.consum.es{href}"
-                    
-                    # Información de promoción
-                    promocion = ""
-                    promo_component = widget.find('lib-product-info-promotions')
-                    if promo_component:
-                        promo_title = promo_component.find('span', class_='product-info-promotions__column--title')
-                        if promo_title:
-                            promocion = promo_title.get_text(strip=True)
+                    producto_url = f"https://tienda.consum.es{campos['href']}" if campos['href'] else ""
                     
-                    # Precio por unidad (ej: €/Kg)
-                    precio_unidad = ""
-                    precio_unidad_elem = name_component.find('p', class_='product-info-name--price') if name_component else None
-                    if precio_unidad_elem:
-                        precio_unidad = precio_unidad_elem.get_text(strip=True)
-                    
-                    # Patrocinado
-                    patrocinado = bool(widget.find('div', class_='widget-product__sponsored--label'))
-                    
-                    if nombre or codigo:  # Solo guardar si tiene nombre o código
+                    if campos['nombre'] or codigo:  # Solo guardar si tiene nombre o código
                         product = {
                             'codigo_producto': codigo or product_id,
-                            'marca': marca,
-                            'nombre': nombre,
+                            'marca': campos['marca'],
+                            'nombre': campos['nombre'],
                             'categoria': category_name,
-                            'precio_actual': precio_actual,
-                            'precio_anterior': precio_anterior,
-                            'precio_por_unidad': precio_unidad,
-                            'promocion': promocion,
-                            'patrocinado': 'Sí' if patrocinado else 'No',
-                            'imagen_url': imagen_url,
+                            'precio_actual': campos['precio_actual'],
+                            'precio_anterior': campos['precio_anterior'],
+                            'precio_por_unidad': campos['precio_unidad'],
+                            'promocion': campos['promocion'],
+                            'patrocinado': 'Sí' if campos['patrocinado'] else 'No',
+                            'imagen_url': campos['imagen_url'],
                             'producto_url': producto_url,
-                            'fecha_extraccion': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                            'fecha_extraccion': fecha_extraccion
                         }
                         
-                        self.products.append(product)
+                        destino.append(product)
                         productos_extraidos += 1
                 
                 except Exception as e:
@@ -205,105 +314,259 @@ class ConsumScraperOptimizado:
             logger.error(f"Error extrayendo productos: {e}")
             return 0
     
-    def get_total_pages(self):
-        """Obtiene el número total de páginas"""
+    def get_total_pages(self, soup=None):
+        """Obtiene el número total de páginas (de la página actual o de su árbol ya parseado)"""
         try:
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
+            if soup is None:
+                soup = self.parse_page()
             
             # Buscar el texto "de X" en el paginador
-            paginator = soup.find('cmp-tol-dropdown-paginator')
-            if paginator:
-                span_elements = paginator.find_all('span')
-                for span in span_elements:
-                    text = span.get_text(strip=True)
-                    if text.startswith('de '):
-                        total_pages = int(text.replace('de ', ''))
-                        return total_pages
+            if lxml_html is not None:
+                textos = [_texto_lxml(span) for span in XPATH_SPANS_PAGINADOR(soup)]
+            else:
+                paginator = soup.find('cmp-tol-dropdown-paginator')
+                textos = [span.get_text(strip=True) for span in paginator.find_all('span')] if paginator else []
+            
+            for text in textos:
+                if text.startswith('de '):
+                    total_pages = int(text.replace('de ', ''))
+                    return total_pages
             
             return 1
         except Exception as e:
             logger.warning(f"No se pudo determinar número de páginas: {e}")
             return 1
     
-    def navigate_to_next_page(self, current_page):
-        """Navega a la siguiente página usando la URL directamente"""
+    @staticmethod
+    def page_url(url, page):
+        """Construye la URL de la página page de un listado a partir de la URL de otra de sus páginas"""
+        if '?' in url:
+            # Ya tiene parámetros
+            if 'page=' in url:
+                # Reemplazar el número de página
+                return REGEX_PARAMETRO_PAGINA.sub(f'page={page}', url)
+            # Agregar parámetro de página
+            return f"{url}&page={page}"
+        # No tiene parámetros
+        return f"{url}?page={page}"
+    
+    def navigate_to_page(self, url):
+        """Navega a una página del listado y espera a sus productos"""
         try:
-            # Obtener la URL actual
-            current_url = self.driver.current_url
-            
-            # Construir URL de la siguiente página
-            if '?' in current_url:
-                # Ya tiene parámetros
-                if 'page=' in current_url:
-                    # Reemplazar el número de página
-                    next_url = re.sub(r'page=\d+', f'page={current_page + 1}', current_url)
-                else:
-                    # Agregar parámetro de página
-                    next_url = f"{current_url}&page={current_page + 1}"
-            else:
-                # No tiene parámetros
-                next_url = f"{current_url}?page={current_page + 1}"
-            
-            logger.info(f"Navegando a: {next_url}")
-            self.driver.get(next_url)
+            logger.info(f"Navegando a: {url}")
+            self.driver.get(url)
             time.sleep(3)  # Esperar a que cargue
             
             return self.wait_for_products()
             
         except Exception as e:
-            logger.error(f"Error navegando a página siguiente: {e}")
+            logger.error(f"Error navegando a {url}: {e}")
             return False
     
-    def scrape_category(self, categoria, max_pages=None):
-        """Extrae todos los productos de una categoría"""
+    def navigate_to_next_page(self, current_page):
+        """Navega a la siguiente página usando la URL directamente"""
+        # Construir URL de la siguiente página a partir de la actual
+        return self.navigate_to_page(self.page_url(self.driver.current_url, current_page + 1))
+    
+    def extract_page(self, category_name, page_num, soup):
+        """
+        Extrae los productos de una página y, si hay checkpoint, la marca como completada
+        
+        Returns:
+            Lista de productos de la página
+        """
+        productos = []
+        self.extract_products_from_page(category_name, soup, destino=productos)
+        
+        # Una página vacía suele ser un fallo de carga: no se da por terminada
+        if self.checkpoint and productos:
+            self.checkpoint.guardar(category_name, page_num, productos)
+        return productos
+    
+    def scrape_pages_in_tabs(self, category_name, urls, max_tabs=4, timeout=30, intervalo=0.25, al_terminar=None):
+        """
+        Carga varias páginas a la vez en pestañas del mismo navegador
+        
+        Cada pestaña navega con window.location (no bloquea como driver.get), así que el
+        navegador descarga y renderiza hasta max_tabs páginas en paralelo. Las pestañas
+        se revisan por turnos: cuando una tiene productos y su número no ha cambiado desde
+        la revisión anterior, se parsea y pasa a la siguiente URL pendiente
+        
+        Args:
+            urls: diccionario {número de página: URL}
+            timeout: segundos máximos por página; si se superan la página se da por vacía
+            al_terminar: función (número de página, productos) a la que se entrega cada
+                página en cuanto termina, en lugar de guardarla en el resultado
+        
+        Returns:
+            Diccionario {número de página: lista de productos} (vacío si se indica al_terminar)
+        """
+        principal = self.driver.current_window_handle
+        pendientes = deque(sorted(urls.items()))
+        resultados = {}
+        terminar = al_terminar or resultados.__setitem__
+        pestanas = {}
+        
+        def lanzar(handle):
+            pagina, url = pendientes.popleft()
+            self.driver.switch_to.window(handle)
+            self.driver.execute_script("window.__cargando = true; window.location.href = arguments[0];", url)
+            pestanas[handle] = {'pagina': pagina, 'inicio': time.monotonic(), 'productos': -1}
+        
+        try:
+            for _ in range(min(max_tabs, len(pendientes))):
+                self.driver.switch_to.new_window('tab')
+                lanzar(self.driver.current_window_handle)
+            
+            while pestanas:
+                time.sleep(intervalo)
+                for handle, estado in list(pestanas.items()):
+                    self.driver.switch_to.window(handle)
+                    num_productos = self.driver.execute_script(SCRIPT_PRODUCTOS_CARGADOS)
+                    
+                    if num_productos > 0 and num_productos == estado['productos']:
+                        terminar(estado['pagina'], self.extract_page(category_name, estado['pagina'], self.parse_page()))
+                    elif time.monotonic() - estado['inicio'] > timeout:
+                        logger.warning(f"Timeout en la página {estado['pagina']} de {category_name}")
+                        terminar(estado['pagina'], [])
+                    else:
+                        estado['productos'] = num_productos
+                        continue
+                    
+                    # Página terminada: la pestaña pasa a la siguiente URL o se cierra
+                    if pendientes:
+                        lanzar(handle)
+                    else:
+                        del pestanas[handle]
+                        self.driver.close()
+        finally:
+            for handle in pestanas:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            self.driver.switch_to.window(principal)
+        
+        return resultados
+    
+    def scrape_category(self, categoria, max_pages=None, max_tabs=1):
+        """
+        Extrae todos los productos de una categoría
+        
+        Con max_tabs > 1, tras leer la primera página el resto se cargan a la vez en
+        max_tabs pestañas (ver scrape_pages_in_tabs) en lugar de una detrás de otra
+        
+        Cada página se añade (al escritor o a self.products) en cuanto terminan ella y
+        las anteriores, en orden de página y mezclando las del checkpoint con las
+        nuevas; en memoria solo quedan las páginas que terminan antes de su turno
+        """
         logger.info(f"\n{'='*60}")
         logger.info(f"Procesando categoría: {categoria['nombre']}")
         logger.info(f"{'='*60}")
         
+        nombre = categoria['nombre']
+        pages_to_scrape = 0
+        terminadas = {}
+        siguiente = 1
+        
+        def entregar(final=False):
+            """Añade las páginas listas a partir de la siguiente; con final=True salta las que faltan"""
+            nonlocal siguiente
+            while siguiente <= pages_to_scrape:
+                if siguiente in terminadas:
+                    productos = terminadas.pop(siguiente)
+                elif self.checkpoint and self.checkpoint.completado(nombre, siguiente):
+                    productos = self.checkpoint.productos(nombre, siguiente)
+                elif final:
+                    siguiente += 1
+                    continue
+                else:
+                    return
+                
+                if not productos:
+                    logger.warning(f"No se extrajeron productos de la página {siguiente}")
+                self.add_products(productos)
+                siguiente += 1
+        
+        def terminar(page_num, productos):
+            terminadas[page_num] = productos
+            entregar()
+        
         try:
-            # Navegar a la categoría
-            self.driver.get(categoria['url'])
+            # Si el checkpoint ya sabe cuántas páginas tiene, no hace falta cargar la primera
+            total_pages = self.checkpoint.total_paginas(nombre) if self.checkpoint else None
+            soup = None
             
-            if not self.wait_for_products():
-                logger.warning(f"No se cargaron productos en {categoria['nombre']}")
-                return
+            if total_pages is None:
+                # Navegar a la categoría
+                self.driver.get(categoria['url'])
+                
+                if not self.wait_for_products():
+                    logger.warning(f"No se cargaron productos en {nombre}")
+                    return
+                
+                # Un único parseo por página, compartido por el paginador y los productos
+                soup = self.parse_page()
+                
+                # Obtener número total de páginas
+                total_pages = self.get_total_pages(soup)
+                if self.checkpoint:
+                    self.checkpoint.guardar_total_paginas(nombre, total_pages)
             
-            # Obtener número total de páginas
-            total_pages = self.get_total_pages()
             pages_to_scrape = min(total_pages, max_pages) if max_pages else total_pages
             
             logger.info(f"Total de páginas detectadas: {total_pages}")
             logger.info(f"Páginas a procesar: {pages_to_scrape}")
             
-            # Extraer productos de cada página
-            for page_num in range(1, pages_to_scrape + 1):
-                logger.info(f"Procesando página {page_num}/{pages_to_scrape}")
-                
-                # Extraer productos de la página actual
-                productos_en_pagina = self.extract_products_from_page(categoria['nombre'])
-                
-                if productos_en_pagina == 0:
-                    logger.warning(f"No se extrajeron productos de la página {page_num}")
-                
-                # Si no es la última página, navegar a la siguiente
-                if page_num < pages_to_scrape:
-                    if not self.navigate_to_next_page(page_num):
-                        logger.warning(f"No se pudo navegar a la página {page_num + 1}")
-                        break
+            # Páginas que faltan (las del checkpoint ya están hechas)
+            pendientes = [page_num for page_num in range(1, pages_to_scrape + 1)
+                          if not (self.checkpoint and self.checkpoint.completado(nombre, page_num))]
+            if len(pendientes) < pages_to_scrape:
+                logger.info(f"Reanudando: {pages_to_scrape - len(pendientes)} páginas recuperadas del checkpoint")
+            
+            # La primera página ya está cargada
+            if soup is not None and pendientes and pendientes[0] == 1:
+                logger.info(f"Procesando página 1/{pages_to_scrape}")
+                terminar(1, self.extract_page(nombre, 1, soup))
+                pendientes.pop(0)
+            # Páginas del checkpoint anteriores a la primera pendiente
+            entregar()
+            
+            if max_tabs > 1 and len(pendientes) > 1:
+                urls = {page_num: self.page_url(categoria['url'], page_num) for page_num in pendientes}
+                self.scrape_pages_in_tabs(nombre, urls, max_tabs=max_tabs, al_terminar=terminar)
+            else:
+                # Extraer productos de cada página
+                for page_num in pendientes:
+                    time.sleep(1)  # Pequeña pausa entre páginas
+                    logger.info(f"Procesando página {page_num}/{pages_to_scrape}")
                     
-                time.sleep(1)  # Pequeña pausa entre páginas
+                    if not self.navigate_to_page(self.page_url(categoria['url'], page_num)):
+                        logger.warning(f"No se pudo navegar a la página {page_num}")
+                        break
+                    terminar(page_num, self.extract_page(nombre, page_num, self.parse_page()))
                 
         except Exception as e:
-            logger.error(f"Error procesando categoría {categoria['nombre']}: {e}")
+            logger.error(f"Error procesando categoría {nombre}: {e}")
             import traceback
             traceback.print_exc()
+        
+        # Lo que quede (páginas del checkpoint tras un fallo o páginas sueltas) se añade saltando las que faltan
+        entregar(final=True)
     
-    def scrape_all(self, max_categories=None, max_pages_per_category=None):
-        """Ejecuta el scraping completo"""
+    def scrape_all(self, max_categories=None, max_pages_per_category=None, num_workers=1, max_tabs=1):
+        """
+        Ejecuta el scraping completo
+        
+        Con num_workers > 1 las categorías se reparten entre varios navegadores
+        (ver scrape_all_paralelo) y con max_tabs > 1 las páginas de cada categoría se
+        cargan en varias pestañas a la vez (ver scrape_pages_in_tabs)
+        """
         logger.info("=" * 70)
         logger.info("INICIANDO SCRAPING DE TIENDA CONSUM")
         logger.info("=" * 70)
         
+        if num_workers > 1:
+            return self.scrape_all_paralelo(max_categories, max_pages_per_category, num_workers, max_tabs)
+        
         try:
             self.setup_driver()
             
@@ -312,12 +575,12 @@ class ConsumScraperOptimizado:
             
             for idx, categoria in enumerate(categorias_a_procesar, 1):
                 logger.info(f"\n[{idx}/{len(categorias_a_procesar)}] Iniciando: {categoria['nombre']}")
-                self.scrape_category(categoria, max_pages=max_pages_per_category)
+                self.scrape_category(categoria, max_pages=max_pages_per_category, max_tabs=max_tabs)
                 time.sleep(2)  # Pausa entre categorías
             
             logger.info("\n" + "=" * 70)
             logger.info("SCRAPING COMPLETADO")
-            logger.info(f"Total productos extraídos: {len(self.products)}")
+            logger.info(f"Total productos extraídos: {self.total_products}")
             logger.info("=" * 70)
             
         except Exception as e:
@@ -329,6 +592,50 @@ class ConsumScraperOptimizado:
                 self.driver.quit()
                 logger.info("Driver cerrado")
     
+    def scrape_all_paralelo(self, max_categories=None, max_pages_per_category=None, num_workers=4, max_tabs=1):
+        """
+        Reparte las categorías entre num_workers navegadores
+        
+        Cada worker es un scraper propio con su driver. Con escritor, cada página pasa
+        al escritor en cuanto termina (en orden dentro de su categoría, pero mezclada con
+        las de las categorías de otros workers), así que en memoria no queda ninguna
+        categoría completa. Sin escritor, los productos de cada categoría se añaden a
+        self.products en el orden de self.categorias, igual que en la versión secuencial
+        """
+        categorias_a_procesar = self.categorias[:max_categories] if max_categories else self.categorias
+        
+        escritor = _EscritorCompartido(self.add_products) if self.escritor else None
+        
+        def iniciar_worker():
+            worker = ConsumScraperOptimizado(headless=self.headless, escritor=escritor)
+            worker.checkpoint = self.checkpoint
+            worker.setup_driver()
+            return worker
+        
+        def procesar(worker, categoria):
+            worker.products = []
+            worker.scrape_category(categoria, max_pages=max_pages_per_category, max_tabs=max_tabs)
+            # Con escritor las páginas ya se han entregado: solo se indica que la categoría terminó
+            return [] if escritor else worker.products
+        
+        def cerrar_worker(worker):
+            if worker.driver:
+                worker.driver.quit()
+        
+        def al_completar(categoria, productos):
+            if productos is None:
+                logger.warning(f"Categoría sin procesar: {categoria['nombre']}")
+            elif escritor is None:
+                self.add_products(productos)
+        
+        procesar_en_pool(categorias_a_procesar, iniciar_worker, procesar, cerrar_worker, num_workers,
+                         al_completar=al_completar)
+        
+        logger.info("\n" + "=" * 70)
+        logger.info("SCRAPING COMPLETADO")
+        logger.info(f"Total productos extraídos: {self.total_products}")
+        logger.info("=" * 70)
+    
     def save_to_csv(self, filename=None):
         """Guarda los productos en CSV"""
         if not self.products:
@@ -354,13 +661,13 @@ class ConsumScraperOptimizado:
             logger.error(f"Error guardando CSV: {e}")
             return False
     
-    def get_statistics(self):
-        """Muestra estadísticas del scraping"""
-        if not self.products:
-            logger.info("No hay productos para analizar")
-            return
-        
-        df = pd.DataFrame(self.products)
+    def get_statistics(self, df=None):
+        """Muestra estadísticas del scraping (de self.products o del DataFrame indicado)"""
+        if df is None:
+            if not self.products:
+                logger.info("No hay productos para analizar")
+                return
+            df = pd.DataFrame(self.products)
         
         print("\n" + "=" * 70)
         print("ESTADÍSTICAS DEL SCRAPING")
@@ -393,8 +700,14 @@ def main():
     ╚══════════════════════════════════════════════════════════════╝
     """)
     
+    # Los productos se escriben en el CSV por lotes según terminan las categorías, y al
+    # cerrar se ordena el archivo por categoría, marca y nombre (ordenación externa)
+    filename = f"productos_consum_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+    escritor = EscritorProductos(filename, ordenar_por=['categoria', 'marca', 'nombre'])
+    
     # Crear scraper (headless=True por defecto)
-    scraper = ConsumScraperOptimizado(headless=True)
+    # Si el proceso se corta, al relanzarlo se reanuda desde el checkpoint (bórralo para empezar de cero)
+    scraper = ConsumScraperOptimizado(headless=True, checkpoint="consum_checkpoint.jsonl", escritor=escritor)
     
     # OPCIONES DE CONFIGURACIÓN:
     
@@ -403,7 +716,7 @@ def main():
     # scraper.scrape_all()
     
     # Opción 2: Scraping de prueba (1 categoría, 3 páginas) - RECOMENDADO PARA PRUEBAS
-    scraper.scrape_all(max_categories=100, max_pages_per_category=300)
+    scraper.scrape_all(max_categories=100, max_pages_per_category=300, num_workers=4, max_tabs=4)
     
     # Opción 3: Todas las categorías, pero máximo 10 páginas por categoría
     # scraper.scrape_all(max_pages_per_category=10)
@@ -412,10 +725,14 @@ def main():
     # scraper.scrape_all()
     
     # Guardar resultados
-    scraper.save_to_csv()
+    escritor.cerrar()
+    logger.info(f"\n✓ Productos guardados en: {filename}")
+    logger.info(f"  Total registros: {escritor.filas}")
     
-    # Mostrar estadísticas
-    scraper.get_statistics()
+    # Mostrar estadísticas (solo se leen las columnas necesarias)
+    if escritor.filas:
+        scraper.get_statistics(pd.read_csv(filename, usecols=['categoria', 'marca', 'precio_anterior', 'patrocinado'],
+                                           keep_default_na=False))
     
     print("\n✓ Proceso completado exitosamente")
 
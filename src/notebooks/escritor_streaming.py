@@ -0,0 +1,198 @@
+"""
+Escritura por lotes de los productos scrapeados
+
+En lugar de acumular todos los productos en una lista y crear un DataFrame al
+final, los scrapers pasan los productos de cada página a un EscritorProductos,
+que los vuelca a disco cada tam_lote filas. La memoria usada no depende del
+tamaño del catálogo
+
+Formatos (según la extensión del archivo): .csv, .jsonl y .parquet (requiere pyarrow)
+
+En Parquet el esquema no se deduce de los valores del primer lote (una columna
+vacía en él quedaría como null y un precio entero truncaría los decimales de los
+siguientes): todas las columnas son texto salvo las indicadas en tipos
+"""
+
+import csv
+import heapq
+import json
+import os
+import tempfile
+from pathlib import Path
+
+FORMATOS = {'.csv': 'csv', '.jsonl': 'jsonl', '.parquet': 'parquet'}
+
+# Tipos de columna admitidos en Parquet
+TIPOS_PARQUET = ('string', 'float64')
+
+# Columnas de precio de los scrapers que se guardan como número en Parquet
+TIPOS_PRODUCTO = {'precio_actual': 'float64', 'precio_anterior': 'float64'}
+
+VALORES_VACIOS = {'', 'N/A'}
+
+
+def a_float(valor):
+    """
+    Número de un precio ('1,25 €', '1.234,50', 2, 1.5); None si está vacío
+
+    Lanza ValueError si el texto no es un número
+    """
+    if valor is None or isinstance(valor, float):
+        return valor
+    if isinstance(valor, (int, bool)):
+        return float(valor)
+    texto = str(valor).replace('€', '').strip()
+    if texto in VALORES_VACIOS:
+        return None
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    return float(texto)
+
+class EscritorProductos:
+    """
+    Escribe filas (diccionarios) en un archivo por lotes
+
+    Parámetros:
+    ruta: archivo de salida; el formato se deduce de la extensión
+    columnas: columnas del archivo (por defecto, las claves de la primera fila)
+    tipos: {columna: 'float64'} para las columnas numéricas en Parquet; el resto
+        se guardan como texto (por defecto TIPOS_PRODUCTO)
+    tam_lote: filas que se acumulan en memoria antes de escribirlas
+    ordenar_por: lista de columnas; si se indica, el archivo se ordena al cerrar
+        mediante ordenación externa (cada lote se ordena y se guarda en un archivo
+        temporal, y al cerrar se mezclan todos con heapq.merge)
+
+    Uso:
+        with EscritorProductos("productos.csv", ordenar_por=['categoria', 'marca', 'nombre']) as escritor:
+            escritor.escribir(productos_de_la_pagina)
+    """
+
+    def __init__(self, ruta, columnas=None, tam_lote=1000, ordenar_por=None, tipos=TIPOS_PRODUCTO):
+        self.ruta = Path(ruta)
+        self.formato = FORMATOS.get(self.ruta.suffix.lower())
+        if self.formato is None:
+            raise ValueError(f"Formato no soportado: {self.ruta.suffix} (usa {', '.join(FORMATOS)})")
+
+        self.columnas = list(columnas) if columnas else None
+        self.tam_lote = tam_lote
+        self.ordenar_por = list(ordenar_por) if ordenar_por else None
+        self.tipos = dict(tipos or {})
+        no_validos = {tipo for tipo in self.tipos.values() if tipo not in TIPOS_PARQUET}
+        if no_validos:
+            raise ValueError(f"Tipos no soportados: {', '.join(sorted(no_validos))} (usa {', '.join(TIPOS_PARQUET)})")
+        self.filas = 0
+
+        self._lote = []
+        self._tramos = []
+        self._archivo = None
+        self._writer = None
+
+        if self.formato == 'parquet':
+            # Dependencia opcional: solo se necesita para escribir Parquet
+            import pyarrow
+            import pyarrow.parquet
+            self._pa = pyarrow
+
+    def escribir(self, productos):
+        """Añade filas; se vuelcan a disco cada vez que se completa un lote"""
+        self._lote.extend(productos)
+        self.filas += len(productos)
+        if len(self._lote) >= self.tam_lote:
+            self._volcar()
+
+    def _clave(self, fila):
+        return tuple('' if fila.get(columna) is None else str(fila.get(columna)) for columna in self.ordenar_por)
+
+    def _volcar(self):
+        if not self._lote:
+            return
+        if self.columnas is None:
+            self.columnas = list(self._lote[0].keys())
+
+        if self.ordenar_por:
+            # Cada lote ordenado va a su propio archivo temporal (un "tramo" de la ordenación externa)
+            self._lote.sort(key=self._clave)
+            fd, ruta_tramo = tempfile.mkstemp(prefix='tramo_', suffix='.jsonl', dir=self.ruta.parent)
+            with open(fd, 'w', encoding='utf-8') as f:
+                for fila in self._lote:
+                    f.write(json.dumps(fila, ensure_ascii=False) + '\n')
+            self._tramos.append(ruta_tramo)
+        else:
+            self._escribir_lote(self._lote)
+        self._lote = []
+
+    def _escribir_lote(self, filas):
+        if self.formato == 'csv':
+            if self._writer is None:
+                self._archivo = open(self.ruta, 'w', newline='', encoding='utf-8-sig')
+                self._writer = csv.DictWriter(self._archivo, fieldnames=self.columnas, extrasaction='ignore')
+                self._writer.writeheader()
+            self._writer.writerows(filas)
+
+        elif self.formato == 'jsonl':
+            if self._archivo is None:
+                self._archivo = open(self.ruta, 'w', encoding='utf-8')
+            for fila in filas:
+                self._archivo.write(json.dumps({columna: fila.get(columna) for columna in self.columnas},
+                                               ensure_ascii=False) + '\n')
+
+        else:
+            # Un row group de Parquet por lote, todos con el esquema de las columnas
+            if self._writer is None:
+                self._writer = self._pa.parquet.ParquetWriter(self.ruta, self._esquema())
+            datos = {columna: self._valores_columna(filas, columna) for columna in self.columnas}
+            self._writer.write_table(self._pa.table(datos, schema=self._writer.schema))
+
+    def _esquema(self):
+        return self._pa.schema([(columna, getattr(self._pa, self.tipos.get(columna, 'string'))())
+                                for columna in self.columnas])
+
+    def _valores_columna(self, filas, columna):
+        """Valores de una columna convertidos a su tipo de Parquet (None se mantiene)"""
+        valores = [fila.get(columna) for fila in filas]
+        if self.tipos.get(columna) == 'float64':
+            try:
+                return [a_float(valor) for valor in valores]
+            except ValueError as e:
+                raise ValueError(f"Columna {columna}: {e}") from e
+        return [None if valor is None else str(valor) for valor in valores]
+
+    def _leer_tramo(self, ruta_tramo):
+        with open(ruta_tramo, encoding='utf-8') as f:
+            for linea in f:
+                yield json.loads(linea)
+
+    def _mezclar_tramos(self):
+        """Mezcla los tramos ordenados escribiendo el resultado por lotes"""
+        lote = []
+        for fila in heapq.merge(*(self._leer_tramo(ruta) for ruta in self._tramos), key=self._clave):
+            lote.append(fila)
+            if len(lote) >= self.tam_lote:
+                self._escribir_lote(lote)
+                lote = []
+        if lote:
+            self._escribir_lote(lote)
+
+    def cerrar(self):
+        """Escribe lo pendiente (y hace la mezcla final si hay que ordenar) y cierra el archivo"""
+        try:
+            self._volcar()
+            if self._tramos:
+                self._mezclar_tramos()
+            if self.columnas is None and self.ruta.exists():
+                # Sin filas no se genera archivo: se borra el de una ejecución anterior para no confundirlos
+                self.ruta.unlink()
+        finally:
+            for ruta_tramo in self._tramos:
+                os.remove(ruta_tramo)
+            self._tramos = []
+            if self._writer is not None and self.formato == 'parquet':
+                self._writer.close()
+            if self._archivo is not None:
+                self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
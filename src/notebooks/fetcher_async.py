@@ -0,0 +1,156 @@
+"""
+Descarga concurrente de JSON con asyncio para las APIs de los supermercados
+
+Una sola sesión aiohttp reutiliza las conexiones (keep-alive), un límite por
+host acota las peticiones simultáneas a cada servidor y un cubo de tokens
+limita las peticiones por segundo, para poder tener cientos de peticiones en
+vuelo sin saturar la tienda
+"""
+
+import asyncio
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import aiohttp
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json',
+}
+
+# Respuestas que merece la pena reintentar
+ESTADOS_REINTENTO = {429, 500, 502, 503, 504}
+
+def segundos_retry_after(valor, por_defecto):
+    """
+    Espera indicada por la cabecera Retry-After, que puede venir en segundos ('120')
+    o como fecha HTTP ('Wed, 21 Oct 2026 07:28:00 GMT'); si no se entiende, por_defecto
+    """
+    if valor is None:
+        return por_defecto
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        fecha = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return por_defecto
+    if fecha.tzinfo is None:
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return max(0.0, fecha.timestamp() - time.time())
+
+class LimitadorTokens:
+    """
+    Cubo de tokens: permite ráfagas de hasta capacidad peticiones y, de media,
+    tasa peticiones por segundo
+    """
+
+    def __init__(self, tasa, capacidad=None):
+        self.tasa = tasa
+        self.capacidad = capacidad or max(1, tasa)
+        self.tokens = self.capacidad
+        self.ultimo = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def adquirir(self):
+        # El lock hace que las esperas se atiendan por orden de llegada
+        async with self._lock:
+            while True:
+                ahora = time.monotonic()
+                self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+                self.ultimo = ahora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.tasa)
+
+class FetcherAsync:
+    """
+    Cliente HTTP asíncrono con sesión compartida, límite por host y limitador de tasa
+
+    Se usa como gestor de contexto asíncrono:
+
+        async with FetcherAsync(max_por_host=8, peticiones_por_segundo=10) as fetcher:
+            datos = await fetcher.get_muchos(urls)
+
+    Parámetros:
+    max_por_host: conexiones simultáneas como máximo con cada servidor
+    peticiones_por_segundo: tasa media permitida (None = sin límite)
+    rafaga: peticiones que se pueden lanzar de golpe antes de aplicar la tasa
+    timeout: segundos máximos de cada petición, contados desde que tiene conexión
+        libre con el servidor (la espera en la cola de max_por_host no cuenta)
+    reintentos: reintentos ante errores de red o respuestas 429/5xx, con espera exponencial
+    """
+
+    def __init__(self, max_por_host=8, peticiones_por_segundo=10, rafaga=None,
+                 timeout=15, reintentos=3, headers=HEADERS):
+        self.max_por_host = max_por_host
+        self.limitador = LimitadorTokens(peticiones_por_segundo, rafaga) if peticiones_por_segundo else None
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.reintentos = reintentos
+        self.headers = headers
+        self.session = None
+        self._semaforos = {}
+
+    async def __aenter__(self):
+        conector = aiohttp.TCPConnector(limit=0, limit_per_host=self.max_por_host, keepalive_timeout=30)
+        self.session = aiohttp.ClientSession(connector=conector, headers=self.headers, timeout=self.timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    def _semaforo(self, url):
+        """Semáforo del servidor de la URL: limita las peticiones en curso con él a max_por_host"""
+        host = urlsplit(str(url)).netloc
+        if host not in self._semaforos:
+            self._semaforos[host] = asyncio.Semaphore(self.max_por_host)
+        return self._semaforos[host]
+
+    async def peticion(self, metodo, url, **kwargs):
+        """
+        Hace una petición y devuelve (json, cabeceras)
+
+        Cualquier fallo tras los reintentos (error de red, tiempo agotado, estado de
+        error o cuerpo que no es JSON) se lanza como aiohttp.ClientError, para que
+        quien llama solo tenga que capturar esa excepción
+        """
+        semaforo = self._semaforo(url)
+        for intento in range(self.reintentos + 1):
+            try:
+                # El turno con el servidor se obtiene antes de empezar a contar el tiempo de la petición
+                async with semaforo:
+                    if self.limitador:
+                        await self.limitador.adquirir()
+                    async with self.session.request(metodo, url, **kwargs) as response:
+                        if response.status in ESTADOS_REINTENTO and intento < self.reintentos:
+                            espera = segundos_retry_after(response.headers.get('Retry-After'), 2 ** intento)
+                        else:
+                            response.raise_for_status()
+                            try:
+                                return await response.json(content_type=None), response.headers
+                            except ValueError as e:
+                                raise aiohttp.ClientResponseError(
+                                    response.request_info, response.history, status=response.status,
+                                    message=f"La respuesta no es JSON válido: {e}", headers=response.headers) from e
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if intento == self.reintentos:
+                    if isinstance(e, aiohttp.ClientError):
+                        raise
+                    raise aiohttp.ServerTimeoutError(f"Tiempo agotado en {metodo} {url}") from e
+                espera = 2 ** intento
+            await asyncio.sleep(espera)
+
+    async def get_json(self, url, params=None):
+        datos, _ = await self.peticion('GET', url, params=params)
+        return datos
+
+    async def get_muchos(self, urls, params=None):
+        """
+        Descarga todas las URLs a la vez (dentro de los límites) y devuelve los JSON en el mismo orden;
+        las que fallan devuelven la excepción en su posición en lugar de cortar el resto
+        """
+        return await asyncio.gather(*(self.get_json(url, params) for url in urls), return_exceptions=True)
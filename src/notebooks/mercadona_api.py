@@ -0,0 +1,326 @@
+"""
+Cliente de la API JSON de Mercadona (sin navegador)
+
+La web de Mercadona se construye a partir de https://tienda.mercadona.es/api/,
+la misma API que usa categorias_mercadona.py. Cada categoría devuelve sus
+productos en una sola respuesta, así que no hace falta abrir Chrome, esperar
+ni hacer scroll: se piden los JSON y se convierten a los mismos campos que
+genera mercadona_webscraper.py (elemento_id, texto_completo, nombre, precio, ...)
+"""
+
+import asyncio
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import pandas as pd
+
+from fetcher_async import FetcherAsync
+
+BASE_URL = "https://tienda.mercadona.es/api"
+URL_CATEGORIAS_WEB = "https://tienda.mercadona.es/categories/"
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json',
+}
+
+# Columnas del CSV, en el mismo orden que el scraper con Selenium
+CAMPOS_PRODUCTO = ['elemento_id', 'texto_completo', 'nombre', 'precio', 'precio_unidad',
+                   'marca', 'imagen_url', 'categoria_url', 'categoria_nombre']
+
+# Cómo muestra la web cada unidad de tamaño (y a cuál pasa si la cantidad es menor que 1)
+UNIDADES_TAMANO = {
+    'kg': ('kg', 'g'),
+    'l': ('L', 'ml'),
+    'g': ('g', None),
+    'ml': ('ml', None),
+}
+
+def formatear_numero(valor):
+    """Número con coma decimal y sin ceros sobrantes, como en la web (0.5 -> '0,5')"""
+    return f"{float(valor):.3f}".rstrip('0').rstrip('.').replace('.', ',')
+
+def formatear_precio(valor):
+    """Precio con dos decimales y coma decimal (2.5 -> '2,50 €')"""
+    return f"{float(valor):.2f} €".replace('.', ',')
+
+def formatear_tamano(cantidad, unidad):
+    """
+    Tamaño tal y como lo muestra la web: 0.43 l -> '430 ml', 5 l -> '5 L'
+    """
+    if cantidad is None:
+        return ''
+    unidad = (unidad or '').lower()
+    mostrar, menor = UNIDADES_TAMANO.get(unidad, (unidad, None))
+    cantidad = float(cantidad)
+    if menor and cantidad < 1:
+        cantidad, mostrar = cantidad * 1000, menor
+    return f"{formatear_numero(cantidad)} {mostrar}".strip()
+
+def formato_producto(producto):
+    """
+    Construye la línea de formato de la tarjeta del producto
+    ('Garrafa 5 L', '4 ud. x 125 g', 'Bandeja 500 g aprox.')
+    """
+    precios = producto.get('price_instructions') or {}
+
+    if precios.get('is_pack'):
+        unidades = formatear_numero(precios.get('total_units') or 0)
+        nombre_unidad = precios.get('unit_name') or 'ud.'
+        formato = f"{unidades} {nombre_unidad} x {formatear_tamano(precios.get('pack_size'), precios.get('size_format'))}"
+    else:
+        tamano = formatear_tamano(precios.get('unit_size'), precios.get('size_format'))
+        formato = ' '.join(parte for parte in (producto.get('packaging'), tamano) if parte)
+
+    if precios.get('approx_size'):
+        formato += ' aprox.'
+    return formato
+
+def precio_producto(producto):
+    """
+    Construye la línea de precio de la tarjeta ('18,75 € /ud.', '2,65 €2,00 € /ud.' si hay rebaja)
+    """
+    precios = producto.get('price_instructions') or {}
+    texto = ''
+    if precios.get('previous_unit_price'):
+        texto += formatear_precio(str(precios['previous_unit_price']).strip())
+    texto += formatear_precio(precios['unit_price'])
+
+    if precios.get('is_pack'):
+        texto += ' /pack'
+    elif precios.get('bulk_price') and precios.get('selling_method') == 2:
+        texto += ' /kg'
+    else:
+        texto += ' /ud.'
+    return texto
+
+def producto_a_fila(producto, idx, categoria_id):
+    """
+    Convierte un producto de la API en un diccionario con los campos del scraper con Selenium
+    """
+    nombre = producto.get('display_name', 'N/A')
+    formato = formato_producto(producto)
+    precio = precio_producto(producto)
+
+    return {
+        'elemento_id': idx,
+        'texto_completo': '\n'.join(linea for linea in (nombre, formato, precio) if linea),
+        'nombre': nombre,
+        'precio': precio,
+        'precio_unidad': 'N/A',
+        'marca': 'N/A',
+        'imagen_url': producto.get('thumbnail') or 'N/A',
+        'categoria_url': f"{URL_CATEGORIAS_WEB}{categoria_id}",
+        'categoria_nombre': str(categoria_id),
+    }
+
+def productos_de_categoria(categoria):
+    """
+    Recorre la respuesta de una categoría (y sus subcategorías) devolviendo los productos en orden
+    """
+    yield from categoria.get('products', [])
+    for subcategoria in categoria.get('categories', []):
+        yield from productos_de_categoria(subcategoria)
+
+def ids_categorias(listado):
+    """Ids de las categorías de segundo nivel de una página del listado de categorías"""
+    return [str(hija['id']) for grupo in listado.get('results', []) for hija in grupo.get('categories', [])]
+
+def id_categoria(categoria):
+    """Acepta el id o la URL de la web ('https://tienda.mercadona.es/categories/112' -> '112')"""
+    return str(categoria).rstrip('/').split('/')[-1]
+
+class MercadonaAPI:
+    """
+    Cliente HTTP de la API de Mercadona
+
+    Parámetros:
+    base_url: raíz de la API (se puede apuntar a un servidor local de pruebas)
+    almacen: almacén ('wh') cuyos precios se consultan; None = el que asigne la API
+    """
+
+    def __init__(self, base_url=BASE_URL, almacen=None, lang='es', timeout=15, reintentos=3):
+        self.base_url = base_url.rstrip('/')
+        self.almacen = almacen
+        self.lang = lang
+        self.timeout = timeout
+
+        # Sesión reutilizada (mantiene la conexión abierta) con reintentos ante errores temporales
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        retry = Retry(total=reintentos, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504],
+                      allowed_methods=['GET', 'PUT'])
+        self.session.mount('http://', HTTPAdapter(max_retries=retry))
+        self.session.mount('https://', HTTPAdapter(max_retries=retry))
+
+    def _params(self):
+        params = {'lang': self.lang}
+        if self.almacen:
+            params['wh'] = self.almacen
+        return params
+
+    def _get(self, ruta):
+        return self._get_url(f"{self.base_url}/{ruta}", self._params())
+
+    def _get_url(self, url, params=None):
+        response = self.session.get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def configurar_codigo_postal(self, codigo_postal):
+        """
+        Fija el almacén a partir del código postal, igual que el modal de la web
+
+        Retorna:
+        --------
+        str o None : almacén asignado
+        """
+        try:
+            response = self.session.put(f"{self.base_url}/postal-codes/actions/change-pc/",
+                                        json={'new_postal_code': codigo_postal}, timeout=self.timeout)
+            response.raise_for_status()
+            self.almacen = response.headers.get('x-customer-wh') or self.almacen
+            print(f"✓ Código postal {codigo_postal} -> almacén {self.almacen}")
+        except requests.exceptions.RequestException as e:
+            print(f"⚠ No se pudo configurar el código postal: {e}")
+        return self.almacen
+
+    def obtener_categorias(self):
+        """
+        Devuelve los ids de todas las categorías con productos (las del segundo nivel del menú)
+
+        El listado está paginado: se siguen los enlaces 'next' hasta la última página
+        """
+        data = self._get('categories/')
+        categorias = ids_categorias(data)
+        while data.get('next'):
+            # El enlace ya incluye los parámetros de la primera petición
+            data = self._get_url(data['next'])
+            categorias.extend(ids_categorias(data))
+        return categorias
+
+    def obtener_categoria(self, categoria):
+        """JSON de una categoría con sus subcategorías y productos"""
+        return self._get(f"categories/{id_categoria(categoria)}/")
+
+    def productos_categoria(self, categoria):
+        """
+        Productos de una categoría con los campos del scraper con Selenium
+        """
+        cat_id = id_categoria(categoria)
+        data = self.obtener_categoria(cat_id)
+        return [producto_a_fila(producto, idx, cat_id)
+                for idx, producto in enumerate(productos_de_categoria(data), 1)]
+
+    def cerrar(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+def scrape_mercadona_api(codigo_postal='46001', categorias_especificas=None, base_url=BASE_URL):
+    """
+    Equivalente a mercadona_webscraper.scrape_mercadona usando solo peticiones HTTP
+
+    Args:
+        codigo_postal: Código postal de la tienda (None para no configurarlo)
+        categorias_especificas: Lista de URLs o ids de categorías, o None para todas
+        base_url: Raíz de la API
+    """
+    todos_productos = []
+
+    with MercadonaAPI(base_url=base_url) as api:
+        if codigo_postal:
+            api.configurar_codigo_postal(codigo_postal)
+
+        if categorias_especificas:
+            categorias = categorias_especificas
+        else:
+            categorias = api.obtener_categorias()
+        print(f"Procesando {len(categorias)} categorías...")
+
+        for idx, categoria in enumerate(categorias, 1):
+            try:
+                productos = api.productos_categoria(categoria)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"✗ Error en categoría {id_categoria(categoria)}: {e}")
+                continue
+            todos_productos.extend(productos)
+            print(f"[{idx}/{len(categorias)}] Categoría {id_categoria(categoria)}: {len(productos)} productos")
+
+    print(f"Total productos obtenidos: {len(todos_productos)}")
+    return todos_productos
+
+async def scrape_mercadona_api_async(codigo_postal='46001', categorias_especificas=None, base_url=BASE_URL,
+                                    max_por_host=8, peticiones_por_segundo=10, lang='es', timeout=15, reintentos=3):
+    """
+    Versión asíncrona de scrape_mercadona_api: todas las categorías se piden a la vez
+    a través de FetcherAsync (sesión compartida, límite por host y de tasa)
+
+    En un notebook se usa con await; desde un script, con asyncio.run(...)
+    """
+    base_url = base_url.rstrip('/')
+    params = {'lang': lang}
+    todos_productos = []
+
+    async with FetcherAsync(max_por_host=max_por_host, peticiones_por_segundo=peticiones_por_segundo,
+                            timeout=timeout, reintentos=reintentos) as fetcher:
+        if codigo_postal:
+            try:
+                _, cabeceras = await fetcher.peticion('PUT', f"{base_url}/postal-codes/actions/change-pc/",
+                                                      json={'new_postal_code': codigo_postal})
+                if cabeceras.get('x-customer-wh'):
+                    params['wh'] = cabeceras['x-customer-wh']
+                print(f"✓ Código postal {codigo_postal} -> almacén {params.get('wh')}")
+            except aiohttp.ClientError as e:
+                print(f"⚠ No se pudo configurar el código postal: {e}")
+
+        if categorias_especificas:
+            categorias = [id_categoria(categoria) for categoria in categorias_especificas]
+        else:
+            try:
+                data = await fetcher.get_json(f"{base_url}/categories/", params)
+                categorias = ids_categorias(data)
+                while data.get('next'):
+                    data = await fetcher.get_json(data['next'])
+                    categorias.extend(ids_categorias(data))
+            except aiohttp.ClientError as e:
+                print(f"✗ No se pudo obtener el listado de categorías: {e}")
+                return todos_productos
+        print(f"Procesando {len(categorias)} categorías...")
+
+        respuestas = await fetcher.get_muchos([f"{base_url}/categories/{cat_id}/" for cat_id in categorias], params)
+
+    # Las respuestas llegan en el orden de las categorías, así que el resultado es el mismo que en serie
+    for idx, (cat_id, data) in enumerate(zip(categorias, respuestas), 1):
+        if isinstance(data, Exception):
+            print(f"✗ Error en categoría {cat_id}: {data}")
+            continue
+        productos = [producto_a_fila(producto, i, cat_id) for i, producto in enumerate(productos_de_categoria(data), 1)]
+        todos_productos.extend(productos)
+        print(f"[{idx}/{len(categorias)}] Categoría {cat_id}: {len(productos)} productos")
+
+    print(f"Total productos obtenidos: {len(todos_productos)}")
+    return todos_productos
+
+def guardar_csv(productos, nombre_archivo='mercadona_raw.csv'):
+    """Guarda productos en CSV con las columnas del scraper con Selenium"""
+    if not productos:
+        print("⚠ No hay productos para guardar")
+        return
+
+    df = pd.DataFrame(productos, columns=CAMPOS_PRODUCTO)
+    df.to_csv(nombre_archivo, index=False, encoding='utf-8-sig')
+    print(f"✓ Archivo guardado: {nombre_archivo} ({len(df)} productos)")
+
+if __name__ == "__main__":
+    # Mismas categorías que el scraper con Selenium
+    categorias = pd.read_csv("mercadona_categorias_grupos.csv")["URL"].tolist()
+
+    productos = asyncio.run(scrape_mercadona_api_async(codigo_postal="46001", categorias_especificas=categorias))
+    guardar_csv(productos)
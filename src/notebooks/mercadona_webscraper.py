@@ -8,6 +8,59 @@ from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import pandas as pd
 
+from pool_selenium import procesar_en_pool
+from checkpoint import Checkpoint
+from escritor_streaming import EscritorProductos
+
+# Elementos que cuentan como tarjetas de producto al esperar a que termine la carga
+SELECTOR_PRODUCTOS = "button[class*='product'], div[class*='product'], article, li[class*='product'], [data-test*='product']"
+
+# Script que resume la actividad de red de la página: estado de carga y recursos pedidos hasta ahora
+# (se amplía el buffer de Resource Timing para que el contador no se quede en 250)
+SCRIPT_ACTIVIDAD_RED = """
+performance.setResourceTimingBufferSize(100000);
+return document.readyState + ':' + performance.getEntriesByType('resource').length;
+"""
+
+def esperar_valor_estable(driver, script, timeout=10, estable=1.0, intervalo=0.25, valido=None):
+    """
+    Ejecuta script cada intervalo segundos hasta que su resultado no cambia durante estable segundos
+    
+    Args:
+        script: JavaScript que devuelve el valor a vigilar (altura, nº de productos, ...)
+        timeout: espera máxima; si se alcanza se continúa con el último valor
+        valido: función opcional que el valor debe cumplir para darlo por bueno
+    
+    Returns:
+        (valor, True si se estabilizó o False si saltó el timeout)
+    """
+    limite = time.monotonic() + timeout
+    valor = driver.execute_script(script)
+    desde = time.monotonic()
+    
+    while time.monotonic() < limite:
+        time.sleep(intervalo)
+        nuevo = driver.execute_script(script)
+        if nuevo != valor:
+            valor, desde = nuevo, time.monotonic()
+        elif time.monotonic() - desde >= estable and (valido is None or valido(valor)):
+            return valor, True
+    
+    return valor, False
+
+def esperar_red_inactiva(driver, timeout=10, inactividad=0.5):
+    """Espera a que la página esté cargada y no pida recursos nuevos durante inactividad segundos"""
+    _, inactiva = esperar_valor_estable(driver, SCRIPT_ACTIVIDAD_RED, timeout=timeout, estable=inactividad,
+                                        valido=lambda valor: valor.startswith('complete'))
+    return inactiva
+
+def esperar_productos_estables(driver, timeout=10, estable=1.0):
+    """Espera a que haya productos y su número deje de crecer; devuelve cuántos hay"""
+    script = f"return document.querySelectorAll({SELECTOR_PRODUCTOS!r}).length"
+    num_productos, _ = esperar_valor_estable(driver, script, timeout=timeout, estable=estable,
+                                             valido=lambda valor: valor > 0)
+    return num_productos
+
 def setup_driver(headless=False):
     """Configura el driver de Selenium"""
     chrome_options = Options()
@@ -33,14 +86,13 @@ def manejar_codigo_postal(driver, codigo_postal='46001'):   # Valencia por defec
         
         # Esperar que aparezca el input
         postal_input = wait.until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "input[type='text']"))
+            EC.element_to_be_clickable((By.CSS_SELECTOR, "input[type='text']"))
         )
-        time.sleep(2)
         
         postal_input.clear()
         postal_input.send_keys(codigo_postal)
+        wait.until(lambda d: postal_input.get_attribute("value") == codigo_postal)
         print(f"✓ Código postal {codigo_postal} introducido")
-        time.sleep(2)
         
         # Buscar y hacer click en el botón
         buttons = driver.find_elements(By.TAG_NAME, "button")
@@ -51,7 +103,11 @@ def manejar_codigo_postal(driver, codigo_postal='46001'):   # Valencia por defec
                 break
         
         # Esperar a que desaparezca el modal y se cargue el contenido
-        time.sleep(5)
+        try:
+            wait.until(EC.staleness_of(postal_input))
+        except TimeoutException:
+            pass
+        esperar_red_inactiva(driver, timeout=10)
         
         # Esperar a que aparezcan productos
         wait.until(EC.presence_of_element_located((By.TAG_NAME, "button")))
@@ -63,23 +119,27 @@ def manejar_codigo_postal(driver, codigo_postal='46001'):   # Valencia por defec
         print(f"Error con código postal: {e}")
         return False
 
-def scroll_completo(driver, pausas=10):
-    """Hace scroll completo para cargar todo el contenido lazy-loading"""
+def scroll_completo(driver, pausas=10, timeout_paso=5):
+    """
+    Hace scroll completo para cargar todo el contenido lazy-loading
+    
+    En cada paso, en lugar de una pausa fija, espera a que la altura de la página y
+    el número de productos dejen de cambiar (como mucho timeout_paso segundos)
+    """
     print("Realizando scroll para cargar productos...")
+    script_carga = f"return [document.body.scrollHeight, document.querySelectorAll({SELECTOR_PRODUCTOS!r}).length]"
     
     # Scroll hacia abajo poco a poco
     for i in range(pausas):
-        altura_actual = driver.execute_script("return window.pageYOffset")
         altura_total = driver.execute_script("return document.body.scrollHeight")
         
         # Scroll gradual
         driver.execute_script(f"window.scrollTo(0, {altura_total * (i+1) / pausas});")
-        time.sleep(1.5)
-        print(f"  Scroll {i+1}/{pausas}")
+        (altura_total, num_productos), _ = esperar_valor_estable(driver, script_carga, timeout=timeout_paso, estable=0.5)
+        print(f"  Scroll {i+1}/{pausas} (altura {altura_total}, productos {num_productos})")
     
     # Volver arriba
     driver.execute_script("window.scrollTo(0, 0);")
-    time.sleep(2)
     print("✓ Scroll completado")
 
 def extraer_productos_selenium(driver):
@@ -93,7 +153,8 @@ def extraer_productos_selenium(driver):
         wait = WebDriverWait(driver, 10)
         wait.until(EC.presence_of_element_located((By.TAG_NAME, "button")))
         
-        time.sleep(3)
+        # Esperar a que el número de productos deje de crecer
+        esperar_productos_estables(driver, timeout=10)
         
         # Buscar todos los botones que podrían ser productos
         # En SPAs de React, los productos suelen ser botones clickeables
@@ -209,7 +270,7 @@ def obtener_categorias_recursivo(driver, url_base):
         try:
             print(f"\n  Explorando: {url_actual}")
             driver.get(url_actual)
-            time.sleep(4)
+            esperar_red_inactiva(driver, timeout=10)
             
             # Buscar todos los enlaces
             enlaces = driver.find_elements(By.TAG_NAME, "a")
@@ -259,7 +320,96 @@ def obtener_categorias_recursivo(driver, url_base):
     
     return categorias_finales
 
-def scrape_mercadona(codigo_postal='46001', categorias_especificas=None, headless=False):
+def preparar_driver(codigo_postal='46001', headless=False):
+    """Abre un driver en la home de Mercadona con el código postal ya configurado"""
+    driver = setup_driver(headless=headless)
+    driver.get("https://tienda.mercadona.es/categories/")
+    esperar_red_inactiva(driver, timeout=15)
+    
+    if not manejar_codigo_postal(driver, codigo_postal):
+        print("⚠ Continuando sin código postal...")
+    return driver
+
+def scrape_categoria(driver, cat_url):
+    """Extrae los productos de una categoría y les añade la URL y el nombre de la categoría"""
+    nombre_cat = cat_url.split('/categories/')[-1]
+    
+    driver.get(cat_url)
+    esperar_red_inactiva(driver, timeout=15)
+    
+    scroll_completo(driver, pausas=8)
+    productos = extraer_productos_selenium(driver)
+    
+    # Agregar info de categoría
+    for p in productos:
+        p['categoria_url'] = cat_url
+        p['categoria_nombre'] = nombre_cat
+    
+    return productos
+
+def scrape_mercadona_paralelo(categorias, codigo_postal='46001', headless=True, num_workers=4, checkpoint=None,
+                              escritor=None):
+    """
+    Reparte las categorías entre num_workers navegadores, cada uno con el código postal ya configurado
+    
+    Los productos se devuelven (o se pasan a escritor) en el orden de categorias, como en scrape_mercadona
+    """
+    print("="*70)
+    print(f"SCRAPING MERCADONA - {num_workers} NAVEGADORES EN PARALELO")
+    print("="*70)
+    
+    todos_productos = []
+    total = 0
+    
+    def procesar(driver, cat_url):
+        # Las categorías ya completadas en una ejecución anterior no se vuelven a descargar
+        if checkpoint and checkpoint.completado(cat_url):
+            return checkpoint.productos(cat_url)
+        
+        productos = scrape_categoria(driver, cat_url)
+        # Una categoría sin productos suele ser un fallo de carga: no se da por terminada
+        if checkpoint and productos:
+            checkpoint.guardar(cat_url, 1, productos)
+        print(f"✓ {cat_url.split('/categories/')[-1]}: {len(productos)} productos")
+        return productos
+    
+    def al_completar(cat_url, productos):
+        # Llega en el orden de categorias en cuanto están listas todas las anteriores
+        nonlocal total
+        if productos is None:
+            print(f"✗ Categoría sin procesar: {cat_url}")
+            return
+        if escritor:
+            escritor.escribir(productos)
+        else:
+            todos_productos.extend(productos)
+        total += len(productos)
+    
+    pendientes = [cat_url for cat_url in categorias if not (checkpoint and checkpoint.completado(cat_url))]
+    if len(pendientes) < len(categorias):
+        print(f"Reanudando: {len(categorias) - len(pendientes)} categorías recuperadas del checkpoint")
+    
+    if pendientes:
+        procesar_en_pool(
+            categorias,
+            iniciar_worker=lambda: preparar_driver(codigo_postal, headless),
+            procesar=procesar,
+            cerrar_worker=lambda driver: driver.quit(),
+            num_workers=min(num_workers, len(pendientes)),
+            al_completar=al_completar,
+        )
+    else:
+        for cat_url in categorias:
+            al_completar(cat_url, checkpoint.productos(cat_url))
+    
+    print(f"\n{'='*70}")
+    print(f"SCRAPING FINALIZADO")
+    print(f"Total productos obtenidos: {total}")
+    print(f"{'='*70}\n")
+    return todos_productos
+
+def scrape_mercadona(codigo_postal='46001', categorias_especificas=None, headless=False, num_workers=1,
+                     checkpoint=None, escritor=None):
     """
     Scraping completo de Mercadona
     
@@ -267,9 +417,31 @@ def scrape_mercadona(codigo_postal='46001', categorias_especificas=None, headles
         codigo_postal: Código postal de la tienda
         categorias_especificas: Lista de URLs de categorías específicas o None para todas
         headless: Ejecutar sin interfaz gráfica
+        num_workers: Navegadores en paralelo (solo con categorias_especificas)
+        checkpoint: Archivo donde se guarda cada categoría terminada; si ya existe,
+            se reanuda saltando las categorías que contiene
+        escritor: EscritorProductos al que se pasan los productos de cada categoría según
+            terminan; en ese caso no se acumulan en memoria y se devuelve una lista vacía
     """
+    if checkpoint and not isinstance(checkpoint, Checkpoint):
+        with Checkpoint(checkpoint) as registro:
+            return scrape_mercadona(codigo_postal, categorias_especificas, headless, num_workers, registro, escritor)
+    
+    if num_workers > 1 and categorias_especificas:
+        return scrape_mercadona_paralelo(categorias_especificas, codigo_postal, headless, num_workers, checkpoint,
+                                         escritor)
+    
     driver = setup_driver(headless=headless)
     todos_productos = []
+    total = 0
+    
+    def guardar(productos):
+        nonlocal total
+        if escritor:
+            escritor.escribir(productos)
+        else:
+            todos_productos.extend(productos)
+        total += len(productos)
     
     try:
         print("="*70)
@@ -279,7 +451,7 @@ def scrape_mercadona(codigo_postal='46001', categorias_especificas=None, headles
         # Acceder a la página principal
         print(f"\n1. Accediendo a la home de Mercadona...")
         driver.get("https://tienda.mercadona.es/categories/")
-        time.sleep(5)
+        esperar_red_inactiva(driver, timeout=15)
         
         # Manejar código postal
         print(f"\n2. Configurando código postal...")
@@ -315,21 +487,19 @@ def scrape_mercadona(codigo_postal='46001', categorias_especificas=None, headles
                 print(f"[{idx}/{len(categorias)}] Categoría: {nombre_cat}")
                 print(f"{'='*70}")
                 
+                if checkpoint and checkpoint.completado(cat_url):
+                    productos = checkpoint.productos(cat_url)
+                    guardar(productos)
+                    print(f"✓ Recuperada del checkpoint ({len(productos)} productos)")
+                    continue
+                
                 try:
-                    driver.get(cat_url)
-                    time.sleep(5)
-                    
-                    scroll_completo(driver, pausas=8)
-                    productos = extraer_productos_selenium(driver)
-                    
-                    # Agregar info de categoría
-                    for p in productos:
-                        p['categoria_url'] = cat_url
-                        p['categoria_nombre'] = nombre_cat
-                    
-                    todos_productos.extend(productos)
+                    productos = scrape_categoria(driver, cat_url)
+                    if checkpoint and productos:
+                        checkpoint.guardar(cat_url, 1, productos)
+                    guardar(productos)
                     print(f"✓ Productos en esta categoría: {len(productos)}")
-                    print(f"✓ Total acumulado: {len(todos_productos)} productos")
+                    print(f"✓ Total acumulado: {total} productos")
                     
                 except Exception as e:
                     print(f"✗ Error en categoría {nombre_cat}: {e}")
@@ -346,7 +516,7 @@ def scrape_mercadona(codigo_postal='46001', categorias_especificas=None, headles
         driver.quit()
         print(f"\n{'='*70}")
         print(f"SCRAPING FINALIZADO")
-        print(f"Total productos obtenidos: {len(todos_productos)}")
+        print(f"Total productos obtenidos: {total}")
         print(f"{'='*70}\n")
     
     return todos_productos
@@ -562,14 +732,19 @@ if __name__ == "__main__":
         "https://tienda.mercadona.es/categories/98",
         # Añade más URLs aquí...
     ]
-    productos = scrape_mercadona(
-        codigo_postal=codigo_postal,
-        categorias_especificas=categorias_manual,
-        headless=True
-    )
+    # Los productos se escriben en el CSV según termina cada categoría, sin acumularlos en memoria
+    with EscritorProductos('mercadona_productos_2.csv') as escritor:
+        scrape_mercadona(
+            codigo_postal=codigo_postal,
+            categorias_especificas=categorias_manual,
+            headless=True,
+            num_workers=4,  # Navegadores en paralelo
+            checkpoint="mercadona_checkpoint.jsonl",  # Permite reanudar si el proceso se corta
+            escritor=escritor
+        )
     
-    if productos:
-        guardar_csv(productos)
+    if escritor.filas:
+        print(f"\n✓ Archivo guardado: {escritor.ruta} ({escritor.filas} productos)")
         print("\n" + "="*70)
         print("✓ ¡SCRAPING COMPLETADO EXITOSAMENTE!")
         print("="*70)
@@ -583,5 +758,5 @@ if __name__ == "__main__":
         print("  3. Problemas de red o timeout")
         print("\nSugerencias:")
         print("  - Ejecuta con headless=False para ver qué ocurre")
-        print("  - Aumenta los tiempos de espera (time.sleep)")
+        print("  - Aumenta los timeouts de las esperas (esperar_red_inactiva, scroll_completo)")
         print("  - Verifica el código postal sea válido")
\ No newline at end of file
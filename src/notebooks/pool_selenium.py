@@ -0,0 +1,89 @@
+"""
+Pool de navegadores Selenium para repartir categorías entre varios drivers
+
+Cada worker es un hilo con su propio driver ya preparado (código postal,
+cookies, ...) que va sacando tareas de una cola compartida. Los resultados se
+guardan en la posición de su tarea, de modo que el orden final es el mismo que
+con un solo driver independientemente de qué worker termine antes
+"""
+
+import queue
+import threading
+import traceback
+
+def procesar_en_pool(tareas, iniciar_worker, procesar, cerrar_worker, num_workers=4, al_completar=None):
+    """
+    Reparte las tareas entre num_workers hilos, cada uno con su propio recurso (driver)
+
+    Args:
+        tareas: lista de tareas (URLs, diccionarios de categoría, ...)
+        iniciar_worker: función sin argumentos que crea y prepara el driver de un worker
+        procesar: función (driver, tarea) -> resultado
+        cerrar_worker: función (driver) que libera el driver al terminar
+        num_workers: número de drivers en paralelo
+        al_completar: función opcional (tarea, resultado) que recibe los resultados en el
+            orden de tareas en cuanto están disponibles; en ese caso no se guardan en memoria
+
+    Returns:
+        Lista de resultados en el mismo orden que tareas (None si la tarea no llegó a
+        procesarse o si se ha usado al_completar)
+    """
+    cola = queue.Queue()
+    for idx, tarea in enumerate(tareas):
+        cola.put((idx, tarea))
+
+    resultados = [None] * len(tareas)
+    terminadas = set()
+    siguiente = 0
+    lock = threading.Lock()
+
+    def entregar(idx, resultado):
+        # Guarda el resultado y entrega en orden todos los que ya no esperan a una tarea anterior
+        nonlocal siguiente
+        with lock:
+            resultados[idx] = resultado
+            terminadas.add(idx)
+            if al_completar is None:
+                return
+            while siguiente in terminadas:
+                al_completar(tareas[siguiente], resultados[siguiente])
+                resultados[siguiente] = None
+                siguiente += 1
+
+    def worker(num):
+        try:
+            driver = iniciar_worker()
+        except Exception as e:
+            # Si un driver no arranca, el resto de workers se reparte sus tareas
+            print(f"✗ Worker {num}: no se pudo iniciar el driver: {e}")
+            return
+
+        try:
+            while True:
+                try:
+                    idx, tarea = cola.get_nowait()
+                except queue.Empty:
+                    break
+                resultado = None
+                try:
+                    resultado = procesar(driver, tarea)
+                except Exception as e:
+                    print(f"✗ Worker {num}: error en la tarea {idx + 1}: {e}")
+                    traceback.print_exc()
+                entregar(idx, resultado)
+        finally:
+            cerrar_worker(driver)
+
+    hilos = [threading.Thread(target=worker, args=(num,), name=f"selenium-{num}")
+             for num in range(1, min(num_workers, len(tareas)) + 1)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    # Tareas que ningún worker pudo procesar (todos los drivers fallaron al arrancar)
+    for idx in range(len(tareas)):
+        if idx not in terminadas:
+            entregar(idx, None)
+
+    return resultados
@@ -1,5 +1,136 @@
 import re
+import unicodedata
+from collections import deque, namedtuple
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+def plegar_acentos(texto):
+    """
+    Elimina tildes y diacríticos de un texto ('Nestlé' -> 'Nestle', 'Señorío' -> 'Senorio').
+    """
+    return ''.join(c for c in unicodedata.normalize('NFD', texto) if not unicodedata.combining(c))
+
+
+class IndiceMarcas:
+    """
+    Índice de marcas conocidas construido una sola vez (autómata de Aho-Corasick).
+    
+    Busca todas las marcas a la vez recorriendo el nombre del producto una única vez,
+    por lo que el coste depende de la longitud del nombre y no del tamaño del diccionario.
+    Conserva el criterio de extraer_marca_con_diccionario: gana la marca más larga y,
+    a igual longitud, la que aparece antes en la lista.
+    
+    Parámetros:
+    -----------
+    marcas_conocidas : list
+        Listado de marcas a indexar
+    plegar_acentos : bool
+        Si es True se ignoran las tildes al comparar ('nestle' encuentra 'Nestlé')
+    """
+    
+    def __init__(self, marcas_conocidas, plegar_acentos=False):
+        self.plegar_acentos = plegar_acentos
+        self._transiciones = [{}]
+        self._fallos = [0]
+        # Mejor marca que termina en cada nodo como (-longitud, posición, marca)
+        self._salidas = [None]
+        
+        for posicion, marca in enumerate(marcas_conocidas):
+            clave = self._normalizar(marca)
+            if not clave:
+                continue
+            
+            nodo = 0
+            for caracter in clave:
+                siguiente = self._transiciones[nodo].get(caracter)
+                if siguiente is None:
+                    siguiente = len(self._transiciones)
+                    self._transiciones[nodo][caracter] = siguiente
+                    self._transiciones.append({})
+                    self._fallos.append(0)
+                    self._salidas.append(None)
+                nodo = siguiente
+            
+            candidata = (-len(marca), posicion, marca)
+            if self._salidas[nodo] is None or candidata < self._salidas[nodo]:
+                self._salidas[nodo] = candidata
+        
+        # Enlaces de fallo por niveles (BFS): cada nodo hereda la mejor marca de su sufijo
+        cola = deque(self._transiciones[0].values())
+        while cola:
+            nodo = cola.popleft()
+            for caracter, hijo in self._transiciones[nodo].items():
+                fallo = self._fallos[nodo]
+                while fallo and caracter not in self._transiciones[fallo]:
+                    fallo = self._fallos[fallo]
+                fallo = self._transiciones[fallo].get(caracter, 0)
+                self._fallos[hijo] = fallo
+                
+                heredada = self._salidas[fallo]
+                if heredada is not None and (self._salidas[hijo] is None or heredada < self._salidas[hijo]):
+                    self._salidas[hijo] = heredada
+                cola.append(hijo)
+    
+    def _normalizar(self, texto):
+        texto = texto.lower()
+        return plegar_acentos(texto) if self.plegar_acentos else texto
+    
+    def buscar(self, nombre):
+        """
+        Devuelve la marca conocida contenida en el nombre o None si no hay ninguna.
+        """
+        transiciones = self._transiciones
+        fallos = self._fallos
+        salidas = self._salidas
+        
+        nodo = 0
+        mejor = None
+        for caracter in self._normalizar(nombre):
+            while nodo and caracter not in transiciones[nodo]:
+                nodo = fallos[nodo]
+            nodo = transiciones[nodo].get(caracter, 0)
+            
+            salida = salidas[nodo]
+            if salida is not None and (mejor is None or salida < mejor):
+                mejor = salida
+        
+        return mejor[2] if mejor is not None else None
+
+
+# Índices construidos a partir de listas: id(lista) -> (lista, longitud, índice).
+# Se guarda la propia lista para que su id no pueda reutilizarse mientras esté en la caché
+_indices_por_lista = {}
+MAX_INDICES_POR_LISTA = 8
+
+
+def _indice_para(marcas_conocidas):
+    """
+    Índice de marcas para una lista, construido la primera vez y reutilizado después.
+    
+    La caché se consulta por identidad de la lista y su longitud, sin recorrerla, así
+    que el coste por llamada no depende del tamaño del diccionario. Añadir o quitar
+    marcas de la lista reconstruye el índice; si se sustituye una marca por otra sin
+    cambiar la longitud hay que construir un IndiceMarcas nuevo y pasarlo directamente.
+    """
+    if isinstance(marcas_conocidas, IndiceMarcas):
+        return marcas_conocidas
+    if not isinstance(marcas_conocidas, (list, tuple)):
+        return IndiceMarcas(list(marcas_conocidas))
+    
+    entrada = _indices_por_lista.get(id(marcas_conocidas))
+    if entrada is not None and entrada[0] is marcas_conocidas and entrada[1] == len(marcas_conocidas):
+        return entrada[2]
+    
+    if len(_indices_por_lista) >= MAX_INDICES_POR_LISTA:
+        # Se descarta el índice más antiguo (los diccionarios conservan el orden de inserción)
+        del _indices_por_lista[next(iter(_indices_por_lista))]
+    indice = IndiceMarcas(marcas_conocidas)
+    _indices_por_lista[id(marcas_conocidas)] = (marcas_conocidas, len(marcas_conocidas), indice)
+    return indice
 
 
 # Usando un diccionario de marcas conocidas
@@ -7,21 +138,65 @@ def extraer_marca_con_diccionario(nombre, marcas_conocidas):
     """
     Busca marcas conocidas en el nombre del producto
     Este es el método más preciso si tienes un listado de marcas
+    
+    marcas_conocidas puede ser un IndiceMarcas ya construido (la forma más rápida,
+    por ejemplo indice_marcas_conocidas) o una lista; con una lista el índice se
+    construye la primera vez y se reutiliza mientras sea la misma lista (ver _indice_para).
     """
     if pd.isna(nombre):
         return 'Desconocida'
     
-    nombre_lower = nombre.lower()
+    indice = _indice_para(marcas_conocidas)
     
     # Buscar marca conocida (de más específica a menos)
-    for marca in sorted(marcas_conocidas, key=len, reverse=True):
-        if marca.lower() in nombre_lower:
-            return marca
+    marca = indice.buscar(nombre)
+    if marca is not None:
+        return marca
     
     # Si no encuentra ninguna
     return "Desconocida"
 
 
+def extraer_marcas_serie(nombres, marcas_conocidas):
+    """
+    Extrae la marca de una Serie completa de nombres de producto.
+    
+    Cada nombre distinto se analiza una sola vez y el resultado se reparte a todas
+    las filas en las que se repite, por lo que el coste depende del número de
+    nombres únicos y no del número de filas.
+    
+    Parámetros:
+    -----------
+    nombres : pd.Series
+        Nombres de los productos
+    marcas_conocidas : list o IndiceMarcas
+        Listado de marcas o índice ya construido
+        
+    Retorna:
+    --------
+    pd.Series : Serie categórica 'marca' con el mismo índice que nombres
+    
+    Ejemplo:
+    --------
+    >>> df['marca'] = extraer_marcas_serie(df['nombre'], marcas_conocidas)
+    """
+    indice = _indice_para(marcas_conocidas)
+    
+    # Los nombres nulos reciben el código -1
+    codigos, nombres_unicos = pd.factorize(nombres)
+    
+    marcas_unicas = [indice.buscar(nombre) or 'Desconocida' for nombre in nombres_unicos]
+    # El último elemento cubre el código -1 de los nulos
+    marcas_unicas.append('Desconocida')
+    codigos_marca, categorias = pd.factorize(np.array(marcas_unicas, dtype=object))
+    
+    return pd.Series(
+        pd.Categorical.from_codes(codigos_marca[codigos], categories=categorias),
+        index=nombres.index,
+        name='marca',
+    )
+
+
 # Lista de marcas
 marcas_conocidas = [
     # Marcas blancas y distribución
@@ -163,16 +338,55 @@ marcas_conocidas = [
     'Nuske', 'Durex', 'Royal', 'Levital'
 ]
 
+# Índice precalculado sobre marcas_conocidas para usar directamente en los notebooks
+indice_marcas_conocidas = IndiceMarcas(marcas_conocidas)
+
 
 # APLICAR A TODO TU DATAFRAME
 # ============================
 # Para tu caso, usa:
 # df['marca'] = df['nombre_producto'].apply(extraer_marca_simple)
 #
-# O mejor aún, crea tu lista de marcas conocidas y usa:
+# O mejor aún, crea tu lista de marcas conocidas y usa su índice:
 # df['marca'] = df['nombre_producto'].apply(
-#     lambda x: extraer_marca_con_diccionario(x, marcas_conocidas)
+#     lambda x: extraer_marca_con_diccionario(x, indice_marcas_conocidas)
 # )
+#
+# Para columnas completas es más rápido la versión por lotes:
+# df['marca'] = extraer_marcas_serie(df['nombre_producto'], marcas_conocidas)
+
+
+# Patrones de formato ordenados por prioridad (más específicos primero)
+PATRONES_FORMATO = [
+    # Packs complejos: "pack de 12 latas de 33 cl", "mini pack 10 latas 20 cl"
+    ('pack_complejo', r'(?:mini\s+)?pack\s+(?:de\s+)?\d+\s+(?:latas?|botellas?|briks?|unidades?|uds?)(?:\s+de\s+\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg))?'),
+    
+    # Pack con cantidad y unidad: "pack de 2 unidades de 250 ml"
+    ('pack_unidades', r'pack\s+de\s+\d+\s+unidades?\s+de\s+\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg)'),
+    
+    # Pack simple: "pack de 4 bolsitas de 100 g"
+    ('pack_simple', r'pack\s+de\s+\d+\s+\w+\s+de\s+\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg|ud|uds)'),
+    
+    # Múltiples simples: "6x80 uds", "3x72"
+    ('multiple', r'\d*\s*x\s*\d+(?:\s*(?:ud|uds|unidades|us|d|u|und?))?'),
+    
+    # Con tipo de envase: "lata 33 cl", "botella 1 l", "brik 1 l"
+    ('envase', r'(?:lata|botella|brik|tarrito|bolsita|frasco|sobre|paquete)\s+(?:de\s+)?\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg)'),
+    
+    # Volumen o peso simple al final: "1 l", "500 ml", "100 g"
+    ('volumen_peso', r'\d+[\.,]?\d*\s*(?:l|cl|ml|g|gr|kg)(?:\s|$)'),
+    
+    # Unidades simples: "80 ud", "64 uds"
+    ('unidades', r'\d+\s*(?:u|ud|und|uds|unidades|rollo|rollos|pieza|piezas|pastilla|capsulas|pastillas|sobres|comprimidos|ampollas|lavados|hojas?)(?:\s|$)'),
+]
+
+# Todos los patrones en una sola expresión anclada al inicio: cada rama busca su
+# patrón en todo el nombre (.*?) y solo se prueba si las anteriores no coinciden,
+# por lo que se respeta la prioridad igual que buscando los patrones de uno en uno.
+REGEX_FORMATO = re.compile(
+    r'\A(?:' + '|'.join(rf'.*?(?P<{nombre}>{patron})' for nombre, patron in PATRONES_FORMATO) + ')',
+    re.DOTALL,
+)
 
 
 def extract_product_format(product_name):       # Carrefour
@@ -204,40 +418,58 @@ def extract_product_format(product_name):       # Carrefour
     
     product_name = str(product_name).lower()
     
-    # Lista de patrones ordenados por prioridad (más específicos primero)
-    patterns = [
-        # Packs complejos: "pack de 12 latas de 33 cl", "mini pack 10 latas 20 cl"
-        r'((?:mini\s+)?pack\s+(?:de\s+)?\d+\s+(?:latas?|botellas?|briks?|unidades?|uds?)(?:\s+de\s+\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg))?)',
-        
-        # Pack con cantidad y unidad: "pack de 2 unidades de 250 ml"
-        r'(pack\s+de\s+\d+\s+unidades?\s+de\s+\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg))',
-        
-        # Pack simple: "pack de 4 bolsitas de 100 g"
-        r'(pack\s+de\s+\d+\s+\w+\s+de\s+\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg|ud|uds))',
-        
-        # Múltiples simples: "6x80 uds", "3x72"
-        r'(\d*\s*x\s*\d+(?:\s*(?:ud|uds|unidades|us|d|u|und?))?)',
-        
-        # Con tipo de envase: "lata 33 cl", "botella 1 l", "brik 1 l"
-        r'((?:lata|botella|brik|tarrito|bolsita|frasco|sobre|paquete)\s+(?:de\s+)?\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg))',
-        
-        # Volumen o peso simple al final: "1 l", "500 ml", "100 g"
-        r'(\d+[\.,]?\d*\s*(?:l|cl|ml|g|gr|kg)(?:\s|$))',
-        
-        # Unidades simples: "80 ud", "64 uds"
-        r'(\d+\s*(?:u|ud|und|uds|unidades|rollo|rollos|pieza|piezas|pastilla|capsulas|pastillas|sobres|comprimidos|ampollas|lavados|hojas?)(?:\s|$))',
-    ]
-    
     # Buscar el primer patrón que coincida
-    for pattern in patterns:
-        match = re.search(pattern, product_name)
-        if match:
-            format_str = match.group(1).strip()
-            return format_str
+    match = REGEX_FORMATO.match(product_name)
+    if match:
+        format_str = match.group(match.lastgroup).strip()
+        return format_str
     
     return None
 
 
+def extraer_formatos_serie(nombres):
+    """
+    Versión por lotes de extract_product_format para una Serie completa.
+    
+    Cada nombre distinto se analiza una sola vez con Series.str.extract sobre la
+    expresión compilada REGEX_FORMATO y el resultado se reparte a todas las filas.
+    
+    Parámetros:
+    -----------
+    nombres : pd.Series
+        Nombres de los productos
+        
+    Retorna:
+    --------
+    pd.Series : Formatos extraídos (None si no se encuentra), con el mismo índice que nombres
+    
+    Ejemplo:
+    --------
+    >>> df['formato'] = extraer_formatos_serie(df['nombre'])
+    """
+    # Los nombres nulos reciben el código -1
+    codigos, nombres_unicos = pd.factorize(nombres)
+    nombres_unicos = pd.Series(nombres_unicos, dtype=object).map(str).str.lower()
+    
+    # Una columna por patrón: nos quedamos con la primera que tenga valor
+    coincidencias = nombres_unicos.str.extract(REGEX_FORMATO).astype(object)
+    formatos = coincidencias.iloc[:, -1]
+    for columna in reversed(coincidencias.columns[:-1]):
+        formatos = coincidencias[columna].fillna(formatos)
+    formatos = formatos.str.strip()
+    formatos = formatos.where(formatos.notna(), None)
+    
+    # El último elemento cubre el código -1 de los nulos
+    valores = np.append(formatos.to_numpy(dtype=object), None)
+    return pd.Series(valores[codigos], index=nombres.index, name='formato', dtype=object)
+
+
+# Patrón general que captura todos los formatos posibles
+REGEX_TODOS_FORMATOS = re.compile(
+    r'(?:(?:mini\s+)?pack\s+(?:de\s+)?\d+\s+(?:latas?|botellas?|briks?|unidades?|uds?)(?:\s+de\s+\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg))?)|(?:pack\s+de\s+\d+\s+unidades?\s+de\s+\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg))|(?:pack\s+de\s+\d+\s+\w+\s+de\s+\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg|ud|uds))|(?:\d+\s*x\s*\d+(?:\s*(?:ud|uds|unidades?))?)|(?:(?:lata|botella|brik|tarrito|bolsita|frasco|sobre|paquete)\s+(?:de\s+)?\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg))|(?:\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg))|(?:\d+\s*(?:ud|uds|unidades?))'
+)
+
+
 def extract_all_formats(product_name):
     """
     Extrae TODOS los formatos encontrados en un producto (puede haber varios).
@@ -261,13 +493,22 @@ def extract_all_formats(product_name):
     
     product_name = str(product_name).lower()
     
-    # Patrón general que captura todos los formatos posibles
-    pattern = r'(?:(?:mini\s+)?pack\s+(?:de\s+)?\d+\s+(?:latas?|botellas?|briks?|unidades?|uds?)(?:\s+de\s+\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg))?)|(?:pack\s+de\s+\d+\s+unidades?\s+de\s+\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg))|(?:pack\s+de\s+\d+\s+\w+\s+de\s+\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg|ud|uds))|(?:\d+\s*x\s*\d+(?:\s*(?:ud|uds|unidades?))?)|(?:(?:lata|botella|brik|tarrito|bolsita|frasco|sobre|paquete)\s+(?:de\s+)?\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg))|(?:\d+[\.,]?\d*\s*(?:l|cl|ml|g|kg))|(?:\d+\s*(?:ud|uds|unidades?))'
-    
-    matches = re.findall(pattern, product_name)
+    matches = REGEX_TODOS_FORMATOS.findall(product_name)
     return [m.strip() for m in matches] if matches else []
 
 
+# Expresiones usadas para categorizar un formato
+REGEX_CATEGORIA_MULTIPLE = re.compile(r'\d+\s*x\s*\d+')
+REGEX_CATEGORIA_VOLUMEN = re.compile(r'\d+[\.,]?\d*\s*(l|cl|ml)')
+REGEX_CATEGORIA_PESO = re.compile(r'\d+[\.,]?\d*\s*(g|kg)')
+REGEX_CATEGORIA_UNIDADES = re.compile(r'\d+\s*(ud|uds|unidades?)')
+
+ENVASES_CATEGORIA = ['lata', 'botella', 'brik', 'tarrito', 'bolsita', 'frasco', 'sobre']
+
+# Categorías posibles de un formato (en el orden en que se comprueban)
+CATEGORIAS_FORMATO = ['pack', 'envase_con_cantidad', 'multiple', 'volumen', 'peso', 'unidades', 'otro', 'sin_formato']
+
+
 def categorize_format(format_str):
     """
     Categoriza un formato extraído.
@@ -284,24 +525,58 @@ def categorize_format(format_str):
     if pd.isna(format_str):
         return 'sin_formato'
     
-    format_str = str(format_str).lower()
-    
+    return _categorizar_formato(str(format_str).lower())
+
+
+def _categorizar_formato(format_str):
+    # format_str ya está en minúsculas
     if 'pack' in format_str:
         return 'pack'
-    elif any(word in format_str for word in ['lata', 'botella', 'brik', 'tarrito', 'bolsita', 'frasco', 'sobre']):
+    elif any(word in format_str for word in ENVASES_CATEGORIA):
         return 'envase_con_cantidad'
-    elif re.search(r'\d+\s*x\s*\d+', format_str):
+    elif REGEX_CATEGORIA_MULTIPLE.search(format_str):
         return 'multiple'
-    elif re.search(r'\d+[\.,]?\d*\s*(l|cl|ml)', format_str):
+    elif REGEX_CATEGORIA_VOLUMEN.search(format_str):
         return 'volumen'
-    elif re.search(r'\d+[\.,]?\d*\s*(g|kg)', format_str):
+    elif REGEX_CATEGORIA_PESO.search(format_str):
         return 'peso'
-    elif re.search(r'\d+\s*(ud|uds|unidades?)', format_str):
+    elif REGEX_CATEGORIA_UNIDADES.search(format_str):
         return 'unidades'
     else:
         return 'otro'
 
 
+# Patrón 1: Packs complejos tipo "pack de X unidades de Y ml/g/l/cl/kg"
+REGEX_PACK_COMPLEJO = re.compile(r'pack\s+de\s+(\d+)\s+(?:unidades?|paquetes?|latas?|botellas?|briks?)\s+de\s+(\d+[\.,]?\d*)\s*(ml|cl|l|g|kg|ud|uds)')
+
+# Patrón 2: "pack de X botellas/briks" sin cantidad específica
+REGEX_PACK_CONTEO = re.compile(r'pack\s+(?:de\s+)?(\d+)\s+(botellas?|briks?|latas?|paquetes?|rollos?)')
+
+# Patrón 3: "pack X botellas/briks" (sin "de")
+REGEX_PACK_SIN_DE = re.compile(r'pack\s+(\d+)\s+(botellas?|briks?|latas?)')
+
+# Patrón 4: Múltiples tipo "x72", "x 500", "x50"
+REGEX_POR = re.compile(r'x\s*(\d+)')
+
+# Patrón 5: Múltiples tipo "6x80 uds" o "100 x 6"
+REGEX_MULTIPLE = re.compile(r'(\d+)\s*x\s*(\d+)\s*(?:(ml|cl|l|g|kg|ud|uds|unidades?))?')
+
+# Patrón 6: Cantidad con descriptores tipo "12 rollos", "30 pastillas", "4 piezas", "24 comprimidos"
+REGEX_DESCRIPTOR = re.compile(r'(\d+)\s*(rollos?|pastillas?|piezas?|sobres?|comprimidos?|hojas?|ampollas?|capsula?|u|und(?:\b|$))')
+
+# Patrón 7: "1 paquete" - caso especial
+REGEX_UN_PAQUETE = re.compile(r'\b1\s*paquetes?\b')
+
+# Patrón 8: Pack simple tipo "pack de 12 latas de 33 cl"
+REGEX_PACK_CON_VOLUMEN = re.compile(r'pack\s+de\s+(\d+)\s+(?:latas?|botellas?|briks?)\s+de\s+(\d+[\.,]?\d*)\s*(ml|cl|l|g|kg)')
+
+# Patrón 9: Con envase tipo "lata 33 cl", "botella 1 l"
+REGEX_ENVASE = re.compile(r'(?:lata|botella|brik|tarrito|bolsita|frasco|sobre|paquete)\s+(?:de\s+)?(\d+[\.,]?\d*)\s*(ml|cl|l|g|kg)')
+
+# Patrón 10: Cantidad simple tipo "1500 ml", "36 cl", "80 ud"
+REGEX_CANTIDAD_SIMPLE = re.compile(r'(\d+[\.,]?\d*)\s*(ml|cl|l|g|kg|ud|uds|unidades?)')
+
+
 def calculate_total_quantity(format_str):
     """
     Calcula la cantidad total de un formato y la convierte a unidades estándar (ud, Kg, L).
@@ -324,11 +599,12 @@ def calculate_total_quantity(format_str):
     if pd.isna(format_str) or format_str == '':
         return None
     
-    format_str = str(format_str).lower().strip()
-    
-    # Patrón 1: Packs complejos tipo "pack de X unidades de Y ml/g/l/cl/kg"
-    pattern_pack_complex = r'pack\s+de\s+(\d+)\s+(?:unidades?|paquetes?|latas?|botellas?|briks?)\s+de\s+(\d+[\.,]?\d*)\s*(ml|cl|l|g|kg|ud|uds)'
-    match = re.search(pattern_pack_complex, format_str)
+    return _cantidad_total(str(format_str).lower().strip())
+
+
+def _cantidad_total(format_str):
+    # format_str ya está en minúsculas; los patrones se prueban en orden de prioridad
+    match = REGEX_PACK_COMPLEJO.search(format_str)
     if match:
         multiplier = float(match.group(1))
         quantity = float(match.group(2).replace(',', '.'))
@@ -337,30 +613,22 @@ def calculate_total_quantity(format_str):
         total = multiplier * quantity
         return convert_to_standard_unit(total, unit)
     
-    # Patrón 2: "pack de X botellas/briks" sin cantidad específica
-    pattern_pack_simple_count = r'pack\s+(?:de\s+)?(\d+)\s+(botellas?|briks?|latas?|paquetes?|rollos?)'
-    match = re.search(pattern_pack_simple_count, format_str)
+    match = REGEX_PACK_CONTEO.search(format_str)
     if match:
         quantity = float(match.group(1))
         return round(quantity, 0)
     
-    # Patrón 3: "pack X botellas/briks" (sin "de")
-    pattern_pack_no_de = r'pack\s+(\d+)\s+(botellas?|briks?|latas?)'
-    match = re.search(pattern_pack_no_de, format_str)
+    match = REGEX_PACK_SIN_DE.search(format_str)
     if match:
         quantity = float(match.group(1))
         return round(quantity, 0)
     
-    # Patrón 4: Múltiples tipo "x72", "x 500", "x50"
-    pattern_x = r'x\s*(\d+)'
-    match = re.search(pattern_x, format_str)
+    match = REGEX_POR.search(format_str)
     if match:
         quantity = float(match.group(1))
         return round(quantity, 0)
     
-    # Patrón 5: Múltiples tipo "6x80 uds" o "100 x 6"
-    pattern_multiple = r'(\d+)\s*x\s*(\d+)\s*(?:(ml|cl|l|g|kg|ud|uds|unidades?))?'
-    match = re.search(pattern_multiple, format_str)
+    match = REGEX_MULTIPLE.search(format_str)
     if match:
         num1 = float(match.group(1))
         num2 = float(match.group(2))
@@ -369,20 +637,15 @@ def calculate_total_quantity(format_str):
         total = num1 * num2
         return convert_to_standard_unit(total, unit)
     
-    # Patrón 6: Cantidad con descriptores tipo "12 rollos", "30 pastillas", "4 piezas", "24 comprimidos"
-    pattern_quantity_descriptor = r'(\d+)\s*(rollos?|pastillas?|piezas?|sobres?|comprimidos?|hojas?|ampollas?|capsula?|u|und(?:\b|$))'
-    match = re.search(pattern_quantity_descriptor, format_str)
+    match = REGEX_DESCRIPTOR.search(format_str)
     if match:
         quantity = float(match.group(1))
         return round(quantity, 0)
     
-    # Patrón 7: "1 paquete" - caso especial
-    if re.search(r'\b1\s*paquetes?\b', format_str):
+    if REGEX_UN_PAQUETE.search(format_str):
         return 1.0
     
-    # Patrón 8: Pack simple tipo "pack de 12 latas de 33 cl"
-    pattern_pack_with_volume = r'pack\s+de\s+(\d+)\s+(?:latas?|botellas?|briks?)\s+de\s+(\d+[\.,]?\d*)\s*(ml|cl|l|g|kg)'
-    match = re.search(pattern_pack_with_volume, format_str)
+    match = REGEX_PACK_CON_VOLUMEN.search(format_str)
     if match:
         multiplier = float(match.group(1))
         quantity = float(match.group(2).replace(',', '.'))
@@ -391,17 +654,13 @@ def calculate_total_quantity(format_str):
         total = multiplier * quantity
         return convert_to_standard_unit(total, unit)
     
-    # Patrón 9: Con envase tipo "lata 33 cl", "botella 1 l"
-    pattern_container = r'(?:lata|botella|brik|tarrito|bolsita|frasco|sobre|paquete)\s+(?:de\s+)?(\d+[\.,]?\d*)\s*(ml|cl|l|g|kg)'
-    match = re.search(pattern_container, format_str)
+    match = REGEX_ENVASE.search(format_str)
     if match:
         quantity = float(match.group(1).replace(',', '.'))
         unit = match.group(2)
         return convert_to_standard_unit(quantity, unit)
     
-    # Patrón 10: Cantidad simple tipo "1500 ml", "36 cl", "80 ud"
-    pattern_simple = r'(\d+[\.,]?\d*)\s*(ml|cl|l|g|kg|ud|uds|unidades?)'
-    match = re.search(pattern_simple, format_str)
+    match = REGEX_CANTIDAD_SIMPLE.search(format_str)
     if match:
         quantity = float(match.group(1).replace(',', '.'))
         unit = match.group(2)
@@ -448,6 +707,15 @@ def convert_to_standard_unit(quantity, unit):
     return quantity
 
 
+# Expresiones usadas para determinar el tipo de unidad
+REGEX_UNIDAD_VOLUMEN = re.compile(r'\b(ml|cl|l)\b')
+REGEX_UNIDAD_PESO = re.compile(r'\b(g|kg)\b')
+REGEX_UNIDAD_UNIDADES = re.compile(r'\b(ud|uds|unidades?)\b')
+
+# Tipos de unidad estándar posibles
+TIPOS_UNIDAD = ['L', 'Kg', 'ud']
+
+
 def get_unit_type(format_str):
     """
     Determina el tipo de unidad estándar del formato.
@@ -464,18 +732,517 @@ def get_unit_type(format_str):
     if pd.isna(format_str) or format_str == '':
         return None
     
-    format_str = str(format_str).lower()
-    
+    return _tipo_unidad(str(format_str).lower())
+
+
+def _tipo_unidad(format_str):
     # Buscar unidades de volumen
-    if re.search(r'\b(ml|cl|l)\b', format_str):
+    if REGEX_UNIDAD_VOLUMEN.search(format_str):
         return 'L'
     
     # Buscar unidades de peso
-    elif re.search(r'\b(g|kg)\b', format_str):
+    elif REGEX_UNIDAD_PESO.search(format_str):
         return 'Kg'
     
     # Buscar unidades
-    elif re.search(r'\b(ud|uds|unidades?)\b', format_str):
+    elif REGEX_UNIDAD_UNIDADES.search(format_str):
         return 'ud'
     
     return None
+
+
+# Resultado del análisis completo de un formato
+FormatoProducto = namedtuple('FormatoProducto', ['formato', 'categoria', 'cantidad', 'unidad'])
+
+
+def parse_format(format_str):
+    """
+    Analiza un formato ya conocido de una sola vez: categoría, cantidad total y tipo de unidad.
+    
+    Equivale a llamar a categorize_format, calculate_total_quantity y get_unit_type,
+    pero pasando el formato a minúsculas una única vez.
+    
+    Parámetros:
+    -----------
+    format_str : str
+        El formato del producto (p. ej. 'Garrafa 5 L')
+        
+    Retorna:
+    --------
+    FormatoProducto : (formato, categoria, cantidad, unidad)
+    
+    Ejemplo:
+    --------
+    >>> parse_format('6x80 ud')
+    FormatoProducto(formato='6x80 ud', categoria='multiple', cantidad=80.0, unidad='ud')
+    """
+    if pd.isna(format_str):
+        return FormatoProducto(format_str, 'sin_formato', None, None)
+    
+    format_lower = str(format_str).lower()
+    if format_lower == '':
+        return FormatoProducto(format_str, 'otro', None, None)
+    
+    return FormatoProducto(
+        format_str,
+        _categorizar_formato(format_lower),
+        _cantidad_total(format_lower.strip()),
+        _tipo_unidad(format_lower),
+    )
+
+
+def parse_product_format(product_name, default_format=None):
+    """
+    Extrae el formato del nombre de un producto y lo analiza en una sola pasada.
+    
+    Parámetros:
+    -----------
+    product_name : str
+        Nombre del producto
+    default_format : str
+        Formato a usar si no se encuentra ninguno (p. ej. '1 paquete')
+        
+    Retorna:
+    --------
+    FormatoProducto : (formato, categoria, cantidad, unidad)
+    
+    Ejemplo:
+    --------
+    >>> parse_product_format('agua mineral bezoya 15 l')
+    FormatoProducto(formato='15 l', categoria='volumen', cantidad=15.0, unidad='L')
+    """
+    format_str = extract_product_format(product_name)
+    if format_str is None:
+        format_str = default_format
+    
+    return parse_format(format_str)
+
+
+def parse_product_formats(valores, default_format=None, from_format=False, cache=None):
+    """
+    Versión por lotes de parse_product_format para una Serie completa.
+    
+    Cada valor distinto se analiza una sola vez y el resultado se reparte a todas las
+    filas, devolviendo columnas con tipo: cantidad en float64 (NaN si no se puede
+    calcular) y categoria_formato / unidad como categóricas.
+    
+    Parámetros:
+    -----------
+    valores : pd.Series
+        Nombres de los productos, o formatos si from_format=True
+    default_format : str
+        Formato a usar si no se encuentra ninguno en el nombre (p. ej. '1 paquete')
+    from_format : bool
+        Si es True los valores ya son formatos y no se extraen del nombre
+    cache : CacheFormatos
+        Caché persistente opcional (ver cache_formatos.py) para no volver a analizar
+        nombres ya vistos en ejecuciones anteriores
+        
+    Retorna:
+    --------
+    pd.DataFrame : Columnas formato, categoria_formato, cantidad y unidad, con el índice de valores
+    
+    Ejemplo:
+    --------
+    >>> formatos = parse_product_formats(df['nombre'], default_format='1 paquete')
+    >>> df['precio_ud/Kg/L'] = df['precio'] / formatos['cantidad']
+    """
+    # Los valores nulos reciben el código -1, que se resuelve con el último registro
+    codigos, valores_unicos = pd.factorize(valores)
+    if cache is not None:
+        registros = cache.analizar_lote(list(valores_unicos) + [None], default_format, from_format)
+    elif from_format:
+        registros = [parse_format(valor) for valor in valores_unicos]
+        registros.append(parse_format(None))
+    else:
+        registros = [parse_product_format(valor, default_format) for valor in valores_unicos]
+        registros.append(parse_product_format(None, default_format))
+    
+    formatos = np.array([r.formato for r in registros], dtype=object)
+    categorias = np.array([r.categoria for r in registros], dtype=object)
+    cantidades = np.array([np.nan if r.cantidad is None else r.cantidad for r in registros], dtype=np.float64)
+    unidades = np.array([r.unidad for r in registros], dtype=object)
+    
+    return pd.DataFrame({
+        'formato': formatos[codigos],
+        'categoria_formato': pd.Categorical(categorias[codigos], categories=CATEGORIAS_FORMATO),
+        'cantidad': cantidades[codigos],
+        'unidad': pd.Categorical(unidades[codigos], categories=TIPOS_UNIDAD),
+    }, index=valores.index)
+
+
+# Cantidad total de un envase. parse_format da la cantidad de cada unidad de un pack
+# ('4 ud. x 125 g' -> 125 g), que es la que usa la limpieza para el precio por Kg/L;
+# cantidad_envase cuenta el pack completo, que es lo que se compra
+UNIDADES_ENVASE = {
+    'kg': ('Kg', 1), 'g': ('Kg', 0.001), 'gr': ('Kg', 0.001), 'grs': ('Kg', 0.001), 'gramos': ('Kg', 0.001),
+    'l': ('L', 1), 'litro': ('L', 1), 'litros': ('L', 1), 'ml': ('L', 0.001), 'cl': ('L', 0.01),
+    'ud': ('ud', 1), 'uds': ('ud', 1), 'u': ('ud', 1), 'unidad': ('ud', 1), 'unidades': ('ud', 1),
+}
+
+_NUMERO_ENVASE = r'(\d+(?:[.,]\d+)?)'
+_MEDIDA_ENVASE = r'(kg|grs|gramos|gr|g|litros|litro|ml|cl|l)\b'
+_UNIDADES_ENVASE = r'(unidades|unidad|uds|ud|u)\b'
+
+# Pack de varias unidades: '6 bricks x 1 l', '4 ud. x 125 g'
+REGEX_ENVASE_MULTIPACK = re.compile(rf'{_NUMERO_ENVASE}\s*(?:[a-zñ.]+\s*)?x\s*{_NUMERO_ENVASE}\s*{_MEDIDA_ENVASE}')
+
+# Total del envase entre paréntesis: 'caja 10 sobres (20 g)'
+REGEX_ENVASE_PARENTESIS = re.compile(rf'\(\s*{_NUMERO_ENVASE}\s*{_MEDIDA_ENVASE}\s*\)')
+
+# Medida simple: 'garrafa 5 l'
+REGEX_ENVASE_MEDIDA = re.compile(rf'{_NUMERO_ENVASE}\s*{_MEDIDA_ENVASE}')
+
+# Unidades: '12 ud.'
+REGEX_ENVASE_UNIDADES = re.compile(rf'{_NUMERO_ENVASE}\s*{_UNIDADES_ENVASE}')
+
+# Por orden de prioridad: el primero que encaja da la cantidad del envase
+REGEX_CANTIDAD_ENVASE = [REGEX_ENVASE_MULTIPACK, REGEX_ENVASE_PARENTESIS, REGEX_ENVASE_MEDIDA,
+                         REGEX_ENVASE_UNIDADES]
+
+# Docenas: 'docena 1 dc', '1/2 docena 0,5 dc' (el 2 de '1/2' no cuenta)
+REGEX_ENVASE_DOCENAS = re.compile(rf'(?<![\d/.,]){_NUMERO_ENVASE}\s*(?:dc|docenas?)\b')
+
+
+def cantidad_envase(texto):
+    """
+    Cantidad total de un envase a partir de su formato o nombre, con unidades estándar.
+    
+    Los packs cuentan todas sus unidades y una cantidad entre paréntesis se toma como
+    el total del envase.
+    
+    Parámetros:
+    -----------
+    texto : str
+        Formato ('4 ud. x 125 g') o nombre del producto
+        
+    Retorna:
+    --------
+    tuple : (cantidad, unidad) con unidad 'L', 'Kg' o 'ud'; (nan, None) si no se reconoce
+    
+    Ejemplo:
+    --------
+    >>> cantidad_envase('4 ud. x 125 g')
+    (0.5, 'Kg')
+    >>> cantidad_envase('Caja 10 sobres (20 g)')
+    (0.02, 'Kg')
+    """
+    if not isinstance(texto, str):
+        return np.nan, None
+    texto = texto.lower()
+    
+    for regex in REGEX_CANTIDAD_ENVASE:
+        encontrado = regex.search(texto)
+        if encontrado:
+            *numeros, unidad = encontrado.groups()
+            estandar, factor = UNIDADES_ENVASE[unidad]
+            cantidad = factor
+            for numero in numeros:
+                cantidad *= float(numero.replace(',', '.'))
+            return round(cantidad, 6), estandar
+    return np.nan, None
+
+
+def piezas_envase(texto):
+    """
+    Número de piezas de un envase ('4 ud. x 125 g' -> 4, 'Paquete 24 ud.' -> 24,
+    'docena 1 dc' -> 12); nan si el formato no las cuenta
+    
+    Ejemplo:
+    --------
+    >>> piezas_envase('6 bricks x 1 L')
+    6.0
+    """
+    if not isinstance(texto, str):
+        return np.nan
+    texto = texto.lower()
+    
+    for regex in (REGEX_ENVASE_MULTIPACK, REGEX_ENVASE_UNIDADES):
+        encontrado = regex.search(texto)
+        if encontrado:
+            return float(encontrado.group(1).replace(',', '.'))
+    encontrado = REGEX_ENVASE_DOCENAS.search(texto)
+    if encontrado:
+        return round(float(encontrado.group(1).replace(',', '.')) * 12, 6)
+    return np.nan
+
+
+def _cantidades_envase_unicas(valores):
+    """
+    cantidad_envase y piezas_envase de cada valor distinto, repartidas a las filas:
+    (cantidades, unidades, piezas)
+    """
+    codigos, valores_unicos = pd.factorize(valores)
+    analizados = [cantidad_envase(valor) + (piezas_envase(valor),) for valor in valores_unicos]
+    analizados.append((np.nan, None, np.nan))
+    cantidades = np.array([c for c, _, _ in analizados], dtype=np.float64)[codigos]
+    unidades = np.array([u for _, u, _ in analizados], dtype=object)[codigos]
+    piezas = np.array([p for _, _, p in analizados], dtype=np.float64)[codigos]
+    return cantidades, unidades, piezas
+
+
+def cantidades_envase(formatos, nombres=None):
+    """
+    Versión por lotes de cantidad_envase para una Serie completa.
+    
+    Cada texto distinto se analiza una sola vez. Si se pasan los nombres, las filas
+    cuyo formato no indica cantidad o piezas ('6 x 100', '1 paquete') las toman del nombre.
+    
+    Parámetros:
+    -----------
+    formatos : pd.Series
+        Formatos de los productos (o nombres, si no hay formato)
+    nombres : pd.Series
+        Nombres de los productos, con el mismo índice
+        
+    Retorna:
+    --------
+    pd.DataFrame : Columnas cantidad (float64, NaN si no se reconoce), unidad
+    (categórica) y piezas (float64, ver piezas_envase), con el índice de formatos
+    
+    Ejemplo:
+    --------
+    >>> envases = cantidades_envase(df['formato'], df['nombre'])
+    >>> df['precio_envase_Kg/L'] = df['precio'] / envases['cantidad']
+    """
+    cantidades, unidades, piezas = _cantidades_envase_unicas(formatos.astype(object))
+    if nombres is not None:
+        sin_cantidad = np.isnan(cantidades)
+        sin_piezas = np.isnan(piezas)
+        incompletas = sin_cantidad | sin_piezas
+        if incompletas.any():
+            cantidades_nombre, unidades_nombre, piezas_nombre = _cantidades_envase_unicas(
+                nombres.astype(object)[incompletas])
+            cantidades[sin_cantidad] = cantidades_nombre[sin_cantidad[incompletas]]
+            unidades[sin_cantidad] = unidades_nombre[sin_cantidad[incompletas]]
+            piezas[sin_piezas] = piezas_nombre[sin_piezas[incompletas]]
+    
+    return pd.DataFrame({
+        'cantidad': cantidades,
+        'unidad': pd.Categorical(unidades, categories=TIPOS_UNIDAD),
+        'piezas': piezas,
+    }, index=formatos.index)
+
+
+# Tipos de las columnas de data/Clean_Data. Las columnas de texto con pocos valores
+# distintos se guardan como categóricas (diccionario en Parquet) y los precios como float
+TIPOS_CLEAN = {
+    'nombre': 'str',
+    'formato': 'category',
+    'precio': 'float64',
+    'precio_ud/Kg/L': 'float64',
+    'marca': 'category',
+    'categoria': 'category',
+    'subcategoria': 'category',
+}
+
+# Nombre de archivo -> valor de la columna 'supermercado' del dataset combinado
+SUPERMERCADOS_CLEAN = {'mercadona': 'Mercadona', 'consum': 'Consum', 'carrefour': 'Carrefour'}
+
+RUTA_CLEAN = Path('data/Clean_Data')
+
+# Esquema común de los productos de los tres supermercados (df_completo): categóricas
+# para el texto que se repite, texto en Arrow para nombre y formato y precios en float32
+# (precisión de sobra para céntimos y la mitad de memoria que float64)
+ESQUEMA_PRODUCTOS = {
+    'supermercado': 'category',
+    'nombre': 'string[pyarrow]',
+    'formato': 'string[pyarrow]',
+    'precio': 'float32',
+    'precio_ud/Kg/L': 'float32',
+    'marca': 'category',
+    'categoria': 'category',
+    'subcategoria': 'category',
+}
+
+
+def aplicar_tipos_clean(df):
+    """
+    Convierte las columnas de un dataset limpio a los tipos de TIPOS_CLEAN.
+    
+    Las columnas que no estén en el DataFrame se ignoran, así que sirve también
+    para DataFrames con solo algunas columnas.
+    """
+    return df.astype({columna: tipo for columna, tipo in TIPOS_CLEAN.items() if columna in df.columns})
+
+
+def aplicar_esquema_productos(df):
+    """
+    Convierte las columnas de un DataFrame de productos a los tipos de ESQUEMA_PRODUCTOS.
+    
+    Las columnas que no estén en el esquema se dejan como están.
+    """
+    return df.astype({columna: tipo for columna, tipo in ESQUEMA_PRODUCTOS.items() if columna in df.columns})
+
+
+def concatenar_supermercados(datasets):
+    """
+    Une los productos de varios supermercados en un solo DataFrame con ESQUEMA_PRODUCTOS.
+    
+    pd.concat convierte a texto las categóricas cuyas categorías no coinciden, así
+    que cada columna categórica se une con union_categoricals (códigos enteros y una
+    sola lista de categorías). La columna 'supermercado' se construye directamente
+    como categórica, sin repetir el nombre en cada fila. Las columnas que no tiene
+    algún supermercado (subcategoria) quedan a NaN en sus filas.
+    
+    Parámetros:
+    -----------
+    datasets : dict
+        {'Mercadona': df_Mercadona, 'Consum': df_Consum, ...}; si los DataFrames ya
+        tienen columna 'supermercado' se sustituye por la clave del diccionario
+        
+    Retorna:
+    --------
+    pd.DataFrame : Productos de todos los supermercados, en el orden del diccionario
+    
+    Ejemplo:
+    --------
+    >>> df_completo = concatenar_supermercados({'Mercadona': df_Mercadona, 'Consum': df_Consum})
+    """
+    partes = [aplicar_esquema_productos(df.drop(columns='supermercado', errors='ignore'))
+              for df in datasets.values()]
+    columnas = list(dict.fromkeys(columna for df in partes for columna in df.columns))
+    categoricas = [columna for columna in columnas if ESQUEMA_PRODUCTOS.get(columna) == 'category']
+    
+    df_completo = pd.concat([df.drop(columns=[c for c in categoricas if c in df.columns]) for df in partes],
+                            ignore_index=True)
+    
+    for columna in categoricas:
+        tipo_categorias = next(df[columna].cat.categories.dtype for df in partes if columna in df.columns)
+        valores = []
+        for df in partes:
+            if columna in df.columns:
+                valores.append(df[columna].array)
+            else:
+                valores.append(pd.Categorical.from_codes(np.full(len(df), -1),
+                                                         categories=pd.Index([], dtype=tipo_categorias)))
+        df_completo[columna] = union_categoricals(valores, sort_categories=True)
+    
+    df_completo['supermercado'] = pd.Categorical.from_codes(
+        np.repeat(np.arange(len(partes)), [len(df) for df in partes]), categories=list(datasets))
+    
+    return aplicar_esquema_productos(df_completo[columnas + ['supermercado']])
+
+
+def esquema_parquet_clean(df):
+    """
+    Esquema Arrow explícito para un dataset limpio: texto con diccionario para las
+    columnas categóricas, texto simple para el resto y float64 para los precios.
+    """
+    import pyarrow as pa
+    
+    tipos_arrow = {
+        'str': pa.string(),
+        'category': pa.dictionary(pa.int32(), pa.string()),
+        'float64': pa.float64(),
+    }
+    return pa.schema([(columna, tipos_arrow[TIPOS_CLEAN.get(columna, 'str')]) for columna in df.columns])
+
+
+def guardar_parquet_clean(df, ruta):
+    """
+    Guarda un dataset limpio en Parquet con el esquema de esquema_parquet_clean.
+    
+    Parámetros:
+    -----------
+    df : pd.DataFrame
+        Dataset limpio (mismas columnas que el CSV)
+    ruta : str o Path
+        Archivo .parquet de destino
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    df = aplicar_tipos_clean(df)
+    tabla = pa.Table.from_pandas(df, schema=esquema_parquet_clean(df), preserve_index=False)
+    pq.write_table(tabla, ruta, compression='zstd')
+
+
+def cargar_dataset_limpio(supermercado, columnas=None, ruta=RUTA_CLEAN):
+    """
+    Carga un dataset de data/Clean_Data leyendo solo las columnas pedidas.
+    
+    Usa el archivo Parquet si existe y pyarrow está instalado; si no, lee el CSV
+    (solo las columnas pedidas) y le aplica los mismos tipos, de modo que el
+    resultado es igual en los dos casos.
+    
+    Parámetros:
+    -----------
+    supermercado : str
+        'mercadona', 'consum' o 'carrefour'
+    columnas : list
+        Columnas a cargar (None = todas)
+    ruta : str o Path
+        Carpeta de los datasets limpios
+        
+    Retorna:
+    --------
+    pd.DataFrame : Dataset con los tipos de TIPOS_CLEAN
+    
+    Ejemplo:
+    --------
+    >>> df = cargar_dataset_limpio('consum', columnas=['nombre', 'precio'])
+    """
+    ruta = Path(ruta)
+    archivo_parquet = ruta / f"{supermercado}.parquet"
+    
+    if archivo_parquet.exists():
+        try:
+            df = pd.read_parquet(archivo_parquet, columns=columnas)
+        except ImportError:
+            pass
+        else:
+            # Parquet guarda las categorías en orden de aparición; se ordenan como al leer el CSV
+            for columna in df.select_dtypes('category').columns:
+                categorias = df[columna].cat.categories
+                df[columna] = df[columna].cat.reorder_categories(categorias.sort_values())
+            return df
+    
+    df = pd.read_csv(ruta / f"{supermercado}.csv", usecols=columnas)
+    if columnas is not None:
+        df = df[list(columnas)]
+    return aplicar_tipos_clean(df)
+
+
+def cargar_datasets_limpios(supermercados=None, columnas=None, ruta=RUTA_CLEAN):
+    """
+    Carga varios datasets limpios y los une en uno solo con la columna 'supermercado'
+    (el df_completo del notebook) y los tipos de ESQUEMA_PRODUCTOS.
+    
+    Parámetros:
+    -----------
+    supermercados : list
+        Archivos a cargar (None = los tres de SUPERMERCADOS_CLEAN)
+    columnas : list
+        Columnas a cargar de cada dataset (None = todas)
+    ruta : str o Path
+        Carpeta de los datasets limpios
+        
+    Retorna:
+    --------
+    pd.DataFrame : Dataset combinado
+    """
+    supermercados = supermercados or list(SUPERMERCADOS_CLEAN)
+    
+    datasets = {}
+    for supermercado in supermercados:
+        disponibles = None
+        if columnas is not None:
+            # subcategoria solo existe en Mercadona: se piden únicamente las columnas que tiene cada archivo
+            disponibles = [c for c in columnas if c in _columnas_dataset_limpio(supermercado, ruta)]
+        datasets[SUPERMERCADOS_CLEAN.get(supermercado, supermercado)] = cargar_dataset_limpio(supermercado, disponibles, ruta)
+    
+    return concatenar_supermercados(datasets)
+
+
+def _columnas_dataset_limpio(supermercado, ruta=RUTA_CLEAN):
+    """Columnas de un dataset limpio, leídas de la cabecera sin cargar los datos"""
+    ruta = Path(ruta)
+    archivo_parquet = ruta / f"{supermercado}.parquet"
+    if archivo_parquet.exists():
+        try:
+            import pyarrow.parquet as pq
+            return pq.read_schema(archivo_parquet).names
+        except ImportError:
+            pass
+    return list(pd.read_csv(ruta / f"{supermercado}.csv", nrows=0).columns)
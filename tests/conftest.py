@@ -0,0 +1,14 @@
+"""
+Configuración común de las pruebas: los módulos de la raíz (utils, cesta, ...) y
+los de src/notebooks (scrapers y clientes) se importan por su nombre, igual que
+en los notebooks
+"""
+
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+for carpeta in (RAIZ, RAIZ / 'src' / 'notebooks'):
+    if str(carpeta) not in sys.path:
+        sys.path.insert(0, str(carpeta))
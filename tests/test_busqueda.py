@@ -0,0 +1,40 @@
+"""
+Pruebas de IndiceBusqueda: volver a cargar un supermercado sustituye sus filas
+"""
+
+import pandas as pd
+
+from busqueda import IndiceBusqueda
+
+
+def productos(*nombres):
+    return pd.DataFrame({'nombre': list(nombres), 'formato': ['1 l'] * len(nombres)})
+
+
+def test_recargar_un_supermercado_no_duplica_resultados():
+    indice = IndiceBusqueda()
+    indice.agregar(productos('leche entera', 'leche desnatada'), 'Mercadona')
+    indice.agregar(productos('leche entera brik'), 'Consum')
+
+    indice.agregar(productos('leche entera', 'zumo de naranja'), 'Mercadona')
+
+    assert len(indice) == 3
+    encontrados = indice.buscar('leche')
+    assert encontrados[['nombre', 'supermercado']].values.tolist() == [['leche entera brik', 'Consum'],
+                                                                      ['leche entera', 'Mercadona']]
+    assert len(indice.buscar('desnat')) == 0
+    assert len(indice.buscar('')) == 3
+
+
+def test_quitar_y_columna_supermercado():
+    indice = IndiceBusqueda()
+    df = pd.DataFrame({'nombre': ['agua mineral', 'agua con gas'], 'supermercado': ['Mercadona', 'Consum']})
+    indice.agregar(df)
+    ids_consum = indice.buscar_ids('agua', supermercados=['Consum']).tolist()
+
+    indice.quitar('Mercadona')
+
+    assert indice.buscar('agua')['supermercado'].tolist() == ['Consum']
+    # Los identificadores de las filas que quedan no cambian
+    assert indice.buscar_ids('agua').tolist() == ids_consum
+    assert len(indice.quitar('Carrefour')) == 1
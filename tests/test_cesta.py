@@ -0,0 +1,107 @@
+"""
+Pruebas de CatalogoCesta con formatos de pack: la cantidad de cada envase debe
+contar todas sus unidades y cuadrar con el precio por unidad de la tienda
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cesta import CatalogoCesta
+
+# Como en Clean_Data: en Mercadona el precio por unidad se calculó con la cantidad
+# de utils.parse_format, que no cuenta los packs (125 Kg, 10 Kg, 1 L)
+PRODUCTOS = [
+    ('yogur natural sin azucar hacendado', '4 ud. x 125 g', 0.90, 0.90 / 125, 'Mercadona'),
+    ('azucar blanco hacendado', 'Paquete 1 kg', 1.00, 1.00, 'Mercadona'),
+    ('cafe soluble en sobres hacendado', 'Caja 10 sobres (20 g)', 1.10, 0.11, 'Mercadona'),
+    ('cafe molido natural hacendado', 'Paquete 250 g', 2.50, 10.00, 'Mercadona'),
+    ('leche entera hacendado', '6 bricks x 1 L', 5.40, 5.40, 'Mercadona'),
+    ('leche entera brik 1 l', 'brik 1 l', 0.97, 0.97, 'Consum'),
+    ('azucar blanco paquete 1 kg', 'paquete 1 kg', 1.10, 1.10, 'Consum'),
+    ('cafe molido natural 250 gr', '250 gr', 2.60, 10.40, 'Consum'),
+    # El precio por unidad de la tienda dice 1 kg y el formato 500 g: no se sabe cuánto trae
+    ('cafe en grano natural', '500 gr', 3.00, 3.00, 'Consum'),
+    # Formato sin unidad: la cantidad sale del nombre
+    ('actimel natural pack 6 6 x 100 ml', '6 x 100', 3.99, 6.65, 'Consum'),
+]
+
+
+@pytest.fixture(scope='module')
+def catalogo():
+    df = pd.DataFrame(PRODUCTOS, columns=['nombre', 'formato', 'precio', 'precio_ud/Kg/L', 'supermercado'])
+    return CatalogoCesta(df)
+
+
+def test_cantidades_contrastadas_con_el_precio_por_unidad(catalogo):
+    cantidades = dict(zip(catalogo.productos['nombre'], catalogo._cantidad))
+    assert cantidades['yogur natural sin azucar hacendado'] == pytest.approx(0.5)
+    assert cantidades['leche entera hacendado'] == pytest.approx(6)
+    assert cantidades['actimel natural pack 6 6 x 100 ml'] == pytest.approx(0.6)
+    assert np.isnan(cantidades['cafe en grano natural'])
+
+
+def test_cesta_con_packs(catalogo):
+    resultado = catalogo.comparar_cesta([('azucar', 1, 'kg'), ('cafe', 500, 'g'), ('leche entera', 6, 'l')])
+    elegidos = resultado.detalle.set_index(['termino', 'supermercado'])
+
+    # El yogur (0,5 kg) no pasa por un kilo de azúcar más barato
+    assert elegidos.loc[('azucar', 'Mercadona'), 'nombre'] == 'azucar blanco hacendado'
+    # Los sobres son 20 g por caja, no 10 kg
+    assert elegidos.loc[('cafe', 'Mercadona'), 'nombre'] == 'cafe molido natural hacendado'
+    assert elegidos.loc[('cafe', 'Mercadona'), 'envases'] == 2
+    assert elegidos.loc[('cafe', 'Consum'), 'nombre'] == 'cafe molido natural 250 gr'
+    # Un pack de 6 bricks cubre los 6 litros
+    assert elegidos.loc[('leche entera', 'Mercadona'), 'envases'] == 1
+    assert elegidos.loc[('leche entera', 'Consum'), 'coste'] == pytest.approx(6 * 0.97)
+
+    assert resultado.totales.to_dict() == pytest.approx({'Mercadona': 1.00 + 5.00 + 5.40,
+                                                        'Consum': 1.10 + 5.20 + 5.82})
+    assert resultado.optimo.attrs['total'] == pytest.approx(1.00 + 5.00 + 5.40)
+
+
+# Filas reales de Clean_Data (sin marca): el término aparece en productos que no son lo pedido
+COLUMNAS_CATALOGO = ['nombre', 'formato', 'precio', 'precio_ud/Kg/L', 'categoria', 'subcategoria', 'supermercado']
+PRODUCTOS_CATALOGO = [
+    ('flan de cafe hacendado', '4 ud. x 100 g', 1.85, 0.0185, 'postres y yogures', 'flan y natillas', 'Mercadona'),
+    ('cafe molido natural hacendado', 'Paquete 500 g', 5.40, 10.80, 'cacao, café e infusiones',
+     'café molido y en grano', 'Mercadona'),
+    ('huevos', 'Paquete 24 ud.', 5.75, 5.75 / 24, 'huevos, leche y mantequilla', 'huevos', 'Mercadona'),
+    ('huevos de codorniz', 'Paquete 18 ud.', 1.85, 1.85 / 18, 'huevos, leche y mantequilla', 'huevos', 'Mercadona'),
+    ('yogur sabores hacendado 0% m.g 0% sin azucares añadidos', '8 ud. x 125 g', 1.60, 0.0128,
+     'postres y yogures', 'yogures desnatados', 'Mercadona'),
+    ('aceite corporal aloe vera deliplus', 'Bote 400 ml', 1.65, 1.65 / 0.4, 'cuidado facial y corporal',
+     'cuidado corporal', 'Mercadona'),
+    ('aceite de girasol refinado 0,2º hacendado', 'Botella 1 L', 1.80, 1.80, 'aceite, especias y salsas',
+     'aceite, vinagre y sal', 'Mercadona'),
+    ('refresco cola hacendado', 'Botella 2 L', 0.75, 0.375, 'agua y refrescos', 'refresco de cola', 'Mercadona'),
+    ('flan de cafe pack de 4 unidades 4 x 100 gr', 'pack de 4 unidades', 2.29, 5.73, 'despensa', None, 'Consum'),
+    ('cafe molido natural 250 gr', '250 gr', 2.75, 11.00, 'despensa', None, 'Consum'),
+    ('huevos s/m medianos 24 unidades 2 dc', '24 unidades', 5.75, 2.88, 'despensa', None, 'Consum'),
+    ('yogur 00% natural edulcorado 4 unidades 4 x 125 gr', '4 x 125', 0.75, 1.50, 'despensa', None, 'Consum'),
+]
+
+
+def test_cesta_elige_el_producto_pedido_y_no_el_que_lo_menciona():
+    catalogo = CatalogoCesta(pd.DataFrame(PRODUCTOS_CATALOGO, columns=COLUMNAS_CATALOGO))
+    resultado = catalogo.comparar_cesta([('cafe', 500, 'g'), ('huevos', 24, 'ud'), ('yogur', 8, 'ud'),
+                                         ('aceite', 1, 'l'), ('cola', 2, 'l')])
+    elegidos = resultado.detalle.set_index(['termino', 'supermercado'])
+
+    # 'flan de cafe' solo menciona el café
+    assert elegidos.loc[('cafe', 'Mercadona'), 'nombre'] == 'cafe molido natural hacendado'
+    assert elegidos.loc[('cafe', 'Consum'), 'nombre'] == 'cafe molido natural 250 gr'
+    # Dos paquetes de huevos de codorniz serían más baratos, pero son una variante
+    assert elegidos.loc[('huevos', 'Mercadona'), 'nombre'] == 'huevos'
+    assert elegidos.loc[('huevos', 'Consum'), 'envases'] == 1
+    # Los yogures en pack cuentan sus piezas aunque el formato esté en gramos
+    assert elegidos.loc[('yogur', 'Mercadona'), 'envases'] == 1
+    assert elegidos.loc[('yogur', 'Consum'), 'envases'] == 2
+    # La categoría desempata el aceite de cocina frente al corporal
+    assert elegidos.loc[('aceite', 'Mercadona'), 'nombre'] == 'aceite de girasol refinado 0,2º hacendado'
+    # 'refresco cola' no empieza por 'cola', pero su subcategoría es de cola
+    assert elegidos.loc[('cola', 'Mercadona'), 'nombre'] == 'refresco cola hacendado'
+
+    assert resultado.totales['Mercadona'] == pytest.approx(5.40 + 5.75 + 1.60 + 1.80 + 0.75)
+    costes_consum = elegidos.xs('Consum', level='supermercado')['coste']
+    assert costes_consum[['cafe', 'huevos', 'yogur']].sum() == pytest.approx(2 * 2.75 + 5.75 + 2 * 0.75)
@@ -0,0 +1,34 @@
+"""
+Pruebas de Checkpoint: reanudación, línea incompleta y lectura de productos desde el archivo
+"""
+
+from checkpoint import Checkpoint
+
+
+def test_reanuda_leyendo_los_productos_del_archivo(tmp_path):
+    ruta = tmp_path / 'checkpoint.jsonl'
+    with Checkpoint(ruta) as checkpoint:
+        checkpoint.guardar_total_paginas('Bebidas', 2)
+        checkpoint.guardar('Bebidas', 1, [{'nombre': 'Agua'}, {'nombre': 'Zumo'}])
+        checkpoint.guardar('Despensa', 1, [{'nombre': 'Azúcar'}])
+        assert checkpoint.productos('Bebidas', 1) == [{'nombre': 'Agua'}, {'nombre': 'Zumo'}]
+
+    # El proceso se corta mientras escribe la página 2
+    with open(ruta, 'ab') as f:
+        f.write(b'{"categoria": "Bebidas", "pagina": 2, "produ')
+
+    with Checkpoint(ruta) as checkpoint:
+        # En memoria solo hay posiciones, no productos
+        assert all(isinstance(posicion, int) for posicion in checkpoint.paginas.values())
+        assert checkpoint.total_paginas('Bebidas') == 2
+        assert checkpoint.completado('Bebidas', 1) and not checkpoint.completado('Bebidas', 2)
+
+        checkpoint.guardar('Bebidas', 2, [{'nombre': 'Leche'}])
+        assert checkpoint.productos('Despensa') == [{'nombre': 'Azúcar'}]
+        assert list(checkpoint.iterar_productos('Bebidas')) == [
+            ('Bebidas', 1, [{'nombre': 'Agua'}, {'nombre': 'Zumo'}]),
+            ('Bebidas', 2, [{'nombre': 'Leche'}]),
+        ]
+
+    with Checkpoint(ruta) as checkpoint:
+        assert [pagina for _, pagina, _ in checkpoint.iterar_productos()] == [1, 1, 2]
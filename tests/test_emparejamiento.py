@@ -0,0 +1,30 @@
+"""
+Pruebas de los bloques de emparejamiento con formatos de pack: cada producto va al
+bloque de la cantidad total de su envase
+"""
+
+import pandas as pd
+
+from emparejamiento import bloques_por_formato, emparejar_productos
+
+PRODUCTOS = [
+    ('yogur natural hacendado', '4 ud. x 125 g', 'Mercadona'),
+    ('yogur natural 4 x 125 g', '500 g', 'Consum'),
+    ('cafe soluble en sobres hacendado', 'Caja 10 sobres (20 g)', 'Mercadona'),
+    ('actimel natural pack 6 6 x 100 ml', '6 x 100', 'Consum'),
+    ('detergente liquido colon', '80 lavados', 'Carrefour'),
+    ('bayeta multiusos', 'Paquete', 'Carrefour'),
+]
+
+
+def test_bloques_con_la_cantidad_total_del_envase():
+    df = pd.DataFrame(PRODUCTOS, columns=['nombre', 'formato', 'supermercado'])
+    bloques = {clave: posiciones.tolist() for clave, posiciones in bloques_por_formato(df).items()}
+    assert bloques == {('Kg', '0.5'): [0, 1], ('Kg', '0.02'): [2], ('L', '0.6'): [3], ('-', '80'): [4]}
+
+
+def test_packs_emparejados_con_su_equivalente():
+    df = pd.DataFrame(PRODUCTOS, columns=['nombre', 'formato', 'supermercado'])
+    parejas = emparejar_productos(df, umbral=0.4)
+    assert parejas[['nombre_a', 'nombre_b', 'unidad', 'cantidad']].values.tolist() == [
+        ['yogur natural hacendado', 'yogur natural 4 x 125 g', 'Kg', 0.5]]
@@ -0,0 +1,46 @@
+"""
+Pruebas de EscritorProductos en Parquet: el esquema no depende de los valores del primer lote
+"""
+
+import pytest
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+from escritor_streaming import EscritorProductos, a_float
+
+
+def test_primer_lote_vacio_o_entero(tmp_path):
+    ruta = tmp_path / 'productos.parquet'
+    with EscritorProductos(ruta, tam_lote=2) as escritor:
+        # Primer lote: sin promoción ni precio anterior y con precios enteros
+        escritor.escribir([
+            {'nombre': 'Agua', 'precio_actual': 1, 'precio_anterior': None, 'promocion': None},
+            {'nombre': 'Sal', 'precio_actual': 2, 'precio_anterior': None, 'promocion': None},
+        ])
+        escritor.escribir([
+            {'nombre': 'Zumo', 'precio_actual': 1.5, 'precio_anterior': '1,80 €', 'promocion': '2x1'},
+            {'nombre': 'Leche', 'precio_actual': '0,97 €', 'precio_anterior': '', 'promocion': 3},
+        ])
+
+    tabla = pq.read_table(ruta)
+    assert str(tabla.schema.field('precio_actual').type) == 'double'
+    assert str(tabla.schema.field('promocion').type) == 'string'
+    assert tabla.to_pydict() == {
+        'nombre': ['Agua', 'Sal', 'Zumo', 'Leche'],
+        'precio_actual': [1.0, 2.0, 1.5, 0.97],
+        'precio_anterior': [None, None, 1.8, None],
+        'promocion': [None, None, '2x1', '3'],
+    }
+
+
+def test_precio_no_numerico(tmp_path):
+    with pytest.raises(ValueError, match='precio_actual'):
+        with EscritorProductos(tmp_path / 'productos.parquet') as escritor:
+            escritor.escribir([{'nombre': 'Agua', 'precio_actual': 'consultar'}])
+
+
+@pytest.mark.parametrize('valor, esperado', [
+    ('1.234,50 €', 1234.5), ('2,65', 2.65), ('3.5', 3.5), ('N/A', None), (None, None), (7, 7.0),
+])
+def test_a_float(valor, esperado):
+    assert a_float(valor) == esperado
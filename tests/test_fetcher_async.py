@@ -0,0 +1,126 @@
+"""
+Pruebas de FetcherAsync contra un servidor aiohttp local: reintentos con
+Retry-After, tiempo agotado, espera por conexión libre y respuestas que no son JSON
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import aiohttp
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from fetcher_async import FetcherAsync, segundos_retry_after
+from mercadona_api import scrape_mercadona_api_async
+
+
+def crear_app():
+    intentos = {'limitado': 0, 'limitado_fecha': 0}
+
+    async def limitado(request):
+        # Primera petición rechazada con Retry-After en segundos, la segunda correcta
+        intentos['limitado'] += 1
+        if intentos['limitado'] == 1:
+            return web.Response(status=429, headers={'Retry-After': '0'})
+        return web.json_response({'ok': True, 'intentos': intentos['limitado']})
+
+    async def limitado_fecha(request):
+        # Retry-After como fecha HTTP (ya pasada): no se espera
+        intentos['limitado_fecha'] += 1
+        if intentos['limitado_fecha'] == 1:
+            fecha = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=5), usegmt=True)
+            return web.Response(status=429, headers={'Retry-After': fecha})
+        return web.json_response({'ok': True})
+
+    async def lento(request):
+        await asyncio.sleep(5)
+        return web.json_response({'ok': True})
+
+    async def breve(request):
+        await asyncio.sleep(0.2)
+        return web.json_response({'ok': True})
+
+    async def no_json(request):
+        return web.Response(text='<html>mantenimiento</html>', content_type='text/html')
+
+    async def categoria(request):
+        if request.match_info['id'] == '115':
+            await asyncio.sleep(5)
+        return web.json_response({'id': request.match_info['id'],
+                                  'products': [{'display_name': 'Leche', 'price_instructions': {'unit_price': '0.97'}}]})
+
+    async def listado(request):
+        return web.json_response({'next': None, 'results': [{'categories': [{'id': 112}, {'id': 115}]}]})
+
+    async def codigo_postal(request):
+        await asyncio.sleep(5)
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_get('/limitado', limitado)
+    app.router.add_get('/limitado_fecha', limitado_fecha)
+    app.router.add_get('/lento', lento)
+    app.router.add_get('/breve', breve)
+    app.router.add_get('/no_json', no_json)
+    app.router.add_get('/api/categories/', listado)
+    app.router.add_get('/api/categories/{id}/', categoria)
+    app.router.add_put('/api/postal-codes/actions/change-pc/', codigo_postal)
+    return app
+
+
+def ejecutar(prueba):
+    """Arranca el servidor, ejecuta la corrutina prueba(servidor) y lo para"""
+    async def principal():
+        async with TestServer(crear_app()) as servidor:
+            return await prueba(servidor)
+    return asyncio.run(principal())
+
+
+def test_segundos_retry_after():
+    assert segundos_retry_after('3', 1) == 3
+    assert segundos_retry_after(None, 1) == 1
+    assert segundos_retry_after('pronto', 1) == 1
+    futura = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+    assert 55 < segundos_retry_after(futura, 1) <= 60
+
+
+def test_429_con_retry_after_se_reintenta():
+    async def prueba(servidor):
+        async with FetcherAsync(peticiones_por_segundo=None, reintentos=2) as fetcher:
+            return await fetcher.get_muchos([str(servidor.make_url('/limitado')),
+                                             str(servidor.make_url('/limitado_fecha'))])
+
+    assert ejecutar(prueba) == [{'ok': True, 'intentos': 2}, {'ok': True}]
+
+
+def test_tiempo_agotado_y_json_invalido_son_fallos_de_la_peticion():
+    async def prueba(servidor):
+        async with FetcherAsync(peticiones_por_segundo=None, timeout=0.2, reintentos=0) as fetcher:
+            return await fetcher.get_muchos([str(servidor.make_url('/lento')), str(servidor.make_url('/no_json')),
+                                             str(servidor.make_url('/limitado'))])
+
+    lento, no_json, limitado = ejecutar(prueba)
+    assert isinstance(lento, aiohttp.ClientError)
+    assert isinstance(no_json, aiohttp.ClientResponseError)
+    # Sin reintentos, el 429 se devuelve como fallo en lugar de esperar
+    assert isinstance(limitado, aiohttp.ClientResponseError) and limitado.status == 429
+
+
+def test_la_espera_por_conexion_libre_no_cuenta_en_el_tiempo_agotado():
+    # 12 peticiones de 0,2 s con 2 conexiones tardan 1,2 s en total, pero cada una cabe en 0,5 s
+    async def prueba(servidor):
+        async with FetcherAsync(max_por_host=2, peticiones_por_segundo=None, timeout=0.5, reintentos=0) as fetcher:
+            return await fetcher.get_muchos([str(servidor.make_url('/breve'))] * 12)
+
+    assert ejecutar(prueba) == [{'ok': True}] * 12
+
+
+def test_scrape_async_sigue_tras_un_tiempo_agotado():
+    # Tiempo agotado en el código postal y en una categoría: el resto de la extracción continúa
+    async def prueba(servidor):
+        return await scrape_mercadona_api_async(codigo_postal='46001', base_url=str(servidor.make_url('/api')),
+                                                peticiones_por_segundo=None, timeout=0.5, reintentos=0)
+
+    productos = ejecutar(prueba)
+    assert [(p['categoria_nombre'], p['nombre']) for p in productos] == [('112', 'Leche')]
@@ -0,0 +1,84 @@
+"""
+Pruebas del histórico de precios y del diff de extracciones con productos de
+Mercadona sin imagen (imagen_url 'N/A'), y de las extracciones que se rechazan
+"""
+
+import pandas as pd
+import pytest
+
+from diff_snapshots import diff_extracciones
+from historico_precios import HistoricoPrecios
+
+COLUMNAS = ['elemento_id', 'texto_completo', 'nombre', 'precio', 'precio_unidad', 'marca', 'imagen_url',
+            'categoria_url', 'categoria_nombre']
+
+
+def extraccion_mercadona(precio_leche, precio_aceite):
+    filas = [
+        (1, f'Leche entera Hacendado\nBrick 1 L\n{precio_leche} € /ud.', 'Leche entera Hacendado', f'{precio_leche} €',
+         'N/A', 'N/A', 'N/A', 'https://tienda.mercadona.es/categories/72', '72'),
+        (2, f'Aceite de oliva Hacendado\nGarrafa 5 L\n{precio_aceite} € /ud.', 'Aceite de oliva Hacendado',
+         f'{precio_aceite} €', 'N/A', 'N/A', 'N/A', 'https://tienda.mercadona.es/categories/112', '112'),
+        (3, 'Sal fina Hacendado\nPaquete 1 kg\n0,25 € /ud.', 'Sal fina Hacendado', '0,25 €', 'N/A', 'N/A',
+         'https://prod-mercadona.imgix.net/sal.jpg', 'https://tienda.mercadona.es/categories/112', '112'),
+    ]
+    return pd.DataFrame(filas, columns=COLUMNAS)
+
+
+def test_productos_sin_imagen_tienen_historial_propio(tmp_path):
+    historico = HistoricoPrecios(ruta=tmp_path)
+
+    assert historico.registrar('mercadona', extraccion_mercadona('0,97', '18,75'), '2025-10-17') == \
+        {'alta': 3, 'cambio': 0, 'baja': 0}
+    assert historico.registrar('mercadona', extraccion_mercadona('0,99', '18,75'), '2025-10-18') == \
+        {'alta': 0, 'cambio': 1, 'baja': 0}
+
+    leche = historico.historial('mercadona', 'Leche entera Hacendado | Brick 1 L')
+    assert leche['precio'].tolist() == ['0,97 €', '0,99 €']
+    aceite = historico.historial('mercadona', 'Aceite de oliva Hacendado | Garrafa 5 L')
+    assert aceite['precio'].tolist() == ['18,75 €']
+
+    catalogo = historico.a_fecha('mercadona', '2025-10-18')
+    assert sorted(catalogo['clave']) == ['Aceite de oliva Hacendado | Garrafa 5 L',
+                                         'Leche entera Hacendado | Brick 1 L',
+                                         'https://prod-mercadona.imgix.net/sal.jpg']
+
+
+def test_diff_de_productos_sin_imagen(tmp_path):
+    anterior, nueva = tmp_path / 'ayer.csv', tmp_path / 'hoy.csv'
+    extraccion_mercadona('0,97', '18,75').to_csv(anterior, index=False)
+    extraccion_mercadona('0,99', '18,75').to_csv(nueva, index=False)
+
+    for num_particiones in (1, 4):
+        cambios = diff_extracciones(anterior, nueva, supermercado='mercadona', num_particiones=num_particiones)
+        assert cambios[['tipo', 'clave', 'precio', 'precio_anterior']].values.tolist() == [
+            ['cambio', 'Leche entera Hacendado | Brick 1 L', '0,99 €', '0,97 €']]
+
+
+def extraccion_consum(codigos):
+    return pd.DataFrame({'codigo_producto': codigos, 'nombre': [f'Producto {c}' for c in codigos],
+                         'precio_actual': '1,20 €', 'precio_anterior': '', 'precio_por_unidad': '1,20 €/1 U',
+                         'promocion': '', 'fecha_extraccion': '2025-10-18 11:16:25'})
+
+
+def test_extracciones_incorrectas_no_se_registran(tmp_path):
+    historico = HistoricoPrecios(ruta=tmp_path)
+    codigos = [str(7092138 + i) for i in range(10)]
+    assert historico.registrar('consum', extraccion_consum(codigos), '2025-10-17')['alta'] == 10
+
+    # Columna de precio con otro nombre, extracción vacía y extracción cortada
+    renombrada = extraccion_consum(codigos).rename(columns={'precio_actual': 'precio'})
+    with pytest.raises(ValueError, match='faltan las columnas precio_actual'):
+        historico.registrar('consum', renombrada, '2025-10-18')
+    with pytest.raises(ValueError, match='faltan las columnas codigo_producto'):
+        historico.registrar('consum', extraccion_consum(codigos).drop(columns='codigo_producto'), '2025-10-18')
+    with pytest.raises(ValueError, match='ningún producto'):
+        historico.registrar('consum', extraccion_consum(codigos).iloc[:0], '2025-10-18')
+    with pytest.raises(ValueError, match='desaparecerían 7 de 10'):
+        historico.registrar('consum', extraccion_consum(codigos[:3]), '2025-10-18')
+
+    # Ninguna ha ocupado la fecha ni escrito filas
+    assert historico.fechas('consum') == ['2025-10-17']
+    assert historico.registrar('consum', extraccion_consum(codigos), '2025-10-18') == \
+        {'alta': 0, 'cambio': 0, 'baja': 0}
+    assert historico.registrar('consum', extraccion_consum(codigos[:3]), '2025-10-19', max_bajas=1)['baja'] == 7
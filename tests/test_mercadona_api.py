@@ -0,0 +1,138 @@
+"""
+Pruebas de MercadonaAPI contra un servidor local que imita la API de Mercadona
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from mercadona_api import MercadonaAPI, producto_a_fila, scrape_mercadona_api
+
+LECHE = {
+    'display_name': 'Leche entera Hacendado',
+    'packaging': 'Brick',
+    'thumbnail': 'https://prod-mercadona.imgix.net/leche.jpg',
+    'price_instructions': {'unit_price': '0.97', 'unit_size': 1, 'size_format': 'l', 'is_pack': False},
+}
+YOGUR = {
+    'display_name': 'Yogur natural',
+    'thumbnail': None,
+    'price_instructions': {'unit_price': '1.10', 'is_pack': True, 'total_units': 4, 'unit_name': 'ud.',
+                           'pack_size': 0.125, 'size_format': 'kg', 'previous_unit_price': ' 1.25 '},
+}
+TOMATES = {
+    'display_name': 'Tomate pera',
+    'thumbnail': 'https://prod-mercadona.imgix.net/tomate.jpg',
+    'price_instructions': {'unit_price': '2.15', 'unit_size': 1, 'size_format': 'kg', 'is_pack': False,
+                           'bulk_price': '2.15', 'selling_method': 2, 'approx_size': True},
+}
+
+CATEGORIAS = {
+    '112': {'id': 112, 'products': [LECHE], 'categories': [{'id': 1121, 'products': [YOGUR]}]},
+    '115': {'id': 115, 'categories': [{'id': 1151, 'products': [TOMATES]}]},
+}
+
+
+class ManejadorMercadona(BaseHTTPRequestHandler):
+    """Responde como la API: listado paginado de categorías, categorías y cambio de código postal"""
+
+    peticiones = []
+
+    def _json(self, datos, cabeceras=()):
+        cuerpo = json.dumps(datos).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        for nombre, valor in cabeceras:
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        self.peticiones.append((url.path, params))
+        base = f"http://{self.headers['Host']}/api"
+
+        if url.path == '/api/categories/' and params.get('page') != ['2']:
+            self._json({'count': 2, 'next': f"{base}/categories/?lang=es&wh=vlc1&page=2",
+                        'results': [{'id': 1, 'categories': [{'id': 112}]}]})
+        elif url.path == '/api/categories/':
+            self._json({'count': 2, 'next': None, 'results': [{'id': 2, 'categories': [{'id': 115}]}]})
+        elif url.path.startswith('/api/categories/') and url.path.split('/')[3] in CATEGORIAS:
+            self._json(CATEGORIAS[url.path.split('/')[3]])
+        else:
+            self.send_error(404)
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self._json({}, [('x-customer-wh', 'vlc1')])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def servidor():
+    ManejadorMercadona.peticiones = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), ManejadorMercadona)
+    hilo = threading.Thread(target=httpd.serve_forever, daemon=True)
+    hilo.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/api"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_obtener_categorias_sigue_la_paginacion(servidor):
+    with MercadonaAPI(base_url=servidor, reintentos=0) as api:
+        api.configurar_codigo_postal('46001')
+        assert api.almacen == 'vlc1'
+        assert api.obtener_categorias() == ['112', '115']
+
+    paginas = [params for ruta, params in ManejadorMercadona.peticiones if ruta == '/api/categories/']
+    assert paginas == [{'lang': ['es'], 'wh': ['vlc1']}, {'lang': ['es'], 'wh': ['vlc1'], 'page': ['2']}]
+
+
+def test_productos_categoria_recorre_subcategorias(servidor):
+    with MercadonaAPI(base_url=servidor, reintentos=0) as api:
+        productos = api.productos_categoria('https://tienda.mercadona.es/categories/112')
+
+    assert [p['nombre'] for p in productos] == ['Leche entera Hacendado', 'Yogur natural']
+    assert [p['elemento_id'] for p in productos] == [1, 2]
+
+
+def test_producto_a_fila():
+    assert producto_a_fila(LECHE, 1, '112') == {
+        'elemento_id': 1,
+        'texto_completo': 'Leche entera Hacendado\nBrick 1 L\n0,97 € /ud.',
+        'nombre': 'Leche entera Hacendado',
+        'precio': '0,97 € /ud.',
+        'precio_unidad': 'N/A',
+        'marca': 'N/A',
+        'imagen_url': 'https://prod-mercadona.imgix.net/leche.jpg',
+        'categoria_url': 'https://tienda.mercadona.es/categories/112',
+        'categoria_nombre': '112',
+    }
+
+    yogur = producto_a_fila(YOGUR, 2, '112')
+    assert yogur['texto_completo'] == 'Yogur natural\n4 ud. x 125 g\n1,25 €1,10 € /pack'
+    assert yogur['imagen_url'] == 'N/A'
+
+    tomates = producto_a_fila(TOMATES, 1, '115')
+    assert tomates['texto_completo'] == 'Tomate pera\n1 kg aprox.\n2,15 € /kg'
+
+    # La API también puede dar el precio anterior como número
+    rebajado = dict(LECHE, price_instructions=dict(LECHE['price_instructions'], previous_unit_price=1.05))
+    assert producto_a_fila(rebajado, 1, '112')['precio'] == '1,05 €0,97 € /ud.'
+
+
+def test_scrape_mercadona_api_todas_las_categorias(servidor):
+    productos = scrape_mercadona_api(codigo_postal='46001', base_url=servidor)
+
+    assert [(p['categoria_nombre'], p['nombre']) for p in productos] == [
+        ('112', 'Leche entera Hacendado'), ('112', 'Yogur natural'), ('115', 'Tomate pera')]
+    categorias = [params for ruta, params in ManejadorMercadona.peticiones if ruta.startswith('/api/categories/1')]
+    assert all(params['wh'] == ['vlc1'] for params in categorias)
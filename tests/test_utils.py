@@ -0,0 +1,43 @@
+"""
+Pruebas de la cantidad total de los envases: los packs cuentan todas sus unidades
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import cantidad_envase, cantidades_envase, piezas_envase
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('4 ud. x 125 g', (0.5, 'Kg')),
+    ('Caja 10 sobres (20 g)', (0.02, 'Kg')),
+    ('6 bricks x 1 L', (6.0, 'L')),
+    ('Pack-6 x 1,5 L', (9.0, 'L')),
+    ('Botella 75 cl', (0.75, 'L')),
+    ('16 u', (16.0, 'ud')),
+    ('1 paquete', (np.nan, None)),
+])
+def test_cantidad_envase(texto, esperado):
+    cantidad, unidad = cantidad_envase(texto)
+    assert unidad == esperado[1]
+    np.testing.assert_allclose(cantidad, esperado[0])
+
+
+def test_cantidades_envase_toman_el_nombre_si_el_formato_no_tiene_unidad():
+    formatos = pd.Series(['6 x 100', '4 ud. x 125 g', None], index=[10, 11, 12])
+    nombres = pd.Series(['actimel natural pack 6 6 x 100 ml', 'yogur natural', 'leche entera 1 l'], index=formatos.index)
+    envases = cantidades_envase(formatos, nombres)
+    assert envases.index.tolist() == [10, 11, 12]
+    np.testing.assert_allclose(envases['cantidad'], [0.6, 0.5, 1.0])
+    assert envases['unidad'].tolist() == ['L', 'Kg', 'L']
+    # '6 x 100' no tiene unidad, pero sí sus 6 piezas; 'leche entera 1 l' no cuenta piezas
+    np.testing.assert_allclose(envases['piezas'], [6, 4, np.nan])
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('4 ud. x 125 g', 4), ('Paquete 24 ud.', 24), ('huevos s/m medianos 24 unidades 2 dc', 24),
+    ('docena 1 dc', 12), ('Botella 1 L', np.nan),
+])
+def test_piezas_envase(texto, esperado):
+    np.testing.assert_equal(piezas_envase(texto), esperado)